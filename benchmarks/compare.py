@@ -0,0 +1,55 @@
+import argparse
+import json
+import sys
+
+
+def best_time(result):
+    # The minimum is less sensitive to noise, but not every benchmark repeats
+    return result['min'] if result['min'] is not None else result['mean']
+
+
+def compare(baseline, current, tolerance):
+    ''' Prints the best time of every benchmark in both result sets and returns
+        the names of those that got slower by more than tolerance.
+    '''
+    regressions = []
+    print(f'{"benchmark":<32} {"baseline (ms)":>14} {"current (ms)":>14} {"ratio":>8}')
+    for name, result in current['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            print(f'{name:<32} {"-":>14} {1000 * best_time(result):>14.3f} {"-":>8}')
+            continue
+
+        baseline_time = best_time(baseline['benchmarks'][name])
+        current_time = best_time(result)
+        ratio = current_time / baseline_time
+        flag = ' !' if ratio > 1 + tolerance else ''
+        print(f'{name:<32} {1000 * baseline_time:>14.3f} {1000 * current_time:>14.3f} {ratio:>8.2f}{flag}')
+        if flag:
+            regressions.append(name)
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.compare',
+                                     description='Compares two result files written by benchmarks.suite.')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    if baseline['config'] != current['config']:
+        print('Warning: the results were produced with different configurations', file=sys.stderr)
+
+    regressions = compare(baseline, current, args.tolerance)
+    if len(regressions):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import random as rand
+import sys
+import time
+
+from neat.genotype import Genotype
+from neat.genes import gene_factory
+
+
+def build_parents(genome_size):
+    ''' Returns two related genotypes with genome_size connection genes each,
+        differing in their weights and a handful of disjoint genes.
+    '''
+    gene_factory.reset()
+    Genotype.initialize_minimal_topology(genome_size, 1)
+    parent1 = Genotype.base_genotype_factory()
+    parent2 = Genotype.base_genotype_factory()
+    for _ in range(max(1, genome_size // 20)):
+        parent1.attempt_node_mutation()
+        parent2.attempt_node_mutation()
+
+    return parent1, parent2
+
+
+def time_crossover(genome_size, repeats):
+    parent1, parent2 = build_parents(genome_size)
+
+    # Mutations are disabled so that only the crossover itself is timed
+    chances = (Genotype.node_mutation_chance, Genotype.connection_mutation_chance,
+               Genotype.weight_mutation_chance, Genotype.toggle_chance)
+    Genotype.node_mutation_chance = 0
+    Genotype.connection_mutation_chance = 0
+    Genotype.weight_mutation_chance = 0
+    Genotype.toggle_chance = 0
+    try:
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            parent1.favored_crossover(parent2)
+        delta_t = time.perf_counter() - start_time
+    finally:
+        (Genotype.node_mutation_chance, Genotype.connection_mutation_chance,
+         Genotype.weight_mutation_chance, Genotype.toggle_chance) = chances
+
+    return delta_t / repeats
+
+
+def main(genome_sizes=(50, 100, 200, 400, 800, 1600), repeats=50):
+    rand.seed(0)
+    print(f'{"connections":>12} {"crossover (ms)":>15}')
+    for genome_size in genome_sizes:
+        print(f'{genome_size:>12} {1000 * time_crossover(genome_size, repeats):>15.3f}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main([int(size) for size in sys.argv[1:]])
+    else:
+        main()
@@ -0,0 +1,57 @@
+import random as rand
+import sys
+import time
+import tracemalloc
+
+from neat.genotype import Genotype
+from neat.genes import gene_factory
+from neat.compact import CompactGenome
+
+
+def build_genotype(genome_size):
+    ''' Returns a genotype with roughly genome_size connection genes.
+    '''
+    gene_factory.reset()
+    Genotype.initialize_minimal_topology(genome_size, 1)
+    genotype = Genotype.base_genotype_factory()
+    for _ in range(max(1, genome_size // 20)):
+        genotype.attempt_node_mutation()
+
+    return genotype
+
+
+def memory_per_copy(genome, num_copies):
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    copies = [genome.generate_copy() for _ in range(num_copies)]
+    end_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (end_size - start_size) / len(copies)
+
+
+def copies_per_second(genome, num_copies):
+    start_time = time.perf_counter()
+    for _ in range(num_copies):
+        genome.generate_copy()
+
+    return num_copies / (time.perf_counter() - start_time)
+
+
+def main(genome_sizes=(10, 50, 200, 1000), num_copies=1000):
+    rand.seed(0)
+    print(f'{"connections":>12} {"storage":>10} {"bytes/genome":>14} {"copies/s":>12}')
+    for genome_size in genome_sizes:
+        genotype = build_genotype(genome_size)
+        genome = CompactGenome.from_genotype(genotype)
+        for name, candidate in (('objects', genotype), ('compact', genome)):
+            print(f'{len(genotype.connection_genes):>12} {name:>10} '
+                  f'{memory_per_copy(candidate, num_copies):>14.0f} '
+                  f'{copies_per_second(candidate, num_copies):>12.0f}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main([int(size) for size in sys.argv[1:]])
+    else:
+        main()
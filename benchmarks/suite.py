@@ -0,0 +1,254 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random as rand
+import subprocess
+import sys
+import time
+
+from neat.genotype import Genotype
+from neat.phenotype import Phenotype, StabilizationMethod
+from neat.population import Population
+from neat.species import Species
+from neat.agent import Agent
+from neat.experiments import XOR
+from neat.genes import NodeType, gene_factory
+
+
+def build_genotype(genome_size):
+    ''' Returns a genotype with roughly genome_size connection genes and one
+        hidden node for every 20 of them.
+    '''
+    Genotype.initialize_minimal_topology(genome_size, 1)
+    genotype = Genotype.base_genotype_factory()
+    for _ in range(max(1, genome_size // 20)):
+        genotype.attempt_node_mutation()
+
+    return genotype
+
+
+def build_recurrent_genotype(num_nodes, num_inputs=10, connections_per_node=2):
+    ''' Returns a genotype with num_nodes hidden nodes and, on top of the
+        connections of the node mutations, connections_per_node random
+        connections per hidden node, which create cycles.
+    '''
+    Genotype.initialize_minimal_topology(num_inputs, 1)
+    genotype = Genotype.base_genotype_factory()
+    for _ in range(num_nodes):
+        genotype.attempt_node_mutation()
+
+    # Connections are added directly, since attempt_connection_mutation
+    # considers every pair of nodes
+    node_ids = [gene.innovation_id for gene in genotype.node_genes if gene.node_type is not NodeType.INPUT]
+    for _ in range(connections_per_node * num_nodes):
+        structure = (rand.choice(node_ids), rand.choice(node_ids))
+        if not genotype.connection_structure_exists(structure):
+            genotype.create_connection_gene(*structure, rand.uniform(-1, 1))
+
+    return genotype
+
+
+def build_population(population_size, genome_size):
+    ''' Returns a population of related genotypes, each with a few structural
+        mutations of its own.
+    '''
+    Genotype.initialize_minimal_topology(genome_size, 1)
+    population = Population(population_size)
+    for _ in range(population_size):
+        genotype = Genotype.base_genotype_factory()
+        for _ in range(rand.randint(0, 3)):
+            genotype.attempt_node_mutation()
+            genotype.attempt_connection_mutation()
+        population.agents.append(Agent(genotype))
+
+    return population
+
+
+@contextlib.contextmanager
+def fixed_state(seed):
+    ''' Seeds the random module and resets the class level state that the
+        benchmarks modify, so that every benchmark starts from the same state
+        regardless of which ran before it.
+    '''
+    genotype_chances = (Genotype.node_mutation_chance, Genotype.connection_mutation_chance,
+                        Genotype.weight_mutation_chance, Genotype.toggle_chance)
+    compatibility_threshold = Species.compatibility_threshold
+    stabilization_method = Phenotype.default_stabilization_method
+    sparse_recurrent = Phenotype.sparse_recurrent
+    rand.seed(seed)
+    gene_factory.reset()
+    try:
+        yield
+    finally:
+        (Genotype.node_mutation_chance, Genotype.connection_mutation_chance,
+         Genotype.weight_mutation_chance, Genotype.toggle_chance) = genotype_chances
+        Species.compatibility_threshold = compatibility_threshold
+        Phenotype.default_stabilization_method = stabilization_method
+        Phenotype.sparse_recurrent = sparse_recurrent
+
+
+def measure(func, repeats, setup=None):
+    ''' Returns the mean and minimum time of repeats calls of func in seconds.
+        If setup is given, its result is passed to func and its own time is
+        not measured.
+    '''
+    times = []
+    for _ in range(repeats):
+        args = (setup(),) if setup is not None else ()
+        start_time = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start_time)
+
+    return {'mean': sum(times) / len(times), 'min': min(times)}
+
+
+def bench_evaluate_network(config, stabilization_method):
+    genotype = build_genotype(config.genome_size)
+    phenotype = Phenotype(genotype, stabilization_method)
+    inputs = [rand.uniform(-1, 1) for _ in range(config.genome_size)]
+
+    return measure(lambda: phenotype.evaluate_network(inputs), config.repeats)
+
+
+def bench_evaluate_recurrent_network(config, sparse_recurrent):
+    genotype = build_recurrent_genotype(config.recurrent_size)
+    Phenotype.sparse_recurrent = sparse_recurrent
+    phenotype = Phenotype(genotype, StabilizationMethod.ITERATIVE)
+    inputs = [rand.uniform(-1, 1) for _ in range(10)]
+
+    return measure(lambda: phenotype.evaluate_network(inputs), config.repeats)
+
+
+def bench_compatibilty(config):
+    genotype1 = build_genotype(config.genome_size)
+    genotype2 = genotype1.generate_copy()
+    genotype2.attempt_node_mutation()
+    genotype2.mutate_weights()
+
+    # The cached gene index is dropped before each call, so the full
+    # distance calculation is measured
+    def compare():
+        genotype1._invalidate()
+        genotype2._invalidate()
+        genotype1.compatibilty(genotype2)
+
+    return measure(compare, config.repeats)
+
+
+def bench_favored_crossover(config):
+    parent1 = build_genotype(config.genome_size)
+    parent2 = parent1.generate_copy()
+    parent2.attempt_node_mutation()
+    parent2.mutate_weights()
+
+    # Mutations are disabled so that only the crossover itself is timed
+    Genotype.node_mutation_chance = 0
+    Genotype.connection_mutation_chance = 0
+    Genotype.weight_mutation_chance = 0
+    Genotype.toggle_chance = 0
+
+    return measure(lambda: parent1.favored_crossover(parent2), config.repeats)
+
+
+def bench_attempt_connection_mutation(config):
+    genotype = build_genotype(config.genome_size)
+
+    return measure(lambda genotype: genotype.attempt_connection_mutation(),
+                   config.repeats,
+                   setup=genotype.generate_copy)
+
+
+def bench_speciate(config):
+    population = build_population(config.population_size, config.genome_size)
+
+    # Species are cleared between repeats while the compatibility cache is
+    # kept, as it is between generations
+    def setup():
+        Species.compatibility_threshold = compatibility_threshold
+        population._species = []
+        return population
+
+    compatibility_threshold = Species.compatibility_threshold
+
+    return measure(lambda population: population.speciate(), config.repeats, setup=setup)
+
+
+def bench_xor_generation(config):
+    experiment = XOR(num_generations=config.generations, population_size=config.population_size, agents_directory=None)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        experiment.run()
+        delta_t = time.perf_counter() - start_time
+
+    return {'mean': delta_t / config.generations, 'min': None}
+
+
+BENCHMARKS = {
+    'evaluate_network.iterative': lambda config: bench_evaluate_network(config, StabilizationMethod.ITERATIVE),
+    'evaluate_network.feed_forward': lambda config: bench_evaluate_network(config, StabilizationMethod.FEED_FORWARD),
+    'evaluate_network.adaptive': lambda config: bench_evaluate_network(config, StabilizationMethod.ADAPTIVE),
+    'evaluate_network.recurrent': lambda config: bench_evaluate_recurrent_network(config, False),
+    'evaluate_network.recurrent_sparse': lambda config: bench_evaluate_recurrent_network(config, True),
+    'compatibilty': bench_compatibilty,
+    'favored_crossover': bench_favored_crossover,
+    'attempt_connection_mutation': bench_attempt_connection_mutation,
+    'speciate': bench_speciate,
+    'xor_generation': bench_xor_generation,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(config):
+    results = {'revision': git_revision(),
+               'python': platform.python_version(),
+               'config': {key: value for key, value in vars(config).items() if key != 'output'},
+               'benchmarks': {}}
+
+    for name, benchmark in BENCHMARKS.items():
+        if config.only and not any(name.startswith(prefix) for prefix in config.only):
+            continue
+
+        with fixed_state(config.seed):
+            results['benchmarks'][name] = benchmark(config)
+        print(f'{name:<32} {1000 * results["benchmarks"][name]["mean"]:>12.3f} ms', file=sys.stderr)
+
+    return results
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite',
+                                     description='Times the hot paths of the generation loop and writes the results as JSON.')
+    parser.add_argument('--population-size', type=int, default=150)
+    parser.add_argument('--genome-size', type=int, default=100, help='number of input nodes, and so of initial connections')
+    parser.add_argument('--recurrent-size', type=int, default=500, help='number of hidden nodes of the recurrent genome')
+    parser.add_argument('--generations', type=int, default=3, help='number of XOR generations to time')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='*', default=[], help='benchmark name prefixes to run')
+    parser.add_argument('--output', help='file to write the JSON results to instead of stdout')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    config = parse_args(argv)
+    results = run(config)
+    if config.output:
+        with open(config.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+
+from neat.genes import Activation
+from neat.utils.math import (steepened_sigmoid, batch_steepened_sigmoid, gaussian, batch_gaussian,
+                             relu, batch_relu, identity, batch_identity, LookupTable)
+
+
+class Activations:
+    ''' Resolves an Activation to its scalar and vectorized function. Both
+        are looked up once per node when a network is built rather than on
+        every activation.
+
+        If sigmoid_lookup_table is set, the steepened sigmoid is approximated
+        by a LookupTable clamped to [-4, 4], where it is within 1E-8 of 0 and
+        1, with an error of about 1E-6 in between.
+    '''
+    sigmoid_lookup_table = False
+    _table = None
+
+    _functions = {
+        Activation.SIGMOID: steepened_sigmoid,
+        Activation.TANH: math.tanh,
+        Activation.RELU: relu,
+        Activation.IDENTITY: identity,
+        Activation.GAUSSIAN: gaussian,
+    }
+
+    _batch_functions = {
+        Activation.SIGMOID: batch_steepened_sigmoid,
+        Activation.TANH: np.tanh,
+        Activation.RELU: batch_relu,
+        Activation.IDENTITY: batch_identity,
+        Activation.GAUSSIAN: batch_gaussian,
+    }
+
+    @classmethod
+    def function(cls, activation):
+        if activation is Activation.SIGMOID and cls.sigmoid_lookup_table:
+            return cls.sigmoid_table()
+
+        return cls._functions[activation]
+
+    @classmethod
+    def batch_function(cls, activation):
+        if activation is Activation.SIGMOID and cls.sigmoid_lookup_table:
+            return cls.sigmoid_table().batch
+
+        return cls._batch_functions[activation]
+
+    @classmethod
+    def sigmoid_table(cls):
+        if cls._table is None:
+            cls._table = LookupTable(steepened_sigmoid, -4, 4)
+
+        return cls._table
@@ -1,19 +1,39 @@
 from neat.utils.math import sigmoid
+from neat.phenotype import Phenotype
 
 class Agent:
     _agents_created = 0
     _agent_count = 0
-    def __init__(self, phenotype):
+    _score_version = 0 # incremented whenever the fitness or state of any agent changes
+    __slots__ = ('_agent_id', '_genotype', '_stabilization_method', '_phenotype', 'age', 'error_sum', 'classification_error', 'iterations', 'behavior', '_fitness', '_killed')
+
+    def __init__(self, genotype, stabilization_method=None):
         Agent._agents_created += 1
         Agent._agent_count += 1
         self._agent_id = Agent._agents_created
-        self._phenotype = phenotype
+        self._genotype = genotype
+        self._stabilization_method = stabilization_method
+        self._phenotype = None
         self.age = 0
         self.error_sum = 0
         self.classification_error = 0
-        self.fitness = 0
+        self.iterations = 0 # network passes made by the last evaluation
+        self.behavior = None # behavior descriptor recorded by the last evaluation, for novelty search
+        self._fitness = 0
         self._killed = False
 
+    def __getstate__(self):
+        # The phenotype is rebuilt from the genotype when needed, so pickles
+        # do not carry its node graph
+        return {slot: getattr(self, slot) for slot in Agent.__slots__ if slot != '_phenotype'}
+
+    def __setstate__(self, state):
+        self._phenotype = None
+        self.iterations = 0
+        self.behavior = None
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
     @staticmethod
     def agents_created():
         return Agent._agents_created
@@ -22,9 +42,18 @@ class Agent:
     def innovation_count(self):
         return self.genotype.innovation_count
 
+    @property
+    def fitness(self):
+        return self._fitness
+
+    @fitness.setter
+    def fitness(self, fitness):
+        self._fitness = fitness
+        Agent._score_version += 1
+
     @property
     def adjusted_fitness(self):
-        return pow(self.fitness, 2)
+        return pow(self._fitness, 2)
 
     @property
     def agent_id(self):
@@ -32,26 +61,36 @@ class Agent:
 
     @property
     def outputs(self):
-        return [node.activation for node in self._phenotype.output_nodes]
+        return [node.activation for node in self.phenotype.output_nodes]
 
     @property
     def expired(self):
         return self._killed
 
     def activate_network(self, inputs):
-        return self._phenotype.evaluate_network(inputs)
+        return self.phenotype.evaluate_network(inputs)
+
+    def activate_batch(self, inputs):
+        return self.phenotype.evaluate_batch(inputs)
 
     def calculate_fitness(self, *args, **kwargs):
         pass
 
     @property
     def phenotype(self):
+        ''' Returns the phenotype of this agent, which is only built once it is
+            first needed so that agents culled before evaluation cost nothing.
+        '''
+        if self._phenotype is None:
+            self._phenotype = Phenotype(self._genotype, self._stabilization_method)
+
         return self._phenotype
 
     @property
     def genotype(self):
-        return self._phenotype.genotype
+        return self._genotype
 
     def kill(self):
         Agent._agent_count -= 1
+        Agent._score_version += 1
         self._killed = True
\ No newline at end of file
@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from itertools import repeat
+
+from neat.compact import CompactGenome
+from neat.genotype import Genotype
+from neat.species import Species
+from neat.agent import Agent
+from neat.utils.rng import RandomStreams
+
+
+class SerialBreeder:
+    ''' Breeds offspring one after another in the current process, drawing
+        from the planned streams as it goes.
+    '''
+    def breed(self, plan, registry):
+        return [Species.generate_planned_offspring(*task) for task in plan]
+
+    def close(self):
+        pass
+
+
+class ParallelBreeder:
+    ''' Breeds offspring on a pool of worker processes. Every offspring in the
+        plan gets its own seed, drawn in plan order from the streams it was
+        planned with, and is bred from RandomStreams of that seed.
+        Workers rebuild the parents from CompactGenomes, record new
+        innovations in an InnovationJournal and send back the offspring
+        genome, whose innovations are merged into the registry in plan order.
+
+        The offspring therefore only depend on the planned streams, not on the
+        number of workers. They differ from those of SerialBreeder, which
+        draws offspring one after another from the planned streams.
+    '''
+    def __init__(self, num_workers):
+        self._num_workers = num_workers
+        self._executor = None
+
+    @property
+    def num_workers(self):
+        return self._num_workers
+
+    def breed(self, plan, registry):
+        genomes = {}
+        tasks = []
+        for parent1, parent2, clone, streams in plan:
+            if clone:
+                continue
+
+            for parent in (parent1, parent2):
+                if parent is not None and id(parent.genotype) not in genomes:
+                    genomes[id(parent.genotype)] = CompactGenome.from_genotype(parent.genotype)
+
+            equal_fitness = parent2 is not None and parent1.adjusted_fitness == parent2.adjusted_fitness
+            tasks.append((genomes[id(parent1.genotype)],
+                          genomes[id(parent2.genotype)] if parent2 is not None else None,
+                          equal_fitness,
+                          (streams or parent1.genotype.streams).random.getrandbits(64)))
+
+        results = iter(self._run(tasks, registry))
+        offspring = []
+        for parent1, parent2, clone, streams in plan:
+            if clone:
+                offspring.append(Species.generate_clone(parent1))
+                continue
+
+            genome, journal, weight_mutation_pending = next(results)
+            mapping = registry.merge(journal)
+            if not mapping.empty:
+                genome.translate_innovations(mapping)
+            genotype = genome.to_genotype(registry, streams or parent1.genotype.streams)
+            if weight_mutation_pending:
+                genotype.request_weight_mutation()
+            offspring.append(Agent(genotype))
+
+        return offspring
+
+    def _run(self, tasks, registry):
+        settings = _genotype_settings()
+        if self._num_workers <= 1:
+            return _breed_chunk(settings, registry, tasks)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._num_workers)
+
+        # Tasks are sent in chunks so that parents shared by several tasks of
+        # a chunk are only sent and rebuilt once
+        chunksize = max(1, len(tasks) // (4 * self._num_workers))
+        chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+        results = self._executor.map(_breed_chunk, repeat(settings), repeat(registry), chunks)
+        return [result for chunk_results in results for result in chunk_results]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _genotype_settings():
+    # Workers may have been started before the settings were changed
+    return {name: value for name, value in vars(Genotype).items()
+            if not name.startswith('_') and isinstance(value, (bool, int, float, Enum, tuple))}
+
+
+def _breed_chunk(settings, registry, tasks):
+    for name, value in settings.items():
+        setattr(Genotype, name, value)
+
+    parents = {}
+    results = []
+    for genome1, genome2, equal_fitness, seed in tasks:
+        streams = RandomStreams(seed)
+        journal = registry.journal()
+        for genome in (genome1, genome2):
+            if genome is None:
+                continue
+            if id(genome) not in parents:
+                parents[id(genome)] = genome.to_genotype()
+            parents[id(genome)].registry = journal
+
+        genotype2 = parents[id(genome2)] if genome2 is not None else None
+        genotype = Species.offspring_genotype(parents[id(genome1)], genotype2, equal_fitness, streams)
+        results.append((CompactGenome.from_genotype(genotype), journal, genotype.weight_mutation_pending))
+
+    return results
@@ -0,0 +1,208 @@
+''' Binary checkpoint of a population and the global state of a run.
+
+    Layout: a header holding a magic string, the format version and the size
+    of a JSON metadata section, then the metadata padded to 8 bytes, then
+    every array listed in the metadata, each 8 byte aligned. The metadata
+    holds the scalar state and, for every array, its dtype, offset and shape.
+    Genotypes are stored as the concatenated buffers of their CompactGenomes,
+    so the file is read through a memory map without parsing each gene.
+
+    Checkpoints are taken between generations, when no weight mutation is
+    pending and the generation champion is no longer needed.
+'''
+
+import json
+import mmap
+import struct
+
+import numpy as np
+
+from neat.agent import Agent
+from neat.compact import CompactGenome
+from neat.genes import NodeType
+from neat.species import Species
+from neat.utils.rng import RandomStreams
+
+
+MAGIC = b'NEATCKPT'
+VERSION = 2
+_header = struct.Struct('<8sIQ')
+
+
+def save_checkpoint(filename, population, generation):
+    ''' Writes population, the number of the last finished generation and the
+        global state of the run to filename.
+    '''
+    agents = population.agents
+    agent_index = {agent.agent_id: i for i, agent in enumerate(agents)}
+    genotypes = [agent.genotype for agent in agents]
+    genotypes += [species.representative_genotype for species in population.species]
+    if population.base_genotype is not None:
+        genotypes.append(population.base_genotype)
+
+    genomes = [CompactGenome.from_genotype(genotype).buffer for genotype in genotypes]
+    genome_offsets = np.zeros(len(genomes) + 1, dtype='<i8')
+    np.cumsum([len(genome) for genome in genomes], out=genome_offsets[1:])
+
+    members = [[agent_index[agent.agent_id] for agent in species.agents] for species in population.species]
+    member_offsets = np.zeros(len(members) + 1, dtype='<i8')
+    np.cumsum([len(species_members) for species_members in members], out=member_offsets[1:])
+
+    (version, random_state, gauss_next), numpy_state = population.streams.getstate()
+    registry = population.registry
+    node_structures = [(structure, innovation_id) for structure, innovation_id in registry._node_dict.items() if structure is not None]
+
+    arrays = {
+        'random_state': np.array(random_state, dtype='<i8'),
+        'node_types': np.array([node_type.value for node_type in registry._node_list[1:]], dtype='<i8'),
+        'node_structures': np.array([(input_node_id or 0, output_node_id or 0, innovation_id)
+                                     for (input_node_id, output_node_id), innovation_id in node_structures], dtype='<i8').reshape(-1, 3),
+        'connection_structures': np.array(registry._connection_list[1:], dtype='<i8').reshape(-1, 2),
+        'genomes': np.frombuffer(b''.join(genomes), dtype=np.uint8),
+        'genome_offsets': genome_offsets,
+        'agent_ids': np.array([agent.agent_id for agent in agents], dtype='<i8'),
+        'agent_ages': np.array([agent.age for agent in agents], dtype='<i8'),
+        'agent_killed': np.array([agent.expired for agent in agents], dtype='<i8'),
+        'agent_scores': np.array([(agent.fitness, agent.error_sum, agent.classification_error) for agent in agents], dtype='<f8').reshape(-1, 3),
+        'species_ids': np.array([species.species_id for species in population.species], dtype='<i8'),
+        'species_state': np.array([(species.age, species._stagnation_duration, species.expired) for species in population.species], dtype='<i8').reshape(-1, 3),
+        'species_best_fitness': np.array([species._best_fitness for species in population.species], dtype='<f8'),
+        'species_members': np.array([i for species_members in members for i in species_members], dtype='<i8'),
+        'species_member_offsets': member_offsets,
+    }
+
+    metadata = {
+        'generation': generation,
+        'random_version': version,
+        'random_gauss_next': gauss_next,
+        'population_size': population._size,
+        'population_seed': population.streams.seed,
+        'population_stream_key': list(population.streams.key),
+        'population_rng': numpy_state,
+        'base_genotype': population.base_genotype is not None,
+        'agents_created': Agent._agents_created,
+        'agent_count': Agent._agent_count,
+        'species_created': Species._species_created,
+        'species_count': Species._species_count,
+        'compatibility_threshold': Species.compatibility_threshold,
+        'arrays': {},
+    }
+
+    # Offsets are relative to the start of the data section, so they do not
+    # depend on the size of the metadata they are stored in
+    offset = 0
+    for name, array in arrays.items():
+        metadata['arrays'][name] = [array.dtype.str, offset, list(array.shape)]
+        offset += _aligned(array.nbytes)
+
+    metadata = json.dumps(metadata).encode()
+    with open(filename, 'wb') as outfile:
+        outfile.write(_header.pack(MAGIC, VERSION, len(metadata)))
+        outfile.write(metadata.ljust(_aligned(len(metadata)), b'\0'))
+        for array in arrays.values():
+            data = array.tobytes()
+            outfile.write(data.ljust(_aligned(len(data)), b'\0'))
+
+
+def load_checkpoint(filename, population):
+    ''' Restores population and the global state of the run from filename and
+        returns the number of the last finished generation.
+    '''
+    with open(filename, 'rb') as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            state = _read(buffer, population.registry)
+
+    _restore(state, population)
+    return state['metadata']['generation']
+
+
+def _aligned(size):
+    return (size + 7) // 8 * 8
+
+
+def _read(buffer, registry):
+    # Every view into the memory map is released when this returns, so that
+    # the map can be closed
+    magic, version, metadata_size = _header.unpack_from(buffer)
+    if magic != MAGIC:
+        raise RuntimeError('Not a checkpoint file')
+    if version != VERSION:
+        raise RuntimeError(f'Unsupported checkpoint version {version}')
+
+    metadata = json.loads(bytes(buffer[_header.size:_header.size + metadata_size]))
+    data_offset = _header.size + _aligned(metadata_size)
+    arrays = {}
+    for name, (dtype, offset, shape) in metadata['arrays'].items():
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(buffer, dtype, count, data_offset + offset).reshape(shape)
+
+    genome_offsets = arrays['genome_offsets'].tolist()
+    genomes = arrays['genomes']
+    genotypes = [CompactGenome(genomes[start:end]).to_genotype(registry) for start, end in zip(genome_offsets, genome_offsets[1:])]
+
+    state = {'metadata': metadata, 'genotypes': genotypes}
+    for name, array in arrays.items():
+        if name not in ('genomes', 'genome_offsets'):
+            state[name] = array.tolist()
+
+    return state
+
+
+def _restore(state, population):
+    metadata = state['metadata']
+    streams = RandomStreams(metadata['population_seed'], metadata['population_stream_key'])
+    streams.setstate(((metadata['random_version'], tuple(state['random_state']), metadata['random_gauss_next']), metadata['population_rng']))
+
+    registry = population.registry
+    registry.reset()
+    registry._node_list.extend([NodeType(node_type) for node_type in state['node_types']])
+    for input_node_id, output_node_id, innovation_id in state['node_structures']:
+        registry._node_dict[(input_node_id or None, output_node_id or None)] = innovation_id
+    for innovation_id, structure in enumerate(state['connection_structures'], 1):
+        structure = tuple(structure)
+        registry._connection_list.append(structure)
+        registry._connection_dict[structure] = innovation_id
+
+    genotypes = state['genotypes']
+    for genotype in genotypes:
+        genotype.streams = streams
+    num_agents = len(state['agent_ids'])
+    num_species = len(state['species_ids'])
+    population._base_genotype = genotypes[num_agents + num_species] if metadata['base_genotype'] else None
+
+    agents = []
+    for i, genotype in enumerate(genotypes[:num_agents]):
+        agent = Agent(genotype)
+        agent._agent_id = state['agent_ids'][i]
+        agent.age = state['agent_ages'][i]
+        agent.fitness, agent.error_sum, agent.classification_error = state['agent_scores'][i]
+        agent._killed = bool(state['agent_killed'][i])
+        agents.append(agent)
+
+    species_list = []
+    member_offsets = state['species_member_offsets']
+    for i, genotype in enumerate(genotypes[num_agents:num_agents + num_species]):
+        species = Species.__new__(Species)
+        species._species_id = state['species_ids'][i]
+        species._representative_genotype = genotype
+        species._agents = []
+        species._agent_set = set()
+        species.results = {}
+        species._age, species._stagnation_duration, expired = state['species_state'][i]
+        species.expired = bool(expired)
+        species._best_fitness = state['species_best_fitness'][i]
+        for member in state['species_members'][member_offsets[i]:member_offsets[i + 1]]:
+            species.add(agents[member])
+        species_list.append(species)
+
+    population._size = metadata['population_size']
+    population._streams = streams
+    population.generation_champion = None
+    population.replace_agents(agents)
+    population._species = species_list
+
+    Agent._agents_created = metadata['agents_created']
+    Agent._agent_count = metadata['agent_count']
+    Species._species_created = metadata['species_created']
+    Species._species_count = metadata['species_count']
+    Species.compatibility_threshold = metadata['compatibility_threshold']
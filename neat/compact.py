@@ -0,0 +1,407 @@
+import random as rand
+import struct
+
+import numpy as np
+
+from neat.genes import NodeType, Activation, NodeGene, ConnectionGene, InnovationMapping
+from neat.genotype import Genotype
+from neat.networks import NetworkPlan
+
+
+class CompactGenome:
+    ''' Genome stored as parallel typed arrays inside a single buffer instead
+        of one object per gene. Copying a genome is one buffer copy, and the
+        buffer doubles as the wire and storage format.
+
+        Layout, in native byte order: a header holding the number of node
+        genes and connection genes, followed by the node innovation ids,
+        input node ids, output node ids, node types and activations, then the
+        connection innovation ids, input node ids, output node ids, weights
+        and enabled flags. Every field is 8 bytes wide and missing node ids are stored as
+        0, since innovation ids start at 1.
+    '''
+    _header = struct.Struct('qq')
+    _node_fields = ('node_ids', 'node_input_ids', 'node_output_ids', 'node_types', 'node_activations')
+    _connection_fields = ('connection_ids', 'connection_input_ids', 'connection_output_ids', 'weights', 'enabled')
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._num_nodes, self._num_connections = self._header.unpack_from(buffer)
+        self._arrays = None
+        self._fingerprint = None
+        self._network_plan = None
+        self._network_plan_built = False
+
+    @classmethod
+    def allocate(cls, num_nodes, num_connections):
+        buffer = bytearray(cls._header.size + 8 * (len(cls._node_fields) * num_nodes
+                                                   + len(cls._connection_fields) * num_connections))
+        cls._header.pack_into(buffer, 0, num_nodes, num_connections)
+        return cls(buffer)
+
+    @classmethod
+    def from_genotype(cls, genotype):
+        node_genes = genotype.node_genes
+        connection_genes = genotype.connection_genes
+        genome = cls.allocate(len(node_genes), len(connection_genes))
+        genome.node_ids[:] = [gene.innovation_id for gene in node_genes]
+        genome.node_input_ids[:] = [gene.input_node_id or 0 for gene in node_genes]
+        genome.node_output_ids[:] = [gene.output_node_id or 0 for gene in node_genes]
+        genome.node_types[:] = [gene.node_type.value for gene in node_genes]
+        genome.node_activations[:] = [gene.activation.value for gene in node_genes]
+        genome.connection_ids[:] = [gene.innovation_id for gene in connection_genes]
+        genome.connection_input_ids[:] = [gene.input_node_id for gene in connection_genes]
+        genome.connection_output_ids[:] = [gene.output_node_id for gene in connection_genes]
+        genome.weights[:] = [gene.weight for gene in connection_genes]
+        genome.enabled[:] = [gene.enabled for gene in connection_genes]
+
+        return genome
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(bytearray(data))
+
+    def to_bytes(self):
+        return bytes(self._buffer)
+
+    def to_genotype(self, registry=None, streams=None):
+        genotype = Genotype(registry, streams)
+        for innovation_id, input_node_id, output_node_id, node_type, activation in zip(self.node_ids.tolist(),
+                                                                                        self.node_input_ids.tolist(),
+                                                                                        self.node_output_ids.tolist(),
+                                                                                        self.node_types.tolist(),
+                                                                                        self.node_activations.tolist()):
+            genotype.add_node_gene(NodeGene(innovation_id, genotype, input_node_id or None, output_node_id or None,
+                                            NodeType(node_type), Activation(activation)))
+
+        for innovation_id, input_node_id, output_node_id, weight, enabled in zip(self.connection_ids.tolist(),
+                                                                                  self.connection_input_ids.tolist(),
+                                                                                  self.connection_output_ids.tolist(),
+                                                                                  self.weights.tolist(),
+                                                                                  self.enabled.tolist()):
+            genotype.add_connection_gene(ConnectionGene(innovation_id, genotype, input_node_id, output_node_id, weight, bool(enabled)))
+
+        return genotype
+
+    def translate_innovations(self, mapping):
+        ''' Replaces the provisional innovation ids of a genome bred with an
+            InnovationJournal by the ids in mapping, the InnovationMapping
+            returned when the journal was merged, and restores the innovation
+            order of the genes.
+        '''
+        for field in ('node_ids', 'node_input_ids', 'node_output_ids', 'connection_input_ids', 'connection_output_ids'):
+            array = self._array(field)
+            array[:] = mapping.map_node_ids(array)
+        connection_ids = self.connection_ids
+        connection_ids[:] = mapping.map_connection_ids(connection_ids)
+
+        # Provisional ids followed every registered id, merged ids need not
+        for fields, ids in ((self._node_fields, self.node_ids), (self._connection_fields, connection_ids)):
+            order = np.argsort(ids, kind='stable')
+            for field in fields:
+                array = self._array(field)
+                array[:] = array[order]
+
+        self._fingerprint = None
+        self._network_plan = None
+        self._network_plan_built = False
+
+    def register_innovations(self, registry):
+        ''' Renumbers a genome bred with another registry, e.g. one of another
+            island, to the ids of registry. Input and output nodes are
+            numbered alike by every registry initialized with the same
+            topology and keep their ids. Hidden nodes and connections are
+            identified by their structure and registered if registry does not
+            know them yet.
+        '''
+        node_ids = {}
+        for innovation_id, input_node_id, output_node_id, node_type in zip(self.node_ids.tolist(),
+                                                                            self.node_input_ids.tolist(),
+                                                                            self.node_output_ids.tolist(),
+                                                                            self.node_types.tolist()):
+            node_type = NodeType(node_type)
+            if node_type in (NodeType.INPUT, NodeType.OUTPUT):
+                if registry.get_node_structure(innovation_id) is not node_type:
+                    raise RuntimeError('Genome does not share the input and output nodes of the registry')
+                node_ids[innovation_id] = innovation_id
+                continue
+
+            # Split connections connect nodes with lower ids, which are
+            # therefore already renumbered
+            if input_node_id not in node_ids or output_node_id not in node_ids:
+                raise RuntimeError('Invalid node structure')
+            node_ids[innovation_id] = registry.register_node((node_ids[input_node_id], node_ids[output_node_id]), node_type)
+
+        connection_ids = {}
+        for innovation_id, input_node_id, output_node_id in zip(self.connection_ids.tolist(),
+                                                                self.connection_input_ids.tolist(),
+                                                                self.connection_output_ids.tolist()):
+            connection_ids[innovation_id] = registry.register_connection((node_ids[input_node_id], node_ids[output_node_id]))
+
+        # Every id is treated as provisional, ids missing from the genome are
+        # never looked up
+        mapping = InnovationMapping(0, [node_ids.get(i, 0) for i in range(1, max(node_ids, default=0) + 1)],
+                                    0, [connection_ids.get(i, 0) for i in range(1, max(connection_ids, default=0) + 1)])
+        self.translate_innovations(mapping)
+
+    def _build_arrays(self):
+        arrays = {}
+        offset = self._header.size
+        for field in self._node_fields:
+            arrays[field] = np.frombuffer(self._buffer, np.int64, self._num_nodes, offset)
+            offset += 8 * self._num_nodes
+
+        for field in self._connection_fields:
+            dtype = np.float64 if field == 'weights' else np.int64
+            arrays[field] = np.frombuffer(self._buffer, dtype, self._num_connections, offset)
+            offset += 8 * self._num_connections
+
+        return arrays
+
+    def _array(self, field):
+        # The field arrays are views into the buffer, created on first access
+        # so that copies which are never read stay cheap
+        if self._arrays is None:
+            self._arrays = self._build_arrays()
+
+        return self._arrays[field]
+
+    def __reduce__(self):
+        return (CompactGenome.from_bytes, (self.to_bytes(),))
+
+    @property
+    def node_ids(self):
+        return self._array('node_ids')
+
+    @property
+    def node_input_ids(self):
+        return self._array('node_input_ids')
+
+    @property
+    def node_output_ids(self):
+        return self._array('node_output_ids')
+
+    @property
+    def node_types(self):
+        return self._array('node_types')
+
+    @property
+    def node_activations(self):
+        return self._array('node_activations')
+
+    @property
+    def connection_ids(self):
+        return self._array('connection_ids')
+
+    @property
+    def connection_input_ids(self):
+        return self._array('connection_input_ids')
+
+    @property
+    def connection_output_ids(self):
+        return self._array('connection_output_ids')
+
+    @property
+    def weights(self):
+        return self._array('weights')
+
+    @property
+    def enabled(self):
+        return self._array('enabled')
+
+    @property
+    def buffer(self):
+        return self._buffer
+
+    @property
+    def nbytes(self):
+        return len(self._buffer)
+
+    @property
+    def num_node_genes(self):
+        return self._num_nodes
+
+    @property
+    def num_connection_genes(self):
+        return self._num_connections
+
+    @property
+    def num_enabled_connection_genes(self):
+        return int(np.count_nonzero(self.enabled))
+
+    @property
+    def node_genes(self):
+        return [CompactNodeGene(self, i) for i in range(self._num_nodes)]
+
+    @property
+    def connection_genes(self):
+        return [CompactConnectionGene(self, i) for i in range(self._num_connections)]
+
+    @property
+    def fingerprint(self):
+        ''' Returns a hash of the buffer, cached until a gene is modified
+            through a gene accessor.
+        '''
+        if self._fingerprint is None:
+            self._fingerprint = hash(bytes(self._buffer))
+
+        return self._fingerprint
+
+    @property
+    def network_plan(self):
+        ''' Returns the NetworkPlan of the enabled connections, or None if they
+            contain a cycle, cached until an enabled state is modified.
+        '''
+        if not self._network_plan_built:
+            self._network_plan = NetworkPlan.build(self)
+            self._network_plan_built = True
+
+        return self._network_plan
+
+    def generate_copy(self):
+        genome_copy = CompactGenome(bytearray(self._buffer))
+        genome_copy._network_plan = self._network_plan
+        genome_copy._network_plan_built = self._network_plan_built
+
+        return genome_copy
+
+    def compatibilty(self, other, threshold=None):
+        ''' Returns the compatibility distance to other using the coefficients
+            of Genotype. If a threshold is given, the weight term is skipped
+            once the excess and disjoint terms reach it.
+        '''
+        ids1 = self.connection_ids
+        ids2 = other.connection_ids
+        _, idx1, idx2 = np.intersect1d(ids1, ids2, assume_unique=True, return_indices=True)
+        larger_genotype_size = max(len(ids1), len(ids2))
+        N = larger_genotype_size if larger_genotype_size >= 20 else 1
+
+        if not len(ids1) or not len(ids2):
+            num_excess = len(ids1) + len(ids2)
+        else:
+            num_excess = int(np.count_nonzero(ids1 > ids2[-1]) + np.count_nonzero(ids2 > ids1[-1]))
+        num_disjoint = len(ids1) + len(ids2) - 2 * len(idx1) - num_excess
+
+        distance = Genotype.excess_coeff * num_excess / N + Genotype.disjoint_coeff * num_disjoint / N
+        if threshold is not None and distance >= threshold:
+            return distance
+
+        total_weight_diff = float(np.abs(self.weights[idx1] - other.weights[idx2]).sum())
+        return distance + Genotype.weight_coeff * total_weight_diff / len(idx1)
+
+    def favored_crossover(self, other, rng=None):
+        ''' Returns the offspring of this genome, the favored parent, and other
+            without mutating it. The offspring inherits every gene of this
+            genome. Matching genes take the average weight of both parents and
+            the enabled state of a randomly chosen one, and disabled genes are
+            re-enabled with Genotype.reenable_chance.
+
+            rng is a numpy Generator, seeded from the random module by default.
+        '''
+        if rng is None:
+            rng = np.random.default_rng(rand.getrandbits(64))
+
+        offspring = self.generate_copy()
+        _, idx1, idx2 = np.intersect1d(self.connection_ids, other.connection_ids, assume_unique=True, return_indices=True)
+        offspring.weights[idx1] = (self.weights[idx1] + other.weights[idx2]) / 2
+
+        from_other = rng.random(len(idx1)) < 0.5
+        offspring.enabled[idx1[from_other]] = other.enabled[idx2[from_other]]
+
+        disabled = np.flatnonzero(offspring.enabled == 0)
+        offspring.enabled[disabled] = rng.random(len(disabled)) < Genotype.reenable_chance
+
+        if not np.array_equal(offspring.enabled, self.enabled):
+            offspring._network_plan = None
+            offspring._network_plan_built = False
+
+        return offspring
+
+
+class CompactNodeGene:
+    ''' Read-only NodeGene accessor for a gene stored in a CompactGenome.
+    '''
+    __slots__ = ('_genome', '_index')
+
+    def __init__(self, genome, index):
+        self._genome = genome
+        self._index = index
+
+    @property
+    def genotype(self):
+        return self._genome
+
+    @property
+    def innovation_id(self):
+        return int(self._genome.node_ids[self._index])
+
+    @property
+    def input_node_id(self):
+        return int(self._genome.node_input_ids[self._index]) or None
+
+    @property
+    def output_node_id(self):
+        return int(self._genome.node_output_ids[self._index]) or None
+
+    @property
+    def structure(self):
+        return (self.input_node_id, self.output_node_id)
+
+    @property
+    def node_type(self):
+        return NodeType(int(self._genome.node_types[self._index]))
+
+    @property
+    def activation(self):
+        return Activation(int(self._genome.node_activations[self._index]))
+
+
+class CompactConnectionGene:
+    ''' ConnectionGene accessor for a gene stored in a CompactGenome. Weight
+        and enabled state are written through to the genome's buffer.
+    '''
+    __slots__ = ('_genome', '_index')
+
+    def __init__(self, genome, index):
+        self._genome = genome
+        self._index = index
+
+    @property
+    def genotype(self):
+        return self._genome
+
+    @property
+    def innovation_id(self):
+        return int(self._genome.connection_ids[self._index])
+
+    @property
+    def input_node_id(self):
+        return int(self._genome.connection_input_ids[self._index])
+
+    @property
+    def output_node_id(self):
+        return int(self._genome.connection_output_ids[self._index])
+
+    @property
+    def structure(self):
+        return (self.input_node_id, self.output_node_id)
+
+    @property
+    def weight(self):
+        return float(self._genome.weights[self._index])
+
+    @weight.setter
+    def weight(self, weight):
+        self._genome.weights[self._index] = weight
+        self._genome._fingerprint = None
+
+    @property
+    def enabled(self):
+        return bool(self._genome.enabled[self._index])
+
+    @enabled.setter
+    def enabled(self, enabled):
+        self._genome.enabled[self._index] = enabled
+        self._genome._fingerprint = None
+        self._genome._network_plan = None
+        self._genome._network_plan_built = False
@@ -0,0 +1,48 @@
+from neat.utils.lru import LRUCache
+
+
+class CompatibilityCache:
+    ''' Memoizes compatibility distances by genotype fingerprint, so that
+        unchanged genotypes, such as cloned champions and species
+        representatives, are only compared once across generations.
+
+        Distances cut short by a threshold are stored as lower bounds and are
+        reused for any threshold they still rule out.
+
+        Most keys pair short lived offspring and are never hit again, so
+        max_size should only cover a few generations of comparisons.
+    '''
+    def __init__(self, max_size=100000):
+        self._distances = LRUCache(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._distances)
+
+    def distance(self, genotype, other, threshold=None):
+        key = (genotype.fingerprint, other.fingerprint)
+        cached = self._distances.get(key)
+        if cached is not None:
+            distance, exact = cached
+            if exact or (threshold is not None and distance >= threshold):
+                self.hits += 1
+                return distance
+
+        self.misses += 1
+        distance, exact = genotype._compatibility(other, threshold)
+        self._distances.put(key, (distance, exact))
+
+        return distance
+
+    def distances(self, agents, representatives, threshold=None):
+        ''' Returns a list with one row per agent of its distances to each of
+            the representative genotypes.
+        '''
+        return [[self.distance(agent.genotype, representative, threshold) for representative in representatives] 
+                for agent in agents]
+
+    def clear(self):
+        self._distances.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,140 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from neat.compact import CompactGenome
+from neat.phenotype import Phenotype
+from neat.agent import Agent
+from neat.utils.lru import LRUCache
+
+
+class SerialEvaluator:
+    ''' Scores agents one after another in the current process.
+    '''
+    def evaluate(self, evaluate_agent, agents, datasets):
+        for agent, (inputs, outputs) in zip(agents, datasets):
+            evaluate_agent(agent, inputs, outputs)
+
+    def close(self):
+        pass
+
+
+class ParallelEvaluator:
+    ''' Scores agents on a pool of worker processes. Workers receive
+        CompactGenome buffers rather than agents, rebuild the network and send
+        back the fitness, error_sum, classification_error, iterations and
+        behavior of each agent.
+
+        evaluate_agent must be picklable, e.g. a module-level function or a
+        functools.partial of one.
+    '''
+    def __init__(self, num_workers):
+        self._num_workers = num_workers
+        self._executor = None
+
+    @property
+    def num_workers(self):
+        return self._num_workers
+
+    def evaluate(self, evaluate_agent, agents, datasets):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._num_workers)
+
+        genomes = [CompactGenome.from_genotype(agent.genotype) for agent in agents]
+        inputs = [inputs for inputs, _ in datasets]
+        outputs = [outputs for _, outputs in datasets]
+        chunksize = max(1, len(agents) // (4 * self._num_workers))
+        results = self._executor.map(_evaluate_genome,
+                                     repeat(evaluate_agent),
+                                     repeat(Phenotype.default_stabilization_method),
+                                     genomes,
+                                     inputs,
+                                     outputs,
+                                     chunksize=chunksize)
+
+        for agent, (fitness, error_sum, classification_error, iterations, behavior) in zip(agents, results):
+            agent.fitness = fitness
+            agent.error_sum = error_sum
+            agent.classification_error = classification_error
+            agent.iterations = iterations
+            agent.behavior = behavior
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class CachedEvaluator:
+    ''' Scores agents with evaluator unless an agent with the same
+        Genotype.evaluation_key has been scored before, e.g. a cloned
+        champion, in which case the cached fitness, error_sum,
+        classification_error and behavior are copied. Agents sharing a key within one call
+        are only scored once. Only valid for deterministic tasks.
+
+        hits and misses count the agents of the last call that were copied
+        and scored, respectively.
+    '''
+    def __init__(self, evaluator, max_size=10000):
+        self._evaluator = evaluator
+        self._results = LRUCache(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def evaluator(self):
+        return self._evaluator
+
+    def __len__(self):
+        return len(self._results)
+
+    def evaluate(self, evaluate_agent, agents, datasets):
+        self.hits = 0
+        self.misses = 0
+        scored_agents = []
+        scored_datasets = []
+        duplicates = []
+        scored_keys = {}
+        for agent, dataset in zip(agents, datasets):
+            key = agent.genotype.evaluation_key
+            result = self._results.get(key)
+            if result is not None:
+                self._apply(agent, result)
+                self.hits += 1
+            elif key in scored_keys:
+                duplicates.append((agent, scored_keys[key]))
+                self.hits += 1
+            else:
+                scored_keys[key] = agent
+                scored_agents.append(agent)
+                scored_datasets.append(dataset)
+                self.misses += 1
+
+        self._evaluator.evaluate(evaluate_agent, scored_agents, scored_datasets)
+        for agent in scored_agents:
+            self._results.put(agent.genotype.evaluation_key, self._result(agent))
+        for agent, scored_agent in duplicates:
+            self._apply(agent, self._result(scored_agent))
+
+    @staticmethod
+    def _result(agent):
+        return (agent.fitness, agent.error_sum, agent.classification_error, agent.behavior)
+
+    @staticmethod
+    def _apply(agent, result):
+        agent.fitness, agent.error_sum, agent.classification_error, agent.behavior = result
+        # No network was evaluated
+        agent.iterations = 0
+
+    def clear(self):
+        self._results.clear()
+
+    def close(self):
+        self._evaluator.close()
+
+
+def _evaluate_genome(evaluate_agent, stabilization_method, genome, inputs, outputs):
+    genotype = genome.to_genotype()
+    agent = Agent(genotype, stabilization_method)
+    evaluate_agent(agent, inputs, outputs)
+
+    return (agent.fitness, agent.error_sum, agent.classification_error, agent.iterations, agent.behavior)
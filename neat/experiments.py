@@ -1,21 +1,54 @@
 import random as rand
 import math
+import os
 import pickle
+from functools import partial
+
+import numpy as np
 
 from neat.population import Population
+from neat.genotype import Genotype
+from neat.hyperneat import Substrate
 from neat.agent import Agent
+from neat.evaluators import SerialEvaluator, ParallelEvaluator, CachedEvaluator
+from neat.breeders import ParallelBreeder
+from neat.checkpoint import save_checkpoint, load_checkpoint
+from neat.telemetry import ConsoleSink
 from neat.utils.timer import timer
+from neat.utils.profiler import PhaseProfiler, NullProfiler
 
 
 class Experiment:
-    def __init__(self, num_generations, population_size):
+    def __init__(self, num_generations, population_size, num_workers=1, profile=False, sinks=(), parallel_breeding=False, seed=None,
+                 novelty_search=None, evaluation_cache_size=None, agents_directory=None):
         self._num_generations = num_generations
-        self.population = Population(population_size)
+        self.sinks = list(sinks)
+        # Solutions are saved to agents_directory unless it is None
+        self.agents_directory = agents_directory
+        # Without a seed, runs draw from the random module
+        self.population = Population(population_size, seed)
         self._current_generation = 0
+        self.profiler = PhaseProfiler() if profile else NullProfiler()
+        self.population.profiler = self.profiler
+        if num_workers > 1:
+            self.evaluator = ParallelEvaluator(num_workers)
+        else:
+            self.evaluator = SerialEvaluator()
+        if evaluation_cache_size:
+            # Results of unchanged genotypes are reused, which is only valid
+            # if evaluate_agent is deterministic
+            self.evaluator = CachedEvaluator(self.evaluator, evaluation_cache_size)
+        if parallel_breeding:
+            # Breeding is parallel even with a single worker, so that results
+            # do not depend on num_workers
+            self.population.breeder = ParallelBreeder(num_workers)
+        # With a NoveltySearch, fitness is replaced by novelty after every
+        # evaluation, the objective is still recorded
+        self.novelty_search = novelty_search
 
-    def shuffle_data(self, inputs, outputs):
+    def shuffle_data(self, inputs, outputs, random=rand):
         data = [entry for entry in zip(inputs, outputs)]
-        rand.shuffle(data)
+        random.shuffle(data)
         inputs = [input_ for input_, output in data]
         outputs = [output for input_, output in data]
 
@@ -28,15 +61,68 @@ class Experiment:
     def epoch(self):
         raise NotImplementedError
 
+    def score_novelty(self):
+        ''' Sets the fitness of every agent to its novelty. Returns the
+            novelty of each agent.
+
+            evaluate_agent must record the behavior descriptor of every agent
+            in agent.behavior, a sequence of numbers of the same length for
+            every agent.
+        '''
+        agents = self.population.agents
+        return self.novelty_search.evaluate(agents, [agent.behavior for agent in agents])
+
     def print_generation_results(self):
         raise NotImplementedError
 
+    def write_generation_results(self):
+        ''' Passes the results of the finished generation to every sink.
+        '''
+        for sink in self.sinks:
+            sink.write(self._results)
+
+    @property
+    def results(self):
+        ''' Returns the results of the last evaluated generation.
+        '''
+        return self._results
+
+    @property
+    def current_generation(self):
+        return self._current_generation
+
+    def initialize(self):
+        raise NotImplementedError
+
+    def evaluate_generation(self, generation):
+        ''' Speciates and evaluates the agents of generation.
+        '''
+        raise NotImplementedError
+
+    def breed_generation(self):
+        ''' Replaces the evaluated agents by their offspring and passes the
+            results to the sinks.
+        '''
+        raise NotImplementedError
+
     def run(self):
         raise NotImplementedError
 
+    def close(self):
+        self.evaluator.close()
+        self.population.breeder.close()
+        for sink in self.sinks:
+            sink.close()
+
     def evaluate_agent(self, agent):
         raise NotImplementedError
 
+    def agent_evaluator(self):
+        ''' Returns a picklable callable equivalent to evaluate_agent for use
+            by evaluators running in other processes.
+        '''
+        raise NotImplementedError
+
     def save_agent(self, agent, filename):
         with open(filename, 'wb') as outfile:
             pickle.dump(agent, outfile)
@@ -47,10 +133,26 @@ class Experiment:
         
         return agent
 
+    def save_checkpoint(self, filename):
+        save_checkpoint(filename, self.population, self._current_generation)
+
+    def load_checkpoint(self, filename):
+        ''' Restores the population and global state saved by save_checkpoint.
+            A following call to run continues with the next generation.
+        '''
+        self._current_generation = load_checkpoint(filename, self.population)
+
 
 class XOR(Experiment):
-    def __init__(self, num_generations=50, population_size=150):
-        super().__init__(num_generations, population_size)
+    def __init__(self, num_generations=50, population_size=150, batch_evaluation=False, num_workers=1, profile=False, sinks=None,
+                 parallel_breeding=False, seed=None, novelty_search=None, evaluation_cache_size=None, agents_directory='xor_agents'):
+        # Results are printed unless other sinks are given
+        if sinks is None:
+            sinks = [ConsoleSink(XOR.format_generation_results)]
+
+        super().__init__(num_generations, population_size, num_workers, profile, sinks, parallel_breeding, seed, novelty_search,
+                         evaluation_cache_size, agents_directory)
+        self.batch_evaluation = batch_evaluation
         self.inputs = [[1, 0, 0],
                        [1, 0, 1],
                        [1, 1, 0],
@@ -60,10 +162,26 @@ class XOR(Experiment):
         self._results = {}
 
     def evaluate_agent(self, agent, inputs, outputs):
+        XOR.score_agent(agent, inputs, outputs, self.batch_evaluation)
+
+    def agent_evaluator(self):
+        return partial(XOR.score_agent, batch_evaluation=self.batch_evaluation)
+
+    @staticmethod
+    def score_agent(agent, inputs, outputs, batch_evaluation=False):
+        if batch_evaluation:
+            return XOR.score_agent_batch(agent, inputs, outputs)
+
         agent.error_sum = 0
         agent.classification_error = 0
+        agent.iterations = 0
+        # The behavior descriptor lists the outputs ordered by input, so that
+        # it does not depend on how the data was shuffled
+        behavior = {}
         for input_, expected_outputs in zip(inputs, outputs):
             net_outputs, net_error = agent.activate_network(input_)
+            agent.iterations += agent.phenotype.iteration_count
+            behavior[tuple(input_)] = net_outputs
             for net_output, expected_output in zip(net_outputs, expected_outputs):
                 agent.error_sum += abs(expected_output - net_output)
                 if net_output < 0.5 and expected_output == 1:
@@ -72,10 +190,35 @@ class XOR(Experiment):
                     agent.classification_error += 1
             agent.error_sum += net_error
 
+        agent.behavior = [output for _, net_outputs in sorted(behavior.items()) for output in net_outputs]
+        agent.fitness = max(0, 4 - agent.error_sum)
+
+    @staticmethod
+    def score_agent_batch(agent, inputs, outputs):
+        net_outputs, net_errors = agent.activate_batch(inputs)
+        XOR.score_outputs(agent, inputs, outputs, net_outputs, net_errors)
+        agent.iterations = agent.phenotype.iteration_count
+
+    @staticmethod
+    def score_outputs(agent, inputs, outputs, net_outputs, net_errors):
+        ''' Scores agent by net_outputs, an array with one row of network
+            outputs per input, and the errors the network reported for them.
+        '''
+        expected_outputs = np.asarray(outputs, dtype=float)
+        misclassified = (((net_outputs < 0.5) & (expected_outputs == 1)) 
+                         | ((net_outputs >= 0.5) & (expected_outputs == 0)))
+
+        agent.error_sum = float(np.abs(expected_outputs - net_outputs).sum() + net_errors.sum())
+        agent.classification_error = int(np.count_nonzero(misclassified))
+        order = sorted(range(len(inputs)), key=lambda i: inputs[i])
+        agent.behavior = net_outputs[order].ravel().tolist()
         agent.fitness = max(0, 4 - agent.error_sum)
 
     def reset_results(self):
         self._results = {}
+        # The profile record is filled in until the generation is finished,
+        # i.e. after the results have been printed
+        self._results['profile'] = self.profiler.record
         self._results['species'] = {}
         for species in self.population.species:
             self._results['species'][species.species_id] = {}
@@ -85,79 +228,159 @@ class XOR(Experiment):
         self._results['count'] = self.population.count
         self._results['species_count'] = self.population.species_count
         self._results['networks_evaluated'] = Agent.agents_created()
+        self._results['network_iterations'] = sum(agent.iterations for agent in self.population.agents)
 
         self._results['gen_champ'] = {'id': generation_champion.agent_id,
                                       'fitness': generation_champion.fitness,
                                       'adjusted_fitness': generation_champion.adjusted_fitness,
-                                      'hidden_nodes': len(generation_champion.phenotype.hidden_nodes),
+                                      'hidden_nodes': generation_champion.genotype.num_hidden_node_genes,
                                       'connections': generation_champion.genotype.num_enabled_connection_genes,
                                       'error_sum': generation_champion.error_sum,
                                       'classification_error': generation_champion.classification_error} 
 
         for species in self.population.species:
-            self._results['species'][species.species_id]['size'] = species.count
-            self._results['species'][species.species_id]['total'] = species.total_shared_fitness
-            self._results['species'][species.species_id]['max'] = species.max_shared_fitness
-            self._results['species'][species.species_id]['min'] = species.min_shared_fitness
-            self._results['species'][species.species_id]['avg'] = species.average_shared_fitness
-            self._results['species'][species.species_id]['champ_id'] = species.champion.agent_id
-            self._results['species'][species.species_id]['champ_error_sum'] = species.champion.error_sum
+            statistics = species.statistics()
+            self._results['species'][species.species_id]['size'] = statistics['size']
+            self._results['species'][species.species_id]['total'] = statistics['total']
+            self._results['species'][species.species_id]['max'] = statistics['max']
+            self._results['species'][species.species_id]['min'] = statistics['min']
+            self._results['species'][species.species_id]['avg'] = statistics['avg']
+            self._results['species'][species.species_id]['champ_id'] = statistics['champion'].agent_id
+            self._results['species'][species.species_id]['champ_error_sum'] = statistics['champion'].error_sum
 
-        if generation_champion.classification_error == 0:
-            self.save_agent(generation_champion, f'xor_agents/gen{self._current_generation}_id{generation_champion.agent_id}.pkl')
+        if self.agents_directory is not None and generation_champion.classification_error == 0:
+            filename = f'gen{self._current_generation}_id{generation_champion.agent_id}.pkl'
+            self.save_agent(generation_champion, os.path.join(self.agents_directory, filename))
 
     def epoch(self, inputs, outputs):
         self.reset_results()
 
+        datasets = []
+        streams = self.population.streams
         for agent in self.population.agents:
-            inputs, outputs = self.shuffle_data(inputs, outputs)
-            self.evaluate_agent(agent, inputs, outputs)
+            inputs, outputs = self.shuffle_data(inputs, outputs, streams.for_agent(agent.agent_id).random)
+            datasets.append((inputs, outputs))
+
+        self.evaluator.evaluate(self.agent_evaluator(), self.population.agents, datasets)
+        if isinstance(self.evaluator, CachedEvaluator):
+            self._results['evaluation_cache'] = {'hits': self.evaluator.hits, 'misses': self.evaluator.misses}
+        if self.novelty_search is not None:
+            novelty = self.score_novelty()
+            self._results['max_novelty'] = float(novelty.max(initial=0))
+            self._results['archive_size'] = self.novelty_search.archive.size
 
         generation_champion = min(self.population.agents, key=lambda agent: agent.error_sum)
         self.record_generation_results(generation_champion)
         self.population.set_generation_champion(generation_champion)
 
     def print_generation_results(self):
-        print('******************************************* GENERATION RESULTS **************************************************')
-        print()
-        print(f'Generation {self._results["gen"]} -- '
-              f'Agents: {self._results["count"]} | '
-              f'Species: {self._results["species_count"]} | '
-              f'Networks Evaluated: {self._results["networks_evaluated"]}')
-        print()
-
-        species_res = [{'id': species_id, 'res': res} for species_id, res in sorted(self._results['species'].items())]
+        print(XOR.format_generation_results(self._results))
+
+    @staticmethod
+    def format_generation_results(results):
+        lines = ['******************************************* GENERATION RESULTS **************************************************',
+                 '',
+                 f'Generation {results["gen"]} -- '
+                 f'Agents: {results["count"]} | '
+                 f'Species: {results["species_count"]} | '
+                 f'Networks Evaluated: {results["networks_evaluated"]} | '
+                 f'Network Iterations: {results["network_iterations"]}',
+                 '']
+
+        species_res = [{'id': species_id, 'res': res} for species_id, res in sorted(results['species'].items())]
         total_shared_fitness = 0
         for species in species_res:
             total_shared_fitness += species['res']['total']
 
         for species in species_res:
-            print(f'Species {species["id"]} -- '
-                  f'Size: {species["res"]["size"]} | '
-                  f'Total: {species["res"]["total"]:.2f} | '
-                  f'Avg: {species["res"]["avg"]:.2f} | '
-                  f'Max: {species["res"]["max"]:.2f} | '
-                  f'Min: {species["res"]["min"]:.2f} | '
-                  f'Offspring Share: {100 * species["res"]["total"] / total_shared_fitness:.2f}% | '
-                  f'Champion ID: {species["res"]["champ_id"]} | '
-                  f'Champion Error Sum: {species["res"]["champ_error_sum"]:.2f}')
-
-        champ_res = self._results['gen_champ']
-        print()
-        print(f'Champion {champ_res["id"]} -- '
-              f'Error Sum: {champ_res["error_sum"]:.2f} | '
-              f'Classification Error: {champ_res["classification_error"]} | '
-              f'Hidden Nodes: {champ_res["hidden_nodes"]} | '
-              f'Connections: {champ_res["connections"]}')
-        print()
-        print('****************************************************************************************************************')
-        print()
+            lines.append(f'Species {species["id"]} -- '
+                         f'Size: {species["res"]["size"]} | '
+                         f'Total: {species["res"]["total"]:.2f} | '
+                         f'Avg: {species["res"]["avg"]:.2f} | '
+                         f'Max: {species["res"]["max"]:.2f} | '
+                         f'Min: {species["res"]["min"]:.2f} | '
+                         f'Offspring Share: {100 * species["res"]["total"] / total_shared_fitness:.2f}% | '
+                         f'Champion ID: {species["res"]["champ_id"]} | '
+                         f'Champion Error Sum: {species["res"]["champ_error_sum"]:.2f}')
 
-    def run(self):
+        champ_res = results['gen_champ']
+        lines += ['',
+                  f'Champion {champ_res["id"]} -- '
+                  f'Error Sum: {champ_res["error_sum"]:.2f} | '
+                  f'Classification Error: {champ_res["classification_error"]} | '
+                  f'Hidden Nodes: {champ_res["hidden_nodes"]} | '
+                  f'Connections: {champ_res["connections"]}',
+                  '',
+                  '****************************************************************************************************************',
+                  '']
+
+        return '\n'.join(lines)
+
+    def initialize(self):
         self.population.initialize_population(len(self.inputs[0]), 1)
-        for generation in range(1, self._num_generations + 1):
-            self._current_generation = generation
-            self.population.prepare_generation()
+
+    def evaluate_generation(self, generation):
+        self._current_generation = generation
+        self.profiler.start_generation(generation)
+        self.population.prepare_generation()
+        with self.profiler.phase('epoch'):
             self.epoch(self.inputs, self.outputs)
-            self.print_generation_results()
-            self.population.finish_generation()
+
+    def breed_generation(self):
+        self.population.finish_generation()
+        self.write_generation_results()
+
+    def run(self, checkpoint_interval=None, checkpoint_filename='xor.ckpt'):
+        if self._current_generation == 0:
+            self.initialize()
+        try:
+            for generation in range(self._current_generation + 1, self._num_generations + 1):
+                self.evaluate_generation(generation)
+                self.breed_generation()
+                if checkpoint_interval and generation % checkpoint_interval == 0:
+                    self.save_checkpoint(checkpoint_filename)
+        finally:
+            self.close()
+
+
+class SubstrateXOR(XOR):
+    ''' XOR solved by substrate networks whose weights are generated by the
+        evolved CPPNs, see Substrate. Agents carry CPPN genotypes, which are
+        decoded by substrate before every evaluation. By default the three
+        inputs lie on a row below a hidden row of three nodes and the output.
+
+        CPPNs only use several activation functions if
+        Genotype.hidden_activations is set, e.g. to Substrate.cppn_activations.
+    '''
+    def __init__(self, substrate=None, num_generations=50, population_size=150, num_workers=1, profile=False, sinks=None,
+                 parallel_breeding=False, seed=None, novelty_search=None, evaluation_cache_size=None, agents_directory='xor_agents'):
+        super().__init__(num_generations, population_size, False, num_workers, profile, sinks, parallel_breeding, seed,
+                         novelty_search, evaluation_cache_size, agents_directory)
+        if substrate is None:
+            substrate = Substrate([[[-1, -1], [0, -1], [1, -1]],
+                                   [[-1, 0], [0, 0], [1, 0]],
+                                   [[0, 1]]])
+        if substrate.num_inputs != len(self.inputs[0]) or substrate.num_outputs != len(self.outputs[0]):
+            raise RuntimeError('Substrate does not match the XOR inputs and outputs')
+
+        self.substrate = substrate
+
+    def evaluate_agent(self, agent, inputs, outputs):
+        SubstrateXOR.score_cppn(self.substrate, agent, inputs, outputs)
+
+    def agent_evaluator(self):
+        return partial(SubstrateXOR.score_cppn, self.substrate)
+
+    @staticmethod
+    def score_cppn(substrate, agent, inputs, outputs):
+        network = substrate.build(agent.genotype)
+        net_outputs = network.evaluate_batch(inputs)
+        XOR.score_outputs(agent, inputs, outputs, net_outputs, np.zeros(len(inputs)))
+        # A single vectorized pass over the substrate
+        agent.iterations = 1
+
+    def initialize(self):
+        if Genotype.allow_recurrence:
+            raise RuntimeError('CPPNs must not be recurrent')
+
+        self.substrate.initialize_population(self.population)
@@ -1,54 +1,58 @@
 from enum import Enum
 
+import numpy as np
+
 class NodeType(Enum):
     INPUT = 1
     HIDDEN = 2
     OUTPUT = 3
 
-class Gene:
-    def __init__(self, innovation_id, genotype, input_node_id, output_node_id):
-        self._innovation_id = innovation_id
-        self._genotype = genotype
-        self._input_node_id = input_node_id
-        self._output_node_id = output_node_id
-
-    @property
-    def innovation_id(self):
-        return self._innovation_id
+class Activation(Enum):
+    SIGMOID = 1 # steepened sigmoid, 1 / (1 + exp(-4.9x))
+    TANH = 2
+    RELU = 3
+    IDENTITY = 4
+    GAUSSIAN = 5 # exp(-x^2)
 
-    @property
-    def genotype(self):
-        return self._genotype
-
-    @property
-    def input_node_id(self):
-        return self._input_node_id
+class Gene:
+    __slots__ = ('innovation_id', 'genotype', 'input_node_id', 'output_node_id')
 
-    @property
-    def output_node_id(self):
-        return self._output_node_id
+    def __init__(self, innovation_id, genotype, input_node_id, output_node_id):
+        self.innovation_id = innovation_id
+        self.genotype = genotype
+        self.input_node_id = input_node_id
+        self.output_node_id = output_node_id
 
     @property
     def structure(self):
-        return (self._input_node_id, self._output_node_id)
+        return (self.input_node_id, self.output_node_id)
 
 
 class NodeGene(Gene):
-    def __init__(self, innovation_id, genotype, input_node_id, output_node_id, node_type):
-        super().__init__(innovation_id, genotype, input_node_id, output_node_id)
-        self._node_type = node_type
+    __slots__ = ('node_type', 'activation')
 
-    @property
-    def node_type(self):
-        return self._node_type
+    def __init__(self, innovation_id, genotype, input_node_id, output_node_id, node_type, activation=Activation.SIGMOID):
+        super().__init__(innovation_id, genotype, input_node_id, output_node_id)
+        self.node_type = node_type
+        self.activation = activation
 
 class ConnectionGene(Gene):
+    __slots__ = ('weight', 'enabled')
+
     def __init__(self, innovation_id, genotype, input_node_id, output_node_id, weight, enabled=True):
         super().__init__(innovation_id, genotype, input_node_id, output_node_id)
         self.weight = weight
         self.enabled = enabled
 
-class _GeneFactory:
+class InnovationRegistry:
+    ''' Hands out innovation ids, so that the same structural mutation gets
+        the same id in every genotype. Each experiment should use its own
+        registry; gene_factory is the default one.
+
+        Parallel breeding should not share a registry. Each task records its
+        innovations in a journal instead, and the journals are merged into
+        the registry in task order afterwards.
+    '''
     def __init__(self):
         self.reset()
 
@@ -85,44 +89,51 @@ class _GeneFactory:
             return None
 
     def get_node_structure(self, innovation_id):
-        if innovation_id <= self.get_num_nodes:
+        if innovation_id <= self.get_num_nodes():
             return self._node_list[innovation_id]
         else:
             return None
 
     def get_connection_structure(self, innovation_id):
-        if innovation_id <= self.get_num_connections:
+        if innovation_id <= self.get_num_connections():
             return self._connection_list[innovation_id]
         else:
             return None
-    
-    def create_node_gene(self, genotype, input_node_id, output_node_id, node_type):
-        structure = (input_node_id, output_node_id)
+
+    def register_node(self, structure, node_type):
         if self.node_innovation_exists(structure) and node_type not in (NodeType.INPUT, NodeType.OUTPUT):
-            innovation_id = self.get_node_id(structure)
-        else:
-            self._node_list.append(node_type)
-            innovation_id = self.get_num_nodes()
-            self._node_dict[structure] = innovation_id
+            return self.get_node_id(structure)
+
+        self._node_list.append(node_type)
+        innovation_id = self.get_num_nodes()
+        self._node_dict[structure] = innovation_id
 
-        return NodeGene(innovation_id, genotype, input_node_id, output_node_id, node_type)
+        return innovation_id
+
+    def register_connection(self, structure):
+        if self.connection_innovation_exists(structure):
+            return self.get_connection_id(structure)
+
+        self._connection_list.append(structure)
+        innovation_id = self.get_num_connections()
+        self._connection_dict[structure] = innovation_id
+
+        return innovation_id
+    
+    def create_node_gene(self, genotype, input_node_id, output_node_id, node_type, activation=Activation.SIGMOID):
+        innovation_id = self.register_node((input_node_id, output_node_id), node_type)
+        return NodeGene(innovation_id, genotype, input_node_id, output_node_id, node_type, activation)
 
     def copy_node_gene(self, node_gene):
         return NodeGene(node_gene.innovation_id, 
                         node_gene.genotype,
                         node_gene.input_node_id, 
                         node_gene.output_node_id, 
-                        node_gene.node_type)
+                        node_gene.node_type,
+                        node_gene.activation)
 
     def create_connection_gene(self, genotype, input_node_id, output_node_id, weight, enabled=True):
-        structure = (input_node_id, output_node_id)
-        if self.connection_innovation_exists(structure):
-            innovation_id = self.get_connection_id(structure)
-        else:
-            self._connection_list.append(structure)
-            innovation_id = self.get_num_connections()
-            self._connection_dict[structure] = innovation_id
-
+        innovation_id = self.register_connection((input_node_id, output_node_id))
         return ConnectionGene(innovation_id, genotype, input_node_id, output_node_id, weight, enabled)
 
     def copy_connection_gene(self, connection_gene):
@@ -139,5 +150,165 @@ class _GeneFactory:
     def connection_innovation_exists(self, structure):
         return structure in self._connection_dict
 
+    def journal(self):
+        return InnovationJournal(self)
+
+    def merge(self, journal):
+        ''' Registers the innovations recorded by journal, in the order they
+            were recorded, and returns an InnovationMapping from its
+            provisional ids to the registered ones. Innovations that another
+            journal merged earlier registered as well get the same id.
+        '''
+        node_ids = []
+        for input_node_id, output_node_id, node_type in journal.nodes:
+            structure = (journal.resolve_node(input_node_id, node_ids), journal.resolve_node(output_node_id, node_ids))
+            node_ids.append(self.register_node(structure, node_type))
+
+        connection_ids = []
+        for input_node_id, output_node_id in journal.connections:
+            structure = (journal.resolve_node(input_node_id, node_ids), journal.resolve_node(output_node_id, node_ids))
+            connection_ids.append(self.register_connection(structure))
+
+        return InnovationMapping(journal.node_base, node_ids, journal.connection_base, connection_ids)
+
+
+class InnovationJournal(InnovationRegistry):
+    ''' Records the innovations of one breeding task without modifying the
+        registry it was created from. Structures known to the registry keep
+        their ids, new ones get provisional ids following the last id of the
+        registry, which are replaced once the journal is merged.
+
+        Journals only read the ids their registry had when they were created,
+        so they can be used while other journals are merged, from other
+        threads, or pickled along with the registry to other processes.
+        Pickled journals leave their registry behind, they can still be
+        merged but no longer record innovations.
+    '''
+    def __init__(self, registry):
+        self._registry = registry
+        self._node_base = registry.get_num_nodes()
+        self._connection_base = registry.get_num_connections()
+        super().__init__()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_registry'] = None
+        return state
+
+    @property
+    def node_base(self):
+        return self._node_base
+
+    @property
+    def connection_base(self):
+        return self._connection_base
+
+    @property
+    def nodes(self):
+        ''' Returns the recorded node innovations as (input node id, output
+            node id, node type) tuples, in order of their provisional ids.
+        '''
+        return [structure + (node_type,) for structure, node_type in zip(self._node_structures, self._node_list[1:])]
+
+    @property
+    def connections(self):
+        return self._connection_list[1:]
+
+    def reset(self):
+        super().reset()
+        self._node_structures = []
+
+    def get_num_nodes(self):
+        return self._node_base + len(self._node_list) - 1
+
+    def get_num_connections(self):
+        return self._connection_base + len(self._connection_list) - 1
+
+    # Innovations merged into the registry after the journal was created are
+    # ignored, their ids may collide with provisional ones
+    def get_node_id(self, structure):
+        if structure in self._node_dict:
+            return self._node_dict[structure]
+
+        innovation_id = self._registry.get_node_id(structure)
+        return innovation_id if innovation_id is not None and innovation_id <= self._node_base else None
+
+    def get_connection_id(self, structure):
+        if structure in self._connection_dict:
+            return self._connection_dict[structure]
+
+        innovation_id = self._registry.get_connection_id(structure)
+        return innovation_id if innovation_id is not None and innovation_id <= self._connection_base else None
+
+    def get_node_structure(self, innovation_id):
+        if innovation_id <= self._node_base:
+            return self._registry.get_node_structure(innovation_id)
+        elif innovation_id <= self.get_num_nodes():
+            return self._node_list[innovation_id - self._node_base]
+        else:
+            return None
+
+    def get_connection_structure(self, innovation_id):
+        if innovation_id <= self._connection_base:
+            return self._registry.get_connection_structure(innovation_id)
+        elif innovation_id <= self.get_num_connections():
+            return self._connection_list[innovation_id - self._connection_base]
+        else:
+            return None
+
+    def node_innovation_exists(self, structure):
+        return self.get_node_id(structure) is not None
+
+    def connection_innovation_exists(self, structure):
+        return self.get_connection_id(structure) is not None
+
+    def register_node(self, structure, node_type):
+        innovation_id = super().register_node(structure, node_type)
+        if innovation_id > self._node_base + len(self._node_structures):
+            self._node_structures.append(structure)
+
+        return innovation_id
+
+    def resolve_node(self, node_id, node_ids):
+        # Provisional node ids are replaced by the ids registered so far
+        if node_id is not None and node_id > self._node_base:
+            return node_ids[node_id - self._node_base - 1]
+
+        return node_id
+
+    def journal(self):
+        raise RuntimeError('Journals cannot be nested')
+
+    def merge(self, journal):
+        raise RuntimeError('Journals cannot be merged into journals')
+
+
+class InnovationMapping:
+    ''' Maps the provisional ids of a merged journal to registered ids. Ids
+        up to the bases of the journal are left unchanged.
+    '''
+    def __init__(self, node_base, node_ids, connection_base, connection_ids):
+        self._node_base = node_base
+        self._node_ids = np.array([0] + node_ids, dtype=np.int64)
+        self._connection_base = connection_base
+        self._connection_ids = np.array([0] + connection_ids, dtype=np.int64)
+
+    @property
+    def empty(self):
+        return len(self._node_ids) == 1 and len(self._connection_ids) == 1
+
+    def map_node_ids(self, node_ids):
+        return self._map(node_ids, self._node_base, self._node_ids)
+
+    def map_connection_ids(self, connection_ids):
+        return self._map(connection_ids, self._connection_base, self._connection_ids)
+
+    @staticmethod
+    def _map(ids, base, mapped_ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        provisional = ids > base
+        return np.where(provisional, mapped_ids[np.where(provisional, ids - base, 0)], ids)
+
 
-gene_factory = _GeneFactory()
+_GeneFactory = InnovationRegistry
+gene_factory = InnovationRegistry()
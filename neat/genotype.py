@@ -1,16 +1,26 @@
 import random as rand
 import time
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
 
-from neat.genes import NodeType, gene_factory
+import numpy as np
+
+from neat.genes import NodeType, Activation, gene_factory
+from neat.networks import NetworkPlan
 from neat.utils.timer import timer
-from neat.phenotype import Phenotype
-from neat.traits import Connection
+from neat.utils.rng import default_streams
+from neat.utils.content_key import ContentKey
 
 
 class Genotype:
     base_genotype = None
     mutate_starting_topologies = False
     allow_recurrence = False
+    batch_weight_mutation = False # defer weight mutations to a vectorized pass over the population
+    hidden_activation = Activation.SIGMOID # activation function of new hidden nodes
+    hidden_activations = () # if set, new hidden nodes draw their activation function from these, e.g. for CPPNs
+    activation_mutation_chance = 0.1 # chance a hidden node's activation function will be redrawn, if hidden_activations is set
+    output_activation = Activation.SIGMOID # activation function of output nodes
     
     weight_mutation_chance = 0.8 # chance a genotype's weights will be considered for mutation
     weight_mutation_rate = 0.9 # chance for each individual weight to be perturbed
@@ -38,53 +48,123 @@ class Genotype:
     disjoint_coeff = 1
     weight_coeff = 0.4
     
-    def __init__(self):
+    def __init__(self, registry=None, streams=None):
+        self._registry = registry if registry is not None else gene_factory
+        self._streams = streams if streams is not None else default_streams
         self._node_genes = []
         self._node_structures = set()
         self._connection_genes = []
         self._connection_structures = set()
-
-    def generate_copy(self):
-        genotype_copy = Genotype()
+        self._successors = {} # adjacency index over all connection genes, enabled or not
+        self._descendants = None # lazily computed transitive closure of _successors
+        self._fingerprint = None
+        self._evaluation_key = None
+        self._compatibility_genes = None
+        self._network_plan = None
+        self._network_plan_built = False
+        self._weight_mutation_pending = False
+
+    def generate_copy(self, streams=None):
+        genotype_copy = Genotype(self._registry, streams or self._streams)
         for node_gene in self._node_genes:
-            node_gene_copy = gene_factory.copy_node_gene(node_gene)
+            node_gene_copy = self._registry.copy_node_gene(node_gene)
             genotype_copy._node_genes.append(node_gene_copy)
             genotype_copy._node_structures.add(node_gene_copy.structure)
 
         for connection_gene in self._connection_genes:
-            connection_gene_copy = gene_factory.copy_connection_gene(connection_gene)
+            connection_gene_copy = self._registry.copy_connection_gene(connection_gene)
             genotype_copy._connection_genes.append(connection_gene_copy)
             genotype_copy._connection_structures.add(connection_gene_copy.structure)
+
+        for node_id, successors in self._successors.items():
+            genotype_copy._successors[node_id] = set(successors)
+
+        genotype_copy._fingerprint = self._fingerprint
+        genotype_copy._evaluation_key = self._evaluation_key
+        genotype_copy._compatibility_genes = self._compatibility_genes
+        genotype_copy._network_plan = self._network_plan
+        genotype_copy._network_plan_built = self._network_plan_built
                                                                           
         return genotype_copy
 
     @classmethod
-    def initialize_minimal_topology(cls, num_inputs, num_outputs):
-        cls.base_genotype = Genotype()
+    def minimal_topology(cls, num_inputs, num_outputs, registry=None, streams=None, output_activation=None):
+        ''' Returns a genotype connecting every input node to every output
+            node, without touching class level state.
+        '''
+        genotype = Genotype(registry, streams)
         input_nodes = []
         output_nodes = []
         for _ in range(num_inputs):
-            input_nodes.append(cls.base_genotype.create_node_gene(None, None, NodeType.INPUT))
+            input_nodes.append(genotype.create_node_gene(None, None, NodeType.INPUT))
 
         for _ in range(num_outputs):
-            output_nodes.append(cls.base_genotype.create_node_gene(None, None, NodeType.OUTPUT))
+            output_nodes.append(genotype.create_node_gene(None, None, NodeType.OUTPUT, output_activation))
 
 
         for i in range(len(input_nodes)):
             for j in range(len(output_nodes)):
                 input_node = input_nodes[i]
                 output_node = output_nodes[j]
-                cls.base_genotype.create_connection_gene(input_node.innovation_id, output_node.innovation_id, cls.generate_weight_modifier())
+                genotype.create_connection_gene(input_node.innovation_id, output_node.innovation_id, cls.generate_weight_modifier(genotype.streams.random))
+
+        return genotype
 
     @classmethod
-    def base_genotype_factory(cls):
-        new_genotype = cls.base_genotype.generate_copy()
-        if cls.mutate_starting_topologies:
+    def initialize_minimal_topology(cls, num_inputs, num_outputs, registry=None, streams=None, output_activation=None):
+        ''' Sets the class level base genotype used by base_genotype_factory.
+            Populations keep their own base genotype instead.
+        '''
+        cls.base_genotype = cls.minimal_topology(num_inputs, num_outputs, registry, streams, output_activation)
+
+    @classmethod
+    def base_genotype_factory(cls, defer_weight_mutation=False):
+        ''' Returns a starting genotype generated from the class level base
+            genotype.
+        '''
+        return cls.base_genotype.generate_starting_genotype(defer_weight_mutation)
+
+    def generate_starting_genotype(self, defer_weight_mutation=False):
+        ''' Returns a copy of this genotype with mutated weights, for the
+            first generation. If defer_weight_mutation is set, the mutation is
+            only requested, so the caller must follow up with
+            Population.mutate_weights when batch_weight_mutation is set.
+        '''
+        new_genotype = self.generate_copy()
+        if self.mutate_starting_topologies:
             new_genotype.attempt_topological_mutations()
-        new_genotype.mutate_weights()
+        if defer_weight_mutation:
+            new_genotype.request_weight_mutation()
+        else:
+            new_genotype.mutate_weights()
 
         return new_genotype
 
+    @property
+    def registry(self):
+        ''' Returns the InnovationRegistry the innovation ids of this genotype
+            come from.
+        '''
+        return self._registry
+
+    @registry.setter
+    def registry(self, registry):
+        ''' Sets the registry new innovations of this genotype and its
+            offspring are registered with.
+        '''
+        self._registry = registry
+
+    @property
+    def streams(self):
+        ''' Returns the RandomStreams the mutations of this genotype and its
+            offspring draw from.
+        '''
+        return self._streams
+
+    @streams.setter
+    def streams(self, streams):
+        self._streams = streams
+
     @property
     def node_genes(self):
         return self._node_genes
@@ -93,10 +173,65 @@ class Genotype:
     def connection_genes(self):
         return self._connection_genes
 
+    @property
+    def num_hidden_node_genes(self):
+        return len([gene for gene in self.node_genes if gene.node_type is NodeType.HIDDEN])
+
     @property
     def num_enabled_connection_genes(self):
         return len([gene for gene in self.connection_genes if gene.enabled])
 
+    @property
+    def fingerprint(self):
+        ''' Returns a ContentKey of all node and connection genes, including
+            weights and enabled states, so fingerprints are only equal if the
+            genes are. The key is cached until the genotype is modified
+            through its own methods, and is shared with copies.
+        '''
+        if self._fingerprint is None:
+            node_genes = tuple((gene.innovation_id, gene.node_type.value, gene.activation.value) for gene in self._node_genes)
+            connection_genes = tuple((gene.innovation_id, gene.weight, gene.enabled) for gene in self._connection_genes)
+            self._fingerprint = ContentKey((node_genes, connection_genes))
+
+        return self._fingerprint
+
+    @property
+    def evaluation_key(self):
+        ''' Returns a ContentKey of what determines the network of this
+            genotype: the types and activations of the nodes and the structure
+            and weights of the enabled connections. Genotypes that only differ
+            in disabled genes share a key. Cached like the fingerprint.
+        '''
+        if self._evaluation_key is None:
+            node_genes = tuple((gene.innovation_id, gene.node_type.value, gene.activation.value) for gene in self._node_genes)
+            connection_genes = tuple((gene.input_node_id, gene.output_node_id, gene.weight)
+                                     for gene in self._connection_genes if gene.enabled)
+            self._evaluation_key = ContentKey((node_genes, connection_genes))
+
+        return self._evaluation_key
+
+    @property
+    def network_plan(self):
+        ''' Returns the NetworkPlan of the enabled connections, or None if they
+            contain a cycle. The plan only depends on structure, so it is kept
+            through weight mutations and shared with copies.
+        '''
+        if not self._network_plan_built:
+            self._network_plan = NetworkPlan.build(self)
+            self._network_plan_built = True
+
+        return self._network_plan
+
+    def _invalidate(self):
+        self._fingerprint = None
+        self._evaluation_key = None
+        self._compatibility_genes = None
+
+    def _invalidate_structure(self):
+        self._invalidate()
+        self._network_plan = None
+        self._network_plan_built = False
+
     def node_structure_exists(self, structure):
         return structure in self._node_structures
 
@@ -104,6 +239,7 @@ class Genotype:
         return structure in self._connection_structures
 
     def mutate_weights(self):
+        random = self._streams.random
         for i, conn in enumerate(self._connection_genes):
             if i / len(self._connection_genes) < self.end_genotype_threshold:
                 mutation_chance = self.end_weight_mutation_rate
@@ -113,70 +249,145 @@ class Genotype:
                 mutation_chance = self.weight_mutation_rate
                 cold_mutation_chance = self.weight_cold_mutation_rate
 
-            weight_mod = self.generate_weight_modifier()
-            if rand.uniform(0, 1) < mutation_chance:
+            weight_mod = self.generate_weight_modifier(random)
+            if random.uniform(0, 1) < mutation_chance:
                 conn.weight += weight_mod
-            if rand.uniform(0, 1) < cold_mutation_chance:
+            if random.uniform(0, 1) < cold_mutation_chance:
                 conn.weight = weight_mod
             
             conn.weight = min(max(conn.weight, -self.weight_cap), self.weight_cap)
 
+        self._invalidate()
+
+    @property
+    def weight_mutation_pending(self):
+        return self._weight_mutation_pending
+
+    def request_weight_mutation(self):
+        ''' Mutates the weights of this genotype, or marks them for the next
+            call to mutate_weights_batch if batch_weight_mutation is set.
+        '''
+        if Genotype.batch_weight_mutation:
+            self._weight_mutation_pending = True
+        else:
+            self.mutate_weights()
+
+    @classmethod
+    def mutate_weights_batch(cls, genotypes, rng):
+        ''' Applies the pending weight mutations of genotypes in a single pass
+            over all of their weights, drawing from the numpy Generator rng.
+            Each weight is mutated as by mutate_weights.
+        '''
+        genotypes = [genotype for genotype in genotypes if genotype._weight_mutation_pending]
+        genes = [gene for genotype in genotypes for gene in genotype._connection_genes]
+        num_genes = len(genes)
+        weights = np.fromiter([gene.weight for gene in genes], float, num_genes)
+
+        # Position of every gene relative to the size of its genotype
+        sizes = np.array([len(genotype._connection_genes) for genotype in genotypes], dtype=int)
+        starts = np.repeat(np.cumsum(sizes) - sizes, sizes)
+        positions = (np.arange(num_genes) - starts) / np.repeat(sizes, sizes)
+        end_genes = positions < cls.end_genotype_threshold
+        mutation_chance = np.where(end_genes, cls.end_weight_mutation_rate, cls.weight_mutation_rate)
+        cold_mutation_chance = np.where(end_genes, cls.end_weight_cold_mutation_rate, cls.weight_cold_mutation_rate)
+
+        power = np.where(rng.random(num_genes) < cls.severe_weight_mut_chance, cls.severe_weight_mut_power, cls.weight_mut_power)
+        weight_mods = rng.uniform(-1, 1, num_genes) * power
+        weights = np.where(rng.random(num_genes) < mutation_chance, weights + weight_mods, weights)
+        weights = np.where(rng.random(num_genes) < cold_mutation_chance, weight_mods, weights)
+        np.clip(weights, -cls.weight_cap, cls.weight_cap, out=weights)
+
+        for gene, weight in zip(genes, weights.tolist()):
+            gene.weight = weight
+
+        for genotype in genotypes:
+            genotype._weight_mutation_pending = False
+            genotype._invalidate()
+
     @classmethod
-    def generate_weight_modifier(cls):
-        if rand.uniform(0, 1) < cls.severe_weight_mut_chance:
+    def generate_weight_modifier(cls, random=rand):
+        if random.uniform(0, 1) < cls.severe_weight_mut_chance:
             power = cls.severe_weight_mut_power
         else:
             power = cls.weight_mut_power
 
-        return rand.uniform(-1, 1) * power
+        return random.uniform(-1, 1) * power
+
+    @staticmethod
+    def _insert_gene(genes, gene):
+        # Genes usually arrive in innovation order, e.g. during crossover, in
+        # which case they can simply be appended
+        if not len(genes) or gene.innovation_id > genes[-1].innovation_id:
+            genes.append(gene)
+        else:
+            idx = bisect_left(genes, gene.innovation_id, key=attrgetter('innovation_id'))
+            genes.insert(idx, gene)
 
     def add_node_gene(self, node_gene):
-        idx = 0
-        for existing_gene in self._node_genes:
-            if node_gene.innovation_id > existing_gene.innovation_id:
-                idx += 1
-        self._node_genes.insert(idx, node_gene)
+        self._insert_gene(self._node_genes, node_gene)
         self._node_structures.add(node_gene.structure)
+        self._invalidate_structure()
+        if self._descendants is not None:
+            self._descendants.setdefault(node_gene.innovation_id, set())
 
     def add_connection_gene(self, connection_gene):
-        idx = 0
-        for existing_gene in self._connection_genes:
-            if connection_gene.innovation_id > existing_gene.innovation_id:
-                idx += 1
-        self._connection_genes.insert(idx, connection_gene)
+        self._insert_gene(self._connection_genes, connection_gene)
         self._connection_structures.add(connection_gene.structure)
-
-    def create_node_gene(self, input_node_id, output_node_id, node_type):
-        node_gene = gene_factory.create_node_gene(self, input_node_id, output_node_id, node_type)
+        self._invalidate_structure()
+
+        input_node_id, output_node_id = connection_gene.structure
+        self._successors.setdefault(input_node_id, set()).add(output_node_id)
+        if self._descendants is not None:
+            # Everything that reaches the input node now also reaches the
+            # output node and all of its descendants
+            reached = self._descendants.get(output_node_id, set()) | {output_node_id}
+            for node_id, descendants in self._descendants.items():
+                if node_id == input_node_id or input_node_id in descendants:
+                    descendants |= reached
+
+    def create_node_gene(self, input_node_id, output_node_id, node_type, activation=None):
+        if activation is None:
+            activation = Genotype.output_activation if node_type is NodeType.OUTPUT else Genotype.hidden_activation
+
+        node_gene = self._registry.create_node_gene(self, input_node_id, output_node_id, node_type, activation)
         self.add_node_gene(node_gene)
         return node_gene
 
     def create_connection_gene(self, input_node_id, output_node_id, weight, enabled=True):
-        connection_gene = gene_factory.create_connection_gene(self, input_node_id, output_node_id, weight, enabled)
+        connection_gene = self._registry.create_connection_gene(self, input_node_id, output_node_id, weight, enabled)
         self.add_connection_gene(connection_gene)
         return connection_gene
 
+    def _reachability(self):
+        ''' Returns a dict mapping each node id to the set of node ids
+            reachable from it through connection genes.
+        '''
+        if self._descendants is None:
+            self._descendants = {}
+            for node_gene in self._node_genes:
+                descendants = set()
+                stack = list(self._successors.get(node_gene.innovation_id, ()))
+                while len(stack):
+                    node_id = stack.pop()
+                    if node_id not in descendants:
+                        descendants.add(node_id)
+                        stack.extend(self._successors.get(node_id, ()))
+                self._descendants[node_gene.innovation_id] = descendants
+
+        return self._descendants
+
     def _recurrency_test(self, input_node_id, output_node_id):
+        ''' Returns True if a connection from input_node_id to output_node_id
+            may be added without creating a cycle. Disabled connections are
+            taken into account since they may be re-enabled later on.
+        '''
         if Genotype.allow_recurrence:
             return True
 
-        test_phenotype = Phenotype(self)
-        input_node = test_phenotype.get_node(input_node_id)
-        output_node = test_phenotype.get_node(output_node_id)
-        connection = Connection(None, input_node, output_node)
-
-        visited = set()
-        stack = [output_node]
-        while len(stack):
-            node = stack.pop()
-            if node not in visited:
-                if node is input_node:
-                    return False
-                visited.add(node)
-                for output_connnection in node.output_connections:
-                    stack.append(output_connnection.output_node)
-        
-        return True
+        if input_node_id == output_node_id:
+            return False
+
+        return input_node_id not in self._reachability().get(output_node_id, ())
 
     def attempt_node_mutation(self):
         conn_candidates = []
@@ -187,9 +398,12 @@ class Genotype:
         if not len(conn_candidates):
             return False
 
-        selected_conn = rand.choice(conn_candidates)
-        new_node = self.create_node_gene(selected_conn.input_node_id, selected_conn.output_node_id, NodeType.HIDDEN)
+        random = self._streams.random
+        selected_conn = random.choice(conn_candidates)
+        activation = random.choice(Genotype.hidden_activations) if Genotype.hidden_activations else None
+        new_node = self.create_node_gene(selected_conn.input_node_id, selected_conn.output_node_id, NodeType.HIDDEN, activation)
         selected_conn.enabled = False
+        self._invalidate_structure()
         new_input_conn = self.create_connection_gene(selected_conn.input_node_id, new_node.innovation_id, 1)
         new_output_conn = self.create_connection_gene(new_node.innovation_id, selected_conn.output_node_id, selected_conn.weight)
         return True
@@ -208,115 +422,168 @@ class Genotype:
                 output_bridge = (input_node.node_type is NodeType.OUTPUT 
                                  and output_node.node_type is NodeType.OUTPUT 
                                  and input_node is not output_node)
-                structure_exists = self.connection_structure_exists(structure)
-                recurrency_check = self._recurrency_test(input_node.innovation_id, output_node.innovation_id)
-                if not input_bridge and not output_bridge and not structure_exists and recurrency_check:
+                if input_bridge or output_bridge or self.connection_structure_exists(structure):
+                    continue
+                if self._recurrency_test(input_node.innovation_id, output_node.innovation_id):
                     structure_candidates.append(structure)
 
         if not len(structure_candidates):
             return False
 
-        selected_structure = rand.choice(structure_candidates)
+        random = self._streams.random
+        selected_structure = random.choice(structure_candidates)
         input_node_id, output_node_id = selected_structure
-        weight = self.generate_weight_modifier()
+        weight = self.generate_weight_modifier(random)
         self.create_connection_gene(input_node_id, output_node_id, weight)
         return True
 
     def attempt_topological_mutations(self):
-        if rand.uniform(0, 1) < Genotype.node_mutation_chance:
+        random = self._streams.random
+        if random.uniform(0, 1) < Genotype.node_mutation_chance:
             self.attempt_node_mutation()
-        if rand.uniform(0, 1) < Genotype.connection_mutation_chance:
+        if random.uniform(0, 1) < Genotype.connection_mutation_chance:
             self.attempt_connection_mutation()
 
     def attempt_all_mutations(self):
-        if rand.uniform(0, 1) < Genotype.node_mutation_chance:
+        random = self._streams.random
+        if random.uniform(0, 1) < Genotype.node_mutation_chance:
             self.attempt_node_mutation()
-        if rand.uniform(0, 1) < Genotype.connection_mutation_chance:
+        if random.uniform(0, 1) < Genotype.connection_mutation_chance:
             self.attempt_connection_mutation()
-        if rand.uniform(0, 1) < Genotype.weight_mutation_chance:
-            self.mutate_weights()
-        if rand.uniform(0, 1) < Genotype.toggle_chance:
+        if random.uniform(0, 1) < Genotype.weight_mutation_chance:
+            self.request_weight_mutation()
+        if random.uniform(0, 1) < Genotype.toggle_chance:
             self.mutate_connection_states()
+        if Genotype.hidden_activations and random.uniform(0, 1) < Genotype.activation_mutation_chance:
+            self.attempt_activation_mutation()
+
+    def attempt_activation_mutation(self):
+        ''' Gives a random hidden node another activation function of
+            hidden_activations.
+        '''
+        random = self._streams.random
+        candidates = [i for i, gene in enumerate(self._node_genes) if gene.node_type is NodeType.HIDDEN]
+        if not len(candidates):
+            return False
+
+        index = random.choice(candidates)
+        activations = [activation for activation in Genotype.hidden_activations if activation is not self._node_genes[index].activation]
+        if not len(activations):
+            return False
+
+        # Node genes may be shared with the parents of a crossover, so the
+        # gene is replaced rather than modified
+        node_gene = self._registry.copy_node_gene(self._node_genes[index])
+        node_gene.activation = random.choice(activations)
+        self._node_genes[index] = node_gene
+        self._invalidate_structure()
+        return True
 
     def mutate_connection_states(self):
+        toggled = False
+        random = self._streams.random
         for conn in self._connection_genes:
-            if rand.uniform(0, 1) < Genotype.toggle_mutation_rate:
+            if random.uniform(0, 1) < Genotype.toggle_mutation_rate:
                 conn.enabled = not conn.enabled
+                toggled = True
+
+        if toggled:
+            self._invalidate_structure()
 
     def attempt_reenable_connection_mutation(self):
         for conn in self._connection_genes:
             if not conn.enabled:
                 conn.enabled = True
+                self._invalidate_structure()
                 return True
 
         return False
 
     def inherit_connection_gene(self, gene):  
-        connection_gene = gene_factory.create_connection_gene(self, gene.input_node_id, gene.output_node_id, gene.weight, gene.enabled)      
+        connection_gene = self._registry.create_connection_gene(self, gene.input_node_id, gene.output_node_id, gene.weight, gene.enabled)      
         self.add_connection_gene(connection_gene)
 
         if not connection_gene.enabled:
-            connection_gene.enabled = rand.uniform(0, 1) < Genotype.reenable_chance
+            connection_gene.enabled = self._streams.random.uniform(0, 1) < Genotype.reenable_chance
+            self._invalidate_structure()
 
     def add_and_mutate_connection_gene(self, gene):  
-        connection_gene = gene_factory.create_connection_gene(self, gene.input_node_id, gene.output_node_id, gene.weight, gene.enabled)      
+        connection_gene = self._registry.create_connection_gene(self, gene.input_node_id, gene.output_node_id, gene.weight, gene.enabled)      
         self.add_connection_gene(connection_gene)
 
         if not connection_gene.enabled:
-            connection_gene.enabled = rand.uniform(0, 1) < Genotype.reenable_chance
+            connection_gene.enabled = self._streams.random.uniform(0, 1) < Genotype.reenable_chance
+            self._invalidate_structure()
 
-        weight_mod = self.generate_weight_modifier()
-        if rand.uniform(0, 1) < Genotype.weight_mutation_chance:
+        random = self._streams.random
+        weight_mod = self.generate_weight_modifier(random)
+        if random.uniform(0, 1) < Genotype.weight_mutation_chance:
             connection_gene.weight += weight_mod
-        elif rand.uniform(0, 1) < Genotype._weight_cold_mutation_chance:
+        elif random.uniform(0, 1) < Genotype._weight_cold_mutation_chance:
             connection_gene.weight = weight_mod
             
         connection_gene.weight = min(max(connection_gene.weight, -self.weight_cap), self.weight_cap)
+        self._invalidate()
+
+    def compatibilty(self, other, threshold=None):
+        ''' Returns the compatibility distance between this genotype and other.
+            If a threshold is given, the calculation stops as soon as the
+            distance is known to be at least threshold, in which case the
+            returned value is only a lower bound.
+        '''
+        distance, _ = self._compatibility(other, threshold)
+        return distance
+
+    def _compatibility_index(self):
+        # Sorted innovation ids and a mapping from innovation id to weight,
+        # cached alongside the fingerprint
+        if self._compatibility_genes is None:
+            innovation_ids = [gene.innovation_id for gene in self._connection_genes]
+            weights = {gene.innovation_id: gene.weight for gene in self._connection_genes}
+            self._compatibility_genes = (innovation_ids, weights)
+
+        return self._compatibility_genes
+
+    def _compatibility(self, other, threshold=None):
+        ''' Returns a tuple of the compatibility distance and whether it is
+            exact, i.e. the calculation was not stopped early.
+        '''
+        ids1, weights1 = self._compatibility_index()
+        ids2, weights2 = other._compatibility_index()
+        larger_genotype_size = max(len(ids1), len(ids2))
+        N = larger_genotype_size if larger_genotype_size >= 20 else 1
 
-    def compatibilty(self, other):
-        num_disjoint = 0
-        num_excess = 0
-        num_matching = 0
-        total_weight_diff = 0
-        larger_genotype_size = max(len(self.connection_genes), len(other.connection_genes))
-        p1, p2 = 0, 0
+        # Genes beyond the last innovation of the other genotype are excess,
+        # every other unmatched gene is disjoint
+        matching = weights1.keys() & weights2.keys()
+        if not len(ids1) or not len(ids2):
+            num_excess = len(ids1) + len(ids2)
+        elif ids1[-1] > ids2[-1]:
+            num_excess = len(ids1) - bisect_right(ids1, ids2[-1])
+        else:
+            num_excess = len(ids2) - bisect_right(ids2, ids1[-1])
+        num_disjoint = len(ids1) + len(ids2) - 2 * len(matching) - num_excess
 
-        while p1 < len(self.connection_genes) or p2 < len(other.connection_genes):
-            if p1 >= len(self.connection_genes):
-                num_excess += 1
-                p2 += 1
-            elif p2 >= len(other.connection_genes):
-                num_excess += 1 
-                p1 += 1
-            else:
-                gene1 = self.connection_genes[p1]
-                gene2 = other._connection_genes[p2]
-                if gene1.innovation_id == gene2.innovation_id:
-                    num_matching += 1
-                    total_weight_diff += abs(gene1.weight - gene2.weight)
-                    p1 += 1
-                    p2 += 1
-                elif gene1.innovation_id < gene2.innovation_id:
-                    num_disjoint += 1
-                    p1 += 1
-                elif gene2.innovation_id < gene1.innovation_id:
-                    num_disjoint += 1
-                    p2 += 1
-                else:
-                    raise RuntimeError('Something went wrong')
-            
-        N = larger_genotype_size if larger_genotype_size >= 20 else 1
+        distance = self.excess_coeff * num_excess / N + self.disjoint_coeff * num_disjoint / N
+        if threshold is not None and distance >= threshold:
+            return (distance, False)
+
+        # Weight differences are summed in innovation order, as a merge of
+        # both gene lists would
+        total_weight_diff = 0
+        for innovation_id in sorted(matching):
+            total_weight_diff += abs(weights1[innovation_id] - weights2[innovation_id])
 
-        return (self.excess_coeff * num_excess / N + 
-                self.disjoint_coeff * num_disjoint / N + 
-                self.weight_coeff * total_weight_diff / num_matching)
+        return (distance + self.weight_coeff * total_weight_diff / len(matching), True)
 
-    def favored_crossover(self, other):
+    def favored_crossover(self, other, streams=None):
         num_disjoint = 0
         num_excess = 0
         num_matching = 0
-        offspring_genotype = Genotype()
+        offspring_genotype = Genotype(self._registry, streams or self._streams)
+        random = offspring_genotype.streams.random
         offspring_genotype._node_genes = self.node_genes[:]
+        offspring_genotype._node_structures = set(self._node_structures)
         p1, p2 = 0, 0
         while p1 < len(self.connection_genes) or p2 < len(other.connection_genes):
             if p1 >= len(self.connection_genes):
@@ -331,9 +598,10 @@ class Genotype:
                 gene2 = other.connection_genes[p2]
                 if gene1.innovation_id == gene2.innovation_id:
                     num_matching += 1
-                    chosen_gene = rand.choice([gene1, gene2])
+                    chosen_gene = random.choice([gene1, gene2])
                     offspring_genotype.inherit_connection_gene(chosen_gene)
                     offspring_genotype._connection_genes[-1].weight = (gene1.weight + gene2.weight) / 2
+                    offspring_genotype._invalidate()
                     p1 += 1
                     p2 += 1
                 elif gene1.innovation_id < gene2.innovation_id:
@@ -344,11 +612,19 @@ class Genotype:
                     num_disjoint += 1
                     p2 += 1
 
+        # The offspring has the node and connection genes of this genotype, so
+        # unless an enabled state changed the plan carries over and the
+        # mutations below only invalidate it on structural changes
+        if all(gene.enabled == offspring_gene.enabled 
+               for gene, offspring_gene in zip(self._connection_genes, offspring_genotype._connection_genes)):
+            offspring_genotype._network_plan = self._network_plan
+            offspring_genotype._network_plan_built = self._network_plan_built
+
         offspring_genotype.attempt_all_mutations()
 
         return offspring_genotype
                 
-    def copy_and_mutate(self):
-        genotype_copy = self.generate_copy()
+    def copy_and_mutate(self, streams=None):
+        genotype_copy = self.generate_copy(streams)
         genotype_copy.attempt_all_mutations()
         return genotype_copy
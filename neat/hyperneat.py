@@ -0,0 +1,153 @@
+import numpy as np
+
+from neat.activations import Activations
+from neat.genes import Activation
+from neat.phenotype import Phenotype, StabilizationMethod
+
+
+class Substrate:
+    ''' Geometric layout of a layered network whose weights are generated by
+        a CPPN, a genotype queried with the coordinates of two nodes.
+
+        layers holds one array of node coordinates per layer, the first being
+        the input layer and the last the output layer. Every node of a layer
+        is connected to every node of the next one. The CPPN has 2 * d + 1
+        inputs, the coordinates of the source and target node followed by a
+        constant 1, and one output per pair of consecutive layers. Its
+        outputs should lie in [-1, 1], e.g. by using tanh output nodes.
+
+        Outputs whose magnitude is below weight_threshold give no connection,
+        the others are scaled to [-max_weight, max_weight]. Biases are
+        provided by constant inputs, as in XOR.
+
+        CPPNs must be acyclic, i.e. evolved with Genotype.allow_recurrence
+        off. Geometric regularities come from hidden nodes with different
+        activation functions, which are drawn from cppn_activations if
+        Genotype.hidden_activations is set to them.
+    '''
+    cppn_activations = (Activation.SIGMOID, Activation.TANH, Activation.GAUSSIAN, Activation.IDENTITY)
+    weight_threshold = 0.2
+    max_weight = 5.0
+    query_chunk_size = 1 << 16 # number of node pairs evaluated by one batch
+
+    def __init__(self, layers, hidden_activation=Activation.SIGMOID, output_activation=Activation.SIGMOID):
+        self._layers = [np.atleast_2d(np.asarray(coordinates, dtype=float)) for coordinates in layers]
+        if len(self._layers) < 2:
+            raise RuntimeError('A substrate requires an input and an output layer')
+        if len({coordinates.shape[1] for coordinates in self._layers}) != 1:
+            raise RuntimeError('All layers must have the same number of dimensions')
+
+        self._hidden_activation = hidden_activation
+        self._output_activation = output_activation
+
+    @staticmethod
+    def grid(*shape):
+        ''' Returns the coordinates of a grid of the given shape spanning
+            [-1, 1] in every dimension, one row per node.
+        '''
+        axes = [np.linspace(-1, 1, size) if size > 1 else np.zeros(1) for size in shape]
+        return np.stack([axis.ravel() for axis in np.meshgrid(*axes, indexing='ij')], axis=1)
+
+    @property
+    def layers(self):
+        return self._layers
+
+    @property
+    def dimensions(self):
+        return self._layers[0].shape[1]
+
+    @property
+    def num_inputs(self):
+        return len(self._layers[0])
+
+    @property
+    def num_outputs(self):
+        return len(self._layers[-1])
+
+    @property
+    def num_cppn_inputs(self):
+        return 2 * self.dimensions + 1
+
+    @property
+    def num_cppn_outputs(self):
+        return len(self._layers) - 1
+
+    def initialize_population(self, population):
+        ''' Initializes population with minimal CPPNs for this substrate, with
+            tanh output nodes.
+        '''
+        population.initialize_population(self.num_cppn_inputs, self.num_cppn_outputs, Activation.TANH)
+
+    def query(self, cppn, index):
+        ''' Returns the raw CPPN outputs for the connections from layer index
+            to layer index + 1 as a source x target matrix.
+        '''
+        sources = self._layers[index]
+        targets = self._layers[index + 1]
+        num_pairs = len(sources) * len(targets)
+        pairs = np.empty((num_pairs, self.num_cppn_inputs))
+        pairs[:, :self.dimensions] = np.repeat(sources, len(targets), axis=0)
+        pairs[:, self.dimensions:-1] = np.tile(targets, (len(sources), 1))
+        pairs[:, -1] = 1
+
+        outputs = np.empty(num_pairs)
+        for start in range(0, num_pairs, Substrate.query_chunk_size):
+            chunk_outputs, _ = cppn.evaluate_batch(pairs[start:start + Substrate.query_chunk_size])
+            outputs[start:start + len(chunk_outputs)] = chunk_outputs[:, index]
+
+        return outputs.reshape(len(sources), len(targets))
+
+    @staticmethod
+    def scale_weights(outputs):
+        magnitude = np.abs(outputs)
+        threshold = Substrate.weight_threshold
+        scaled = (magnitude - threshold) / (1 - threshold) * Substrate.max_weight
+        return np.where(magnitude >= threshold, np.sign(outputs) * np.minimum(scaled, Substrate.max_weight), 0)
+
+    def build(self, genotype):
+        ''' Returns the SubstrateNetwork encoded by the CPPN genotype. The CPPN
+            is queried with one vectorized pass per chunk of node pairs.
+        '''
+        if genotype.network_plan is None:
+            raise RuntimeError('CPPNs must not be recurrent')
+
+        cppn = Phenotype(genotype, StabilizationMethod.FEED_FORWARD)
+        weights = [self.scale_weights(self.query(cppn, i)) for i in range(self.num_cppn_outputs)]
+        activations = [self._hidden_activation] * (len(weights) - 1) + [self._output_activation]
+
+        return SubstrateNetwork(weights, activations)
+
+
+class SubstrateNetwork:
+    ''' Layered network with dense weight matrices, as decoded from a
+        Substrate. Each layer is one matrix product followed by a vectorized
+        activation function.
+    '''
+    def __init__(self, weights, activations):
+        self._weights = weights
+        self._activations = activations
+        self._functions = [Activations.batch_function(activation) for activation in activations]
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @property
+    def num_connections(self):
+        return sum(int(np.count_nonzero(weights)) for weights in self._weights)
+
+    def evaluate(self, inputs):
+        return self.evaluate_batch([inputs])[0].tolist()
+
+    def evaluate_batch(self, inputs):
+        ''' Evaluates every row of the 2D array-like inputs at once. Returns an
+            array with one row of outputs per input row.
+        '''
+        values = np.asarray(inputs, dtype=float)
+        if values.ndim != 2 or values.shape[1] != self._weights[0].shape[0]:
+            raise RuntimeError('Invalid input')
+
+        for weights, function in zip(self._weights, self._functions):
+            values = function(values @ weights)
+
+        return values
@@ -0,0 +1,227 @@
+import argparse
+import multiprocessing
+import time
+from enum import Enum
+from functools import partial
+
+from neat.compact import CompactGenome
+from neat.experiments import XOR
+from neat.telemetry import ConsoleSink
+from neat.utils.rng import RandomStreams
+
+
+class Topology(Enum):
+    RING = 1 # island i sends its migrants to island i + 1
+    RANDOM = 2 # every island sends its migrants to a randomly chosen other island
+
+
+class IslandModel:
+    ''' Evolves num_islands experiments, each in its own process, and lets the
+        best agents of every island migrate to another island every
+        migration_interval generations.
+
+        experiment_factory is a picklable callable taking a seed and
+        returning an experiment such as XOR. Migrants are sent as
+        CompactGenome buffers. Every island starts from the same minimal
+        topology, so input and output nodes have the same ids everywhere,
+        while later innovations are renumbered by structure when migrants
+        arrive. Each island gets its own seed, drawn from seed if given and
+        from the random module otherwise.
+    '''
+    def __init__(self, num_islands, experiment_factory, num_generations, migration_interval=5, num_migrants=2,
+                 topology=Topology.RING, seed=None, sinks=()):
+        if num_islands < 1:
+            raise RuntimeError('At least one island is required')
+        if num_generations < 1:
+            raise RuntimeError('At least one generation is required')
+
+        self._num_islands = num_islands
+        self._experiment_factory = experiment_factory
+        self._num_generations = num_generations
+        self._migration_interval = migration_interval
+        self._num_migrants = num_migrants
+        self._topology = topology
+        self._streams = RandomStreams(seed)
+        self.sinks = list(sinks)
+
+    @property
+    def num_islands(self):
+        return self._num_islands
+
+    def destinations(self):
+        ''' Returns the index of the island the migrants of each island are
+            sent to.
+        '''
+        if self._num_islands == 1:
+            return [0]
+
+        if self._topology is Topology.RING:
+            return [(i + 1) % self._num_islands for i in range(self._num_islands)]
+        elif self._topology is Topology.RANDOM:
+            random = self._streams.random
+            destinations = []
+            for i in range(self._num_islands):
+                destination = random.randrange(self._num_islands - 1)
+                destinations.append(destination if destination < i else destination + 1)
+            return destinations
+        else:
+            raise RuntimeError('Unrecognized topology')
+
+    def run(self):
+        ''' Runs every island for num_generations generations. Returns the
+            results of every island after the last generation. If an island
+            fails, the other islands are terminated and a RuntimeError naming
+            the failed island is raised.
+        '''
+        seeds = [self._streams.for_island(i).random.getrandbits(64) for i in range(self._num_islands)]
+        connections = []
+        processes = []
+        completed = False
+        try:
+            for i, seed in enumerate(seeds):
+                connection, island_connection = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_run_island,
+                                                  args=(island_connection, self._experiment_factory, seed, self._num_generations,
+                                                        self._migration_interval, self._num_migrants))
+                process.start()
+                # Only the island keeps its end open, so that recv raises
+                # EOFError once the island exits
+                island_connection.close()
+                connections.append(connection)
+                processes.append(process)
+
+            start_time = time.perf_counter()
+            while True:
+                messages = [_receive(i, connection) for i, connection in enumerate(connections)]
+                results = [island_results for _, island_results in messages]
+                self.write_results(results, time.perf_counter() - start_time)
+                if messages[0][0] is None:
+                    break
+
+                immigrants = [[] for _ in range(self._num_islands)]
+                for (migrants, _), destination in zip(messages, self.destinations()):
+                    immigrants[destination] += migrants
+                for connection, island_immigrants in zip(connections, immigrants):
+                    connection.send(island_immigrants)
+
+            completed = True
+        finally:
+            # Islands still waiting for immigrants would never exit
+            if not completed:
+                for connection in connections:
+                    connection.close()
+                for process in processes:
+                    process.terminate()
+            for process in processes:
+                process.join()
+            for sink in self.sinks:
+                sink.close()
+
+        return results
+
+    def write_results(self, results, delta_t):
+        generation = results[0]['gen']
+        record = {'gen': generation,
+                  'islands': results,
+                  'time': delta_t,
+                  'generations_per_second': self._num_islands * generation / delta_t if delta_t > 0 else None}
+        for sink in self.sinks:
+            sink.write(record)
+
+    @staticmethod
+    def format_results(record):
+        lines = [f'Generation {record["gen"]} -- '
+                 f'Islands: {len(record["islands"])} | '
+                 f'Generations/s: {record["generations_per_second"] or 0:.2f}']
+        for i, results in enumerate(record['islands']):
+            lines.append(f'Island {i} -- '
+                         f'Species: {results["species_count"]} | '
+                         f'Champion Fitness: {results["gen_champ"]["fitness"]:.2f} | '
+                         f'Error Sum: {results["gen_champ"]["error_sum"]:.2f} | '
+                         f'Hidden Nodes: {results["gen_champ"]["hidden_nodes"]} | '
+                         f'Connections: {results["gen_champ"]["connections"]}')
+        lines.append('')
+
+        return '\n'.join(lines)
+
+
+def select_migrants(population, num_migrants):
+    ''' Returns the CompactGenome buffers of the num_migrants fittest agents.
+    '''
+    agents = sorted(population.agents, key=lambda agent: agent.fitness, reverse=True)[:num_migrants]
+    return [CompactGenome.from_genotype(agent.genotype).to_bytes() for agent in agents]
+
+
+def receive_migrants(population, migrants):
+    ''' Renumbers the migrant genomes to the registry of population and
+        replaces offspring of population by them.
+    '''
+    genotypes = []
+    for data in migrants:
+        genome = CompactGenome.from_bytes(data)
+        genome.register_innovations(population.registry)
+        genotypes.append(genome.to_genotype(population.registry, population.streams))
+
+    population.immigrate(genotypes)
+
+
+def _receive(index, connection):
+    try:
+        return connection.recv()
+    except EOFError:
+        raise RuntimeError(f'Island {index} failed') from None
+
+
+def _run_island(connection, experiment_factory, seed, num_generations, migration_interval, num_migrants):
+    experiment = experiment_factory(seed=seed)
+    experiment.initialize()
+    results = {}
+    try:
+        for generation in range(1, num_generations + 1):
+            experiment.evaluate_generation(generation)
+            results = {key: value for key, value in experiment.results.items() if key != 'profile'}
+            # Migrants are the fittest evaluated agents, they are selected
+            # before the population is replaced by offspring
+            migrate = generation % migration_interval == 0 and generation < num_generations
+            if migrate:
+                migrants = select_migrants(experiment.population, num_migrants)
+            experiment.breed_generation()
+            if migrate:
+                connection.send((migrants, results))
+                receive_migrants(experiment.population, connection.recv())
+
+        connection.send((None, results))
+    finally:
+        experiment.close()
+        connection.close()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m neat.islands',
+                                     description='Evolves XOR on several islands, one process each, with periodic migration.')
+    parser.add_argument('--islands', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--generations', type=int, default=50)
+    parser.add_argument('--population-size', type=int, default=150, help='number of agents per island')
+    parser.add_argument('--migration-interval', type=int, default=5)
+    parser.add_argument('--migrants', type=int, default=2, help='number of agents each island sends per migration')
+    parser.add_argument('--topology', choices=[topology.name.lower() for topology in Topology], default='ring')
+    parser.add_argument('--seed', type=int)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    config = parse_args(argv)
+    islands = IslandModel(config.islands,
+                          partial(XOR, population_size=config.population_size, sinks=[]),
+                          config.generations,
+                          config.migration_interval,
+                          config.migrants,
+                          Topology[config.topology.upper()],
+                          config.seed,
+                          [ConsoleSink(IslandModel.format_results)])
+    islands.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,498 @@
+import numpy as np
+
+from neat.genes import NodeType
+from neat.activations import Activations
+
+
+class NetworkPlan:
+    ''' Weight independent part of a FeedForwardNetwork. Sources refer to
+        connection genes by position, so a plan stays valid while the node
+        genes and the enabled states of the connection genes are unchanged,
+        and weight mutations only require binding the new weights.
+    '''
+    def __init__(self, num_inputs, output_slots, program, activations, layers, num_slots, complete):
+        self._num_inputs = num_inputs
+        self._output_slots = output_slots
+        self._program = program
+        self._activations = activations
+        self._layers = layers
+        self._num_slots = num_slots
+        self._complete = complete
+
+    @classmethod
+    def build(cls, genotype):
+        ''' Returns a NetworkPlan for genotype, or None if its enabled
+            connections contain a cycle.
+        '''
+        input_ids = []
+        outer_ids = []
+        output_ids = []
+        activations = {}
+        for gene in genotype.node_genes:
+            if gene.node_type is NodeType.INPUT:
+                input_ids.append(gene.innovation_id)
+            else:
+                outer_ids.append(gene.innovation_id)
+                activations[gene.innovation_id] = gene.activation
+                if gene.node_type is NodeType.OUTPUT:
+                    output_ids.append(gene.innovation_id)
+
+        # Connections into input nodes have no effect since input activations
+        # are overwritten by every call, so they are left out of the plan.
+        inputs = set(input_ids)
+        incoming = {node_id: [] for node_id in outer_ids}
+        outgoing = {node_id: [] for node_id in input_ids + outer_ids}
+        for i, gene in enumerate(genotype.connection_genes):
+            if gene.enabled and gene.output_node_id not in inputs:
+                incoming[gene.output_node_id].append((gene.input_node_id, i))
+                outgoing[gene.input_node_id].append(gene.output_node_id)
+
+        order = cls._topological_order(outer_ids, incoming, outgoing, inputs)
+        if order is None:
+            return None
+
+        # Nodes that cannot be reached from an input node are never activated
+        # by the iterative method, so their activation stays at 0.
+        reachable = set(input_ids)
+        for node_id in order:
+            for input_node_id, _ in incoming[node_id]:
+                if input_node_id in reachable:
+                    reachable.add(node_id)
+                    break
+
+        # Output nodes are placed in the trailing slots so that an output node
+        # feeding another output node still has a slot when sources are resolved.
+        slots = {node_id: i for i, node_id in enumerate(input_ids)}
+        output_set = set(output_ids)
+        slot_order = [node_id for node_id in order if node_id not in output_set] + output_ids
+        for i, node_id in enumerate(slot_order):
+            slots[node_id] = len(input_ids) + i
+
+        # Each node is placed in the layer matching the longest path leading
+        # to it, so every layer only depends on the layers before it.
+        depths = cls._longest_paths(order, incoming, reachable)
+        program = []
+        program_activations = []
+        layers = [[] for _ in range(max(depths.values(), default=0))]
+        for node_id in order:
+            if node_id in reachable:
+                sources = [(slots[input_node_id], i) for input_node_id, i in incoming[node_id]]
+                layers[depths[node_id] - 1].append(len(program))
+                program.append((slots[node_id], sources))
+                program_activations.append(activations[node_id])
+
+        return cls(len(input_ids),
+                   [slots[node_id] for node_id in output_ids],
+                   program,
+                   program_activations,
+                   layers,
+                   len(input_ids) + len(outer_ids),
+                   len(reachable) == len(input_ids) + len(outer_ids))
+
+    @staticmethod
+    def _topological_order(outer_ids, incoming, outgoing, inputs):
+        in_degree = {node_id: 0 for node_id in outer_ids}
+        for node_id in outer_ids:
+            for input_node_id, _ in incoming[node_id]:
+                if input_node_id not in inputs:
+                    in_degree[node_id] += 1
+
+        ready = [node_id for node_id in reversed(outer_ids) if in_degree[node_id] == 0]
+        order = []
+        while len(ready):
+            node_id = ready.pop()
+            order.append(node_id)
+            for output_node_id in outgoing[node_id]:
+                in_degree[output_node_id] -= 1
+                if in_degree[output_node_id] == 0:
+                    ready.append(output_node_id)
+
+        if len(order) != len(outer_ids):
+            return None
+
+        return order
+
+    @staticmethod
+    def _longest_paths(order, incoming, reachable):
+        depths = {}
+        for node_id in order:
+            if node_id in reachable:
+                depths[node_id] = 1 + max([depths.get(input_node_id, 0) for input_node_id, _ in incoming[node_id]])
+
+        return depths
+
+    @property
+    def num_inputs(self):
+        return self._num_inputs
+
+    @property
+    def output_slots(self):
+        return self._output_slots
+
+    @property
+    def program(self):
+        ''' Returns a list of (slot, sources) pairs in evaluation order, where
+            sources holds (source slot, connection gene position) pairs.
+        '''
+        return self._program
+
+    @property
+    def activations(self):
+        ''' Returns the Activation of each node of the program.
+        '''
+        return self._activations
+
+    @property
+    def layers(self):
+        ''' Returns the program positions of the nodes in each layer.
+        '''
+        return self._layers
+
+    @property
+    def num_slots(self):
+        return self._num_slots
+
+    @property
+    def complete(self):
+        ''' Returns True if every hidden and output node is reachable from an
+            input node, otherwise returns False.
+        '''
+        return self._complete
+
+    @property
+    def depth(self):
+        ''' Returns the number of nodes on the longest path from an input node.
+        '''
+        return len(self._layers)
+
+
+class FeedForwardNetwork:
+    ''' Network for an acyclic genotype. The enabled connections are
+        topologically sorted once, after which every node is evaluated exactly
+        once per input instead of relaxing the whole graph repeatedly.
+    '''
+    def __init__(self, plan, weights):
+        self._plan = plan
+        self._num_inputs = plan.num_inputs
+        self._output_slots = plan.output_slots
+        self._program = [(slot, [(source, weights[i]) for source, i in sources], Activations.function(activation))
+                         for (slot, sources), activation in zip(plan.program, plan.activations)]
+        self._values = [0] * plan.num_slots
+        self._weight_layers = None
+
+    @classmethod
+    def compile(cls, genotype):
+        ''' Returns a FeedForwardNetwork for genotype, or None if its enabled
+            connections contain a cycle. The plan cached by the genotype is
+            reused, so only the current weights are bound.
+        '''
+        plan = genotype.network_plan
+        if plan is None:
+            return None
+
+        return cls(plan, [gene.weight for gene in genotype.connection_genes])
+
+    @property
+    def plan(self):
+        return self._plan
+
+    @property
+    def complete(self):
+        ''' Returns True if every hidden and output node is reachable from an
+            input node, otherwise returns False.
+        '''
+        return self._plan.complete
+
+    @property
+    def depth(self):
+        ''' Returns the number of nodes on the longest path from an input node.
+        '''
+        return self._plan.depth
+
+    def evaluate(self, inputs):
+        if type(inputs) not in (list, tuple):
+            inputs = [inputs]
+
+        if len(inputs) != self._num_inputs:
+            raise RuntimeError('Invalid input')
+
+        values = self._values
+        values[:self._num_inputs] = inputs
+        for slot, sources, function in self._program:
+            aggregate_input = 0
+            for source, weight in sources:
+                aggregate_input += weight * values[source]
+            values[slot] = function(aggregate_input)
+
+        return [values[slot] for slot in self._output_slots]
+
+    def _build_weight_layers(self):
+        weight_layers = []
+        activations = self._plan.activations
+        for layer in self._plan.layers:
+            # Nodes are grouped by activation, so that each group is activated
+            # by one vectorized call
+            columns = {}
+            for j, i in enumerate(layer):
+                columns.setdefault(activations[i], []).append(j)
+            functions = [(np.array(group), Activations.batch_function(activation)) for activation, group in columns.items()]
+
+            layer = [self._program[i] for i in layer]
+            source_slots = sorted({source for _, sources, _ in layer for source, _ in sources})
+            source_index = {source: i for i, source in enumerate(source_slots)}
+            weights = np.zeros((len(source_slots), len(layer)))
+            for j, (_, sources, _) in enumerate(layer):
+                for source, weight in sources:
+                    weights[source_index[source], j] += weight
+
+            target_slots = np.array([slot for slot, _, _ in layer])
+            weight_layers.append((np.array(source_slots, dtype=int), weights, target_slots, functions))
+
+        return weight_layers
+
+    def evaluate_batch(self, inputs):
+        ''' Evaluates every row of the 2D array-like inputs at once. Returns an
+            array with one row of outputs per input row.
+        '''
+        inputs = np.asarray(inputs, dtype=float)
+        if inputs.ndim != 2 or inputs.shape[1] != self._num_inputs:
+            raise RuntimeError('Invalid input')
+
+        if self._weight_layers is None:
+            self._weight_layers = self._build_weight_layers()
+
+        values = np.zeros((inputs.shape[0], self._plan.num_slots))
+        values[:, :self._num_inputs] = inputs
+        for source_slots, weights, target_slots, functions in self._weight_layers:
+            aggregate_inputs = values[:, source_slots] @ weights
+            if len(functions) == 1:
+                values[:, target_slots] = functions[0][1](aggregate_inputs)
+                continue
+
+            for columns, function in functions:
+                values[:, target_slots[columns]] = function(aggregate_inputs[:, columns])
+
+        return values[:, self._output_slots]
+
+
+class RecurrentNetwork:
+    ''' Network for any genotype, evaluated like the node graph of Phenotype
+        but with arrays. The enabled connections are compiled into a sparse
+        weight matrix in CSR form, so every pass is one sparse matrix-vector
+        product followed by vectorized activation functions.
+
+        The activations, activation counts and active flags of the nodes are
+        kept between calls of activate, so sequences can be fed one step at
+        a time. flush resets them like Phenotype.flush, reset clears them all.
+    '''
+    def __init__(self, genotype, abort_limit=30, abort_penalty=1000):
+        self._abort_limit = abort_limit
+        self._abort_penalty = abort_penalty
+
+        input_ids = []
+        hidden_ids = []
+        output_ids = []
+        activations = {}
+        for gene in genotype.node_genes:
+            if gene.node_type is NodeType.INPUT:
+                input_ids.append(gene.innovation_id)
+            else:
+                activations[gene.innovation_id] = gene.activation
+                if gene.node_type is NodeType.OUTPUT:
+                    output_ids.append(gene.innovation_id)
+                else:
+                    hidden_ids.append(gene.innovation_id)
+        outer_ids = hidden_ids + output_ids
+
+        # Inputs occupy the first slots, followed by the hidden and output
+        # nodes in the order of Phenotype.outer_nodes
+        self._num_inputs = len(input_ids)
+        self._num_nodes = len(outer_ids)
+        slots = {node_id: i for i, node_id in enumerate(input_ids + outer_ids)}
+        self._output_positions = np.arange(len(hidden_ids), len(outer_ids))
+
+        # Connections into input nodes have no effect and are left out.
+        # Entries are kept in gene order, which is the order the node graph
+        # sums them in.
+        sources = []
+        targets = []
+        weights = []
+        for gene in genotype.connection_genes:
+            if gene.enabled and slots[gene.output_node_id] >= self._num_inputs:
+                sources.append(slots[gene.input_node_id])
+                targets.append(slots[gene.output_node_id] - self._num_inputs)
+                weights.append(gene.weight)
+        sources = np.array(sources, dtype=int)
+        targets = np.array(targets, dtype=int)
+        order = np.argsort(targets, kind='stable')
+        self._indptr = np.searchsorted(targets[order], np.arange(self._num_nodes + 1))
+        self._indices = sources[order]
+        self._data = np.array(weights, dtype=float)[order]
+        self._rows = targets[order]
+
+        # A node is active in a pass if one of its sources is an input node or
+        # active. The node graph updates the flags in node order, so sources
+        # before a node pass on their new flag and the others their old one.
+        from_outer = self._indices >= self._num_inputs
+        positions = self._indices - self._num_inputs
+        self._fed = np.zeros(self._num_nodes, dtype=bool)
+        self._fed[self._rows[~from_outer]] = True
+        forward = from_outer & (positions < self._rows)
+        backward = from_outer & (positions > self._rows)
+        self._forward_sources, self._forward_targets = positions[forward], self._rows[forward]
+        self._backward_sources, self._backward_targets = positions[backward], self._rows[backward]
+        self._outer_sources, self._outer_targets = positions[from_outer], self._rows[from_outer]
+
+        groups = {}
+        for i, node_id in enumerate(outer_ids):
+            groups.setdefault(activations[node_id], []).append(i)
+        self._groups = [(np.array(group, dtype=int), Activations.batch_function(activation))
+                        for activation, group in groups.items()]
+
+        self.reset()
+
+    @classmethod
+    def compile(cls, genotype, abort_limit=30, abort_penalty=1000):
+        return cls(genotype, abort_limit, abort_penalty)
+
+    @property
+    def num_inputs(self):
+        return self._num_inputs
+
+    @property
+    def indptr(self):
+        return self._indptr
+
+    @property
+    def indices(self):
+        ''' Returns the source slots of the weights, where inputs occupy the
+            first slots.
+        '''
+        return self._indices
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def activations(self):
+        ''' Returns the activations of the hidden and output nodes.
+        '''
+        return self._values[self._num_inputs:]
+
+    @property
+    def outputs(self):
+        return self._values[self._num_inputs + self._output_positions].tolist()
+
+    @property
+    def all_active(self):
+        return bool(np.all(self._counts > 0))
+
+    def stable(self, threshold=1E-9):
+        ''' Returns True if no node changed by more than threshold when it was
+            last activated.
+        '''
+        return bool(np.all(np.abs(self.activations - self._previous) <= threshold))
+
+    def reset(self):
+        self._values = np.zeros(self._num_inputs + self._num_nodes)
+        self._previous = np.zeros(self._num_nodes)
+        self._counts = np.zeros(self._num_nodes, dtype=int)
+        self._active = np.zeros(self._num_nodes, dtype=bool)
+        self._active_settled = False
+
+    def activate(self, inputs):
+        ''' Relaxes the network once for inputs, i.e. repeats passes until
+            every node has been activated at least once. Returns the abort
+            penalty if that takes more than abort_limit passes, otherwise 0.
+        '''
+        if type(inputs) not in (list, tuple):
+            inputs = [inputs]
+
+        if len(inputs) != self._num_inputs:
+            raise RuntimeError('Invalid input')
+
+        values = self._values
+        values[:self._num_inputs] = inputs
+        num_inputs = self._num_inputs
+        initial_pass = True
+        abort_count = 0
+        while initial_pass or not self.all_active:
+            abort_count += 1
+            if abort_count > self._abort_limit:
+                return self._abort_penalty
+
+            # Sums are accumulated in entry order, like the node graph does
+            aggregate_inputs = np.bincount(self._rows, self._data * values[self._indices], self._num_nodes)
+            active = self._update_active()
+            if active is None:
+                self._previous[:] = values[num_inputs:]
+                for group, function in self._groups:
+                    values[num_inputs + group] = function(aggregate_inputs[group])
+                self._counts += 1
+            else:
+                self._previous[active] = values[num_inputs + active]
+                for group, function in self._groups:
+                    group = group[self._active[group]]
+                    values[num_inputs + group] = function(aggregate_inputs[group])
+                self._counts[active] += 1
+
+            initial_pass = False
+
+        return 0
+
+    def _update_active(self):
+        # Returns the positions of the active nodes, or None if all are
+        if not self._active_settled:
+            active = self._fed.copy()
+            active[self._backward_targets[self._active[self._backward_sources]]] = True
+            while True:
+                propagated = active.copy()
+                propagated[self._forward_targets[active[self._forward_sources]]] = True
+                if np.array_equal(propagated, active):
+                    break
+                active = propagated
+
+            # The flags only depend on the previous ones, so once they repeat
+            # they stay the same
+            self._active_settled = np.array_equal(active, self._active)
+            self._active = active
+
+        if self._active.all():
+            return None
+
+        return np.flatnonzero(self._active)
+
+    def flush(self):
+        ''' Resets the activations and activation counts of the nodes that
+            Phenotype.flush resets: the output nodes and the activated nodes
+            leading to them through activated nodes.
+        '''
+        activated = self._counts > 0
+        visited = np.zeros(self._num_nodes, dtype=bool)
+        visited[self._output_positions] = True
+        frontier = visited.copy()
+        while True:
+            sources = self._outer_sources[frontier[self._outer_targets]]
+            frontier = np.zeros(self._num_nodes, dtype=bool)
+            frontier[sources[activated[sources] & ~visited[sources]]] = True
+            if not frontier.any():
+                break
+            visited |= frontier
+
+        flushed = visited & activated
+        self._values[self._num_inputs:][flushed] = 0
+        self._counts[flushed] = 0
+
+    def evaluate(self, inputs, iteration_limit=20):
+        ''' Relaxes the network iteration_limit times for inputs and flushes
+            it. Returns a tuple of the outputs and the accumulated error.
+        '''
+        error = 0
+        for _ in range(iteration_limit):
+            error += self.activate(inputs)
+
+        outputs = self.outputs
+        self.flush()
+
+        return (outputs, error)
@@ -0,0 +1,140 @@
+import numpy as np
+
+
+class NoveltyArchive:
+    ''' Bounded archive of behavior descriptors. Once capacity descriptors
+        are archived, every new one replaces the oldest.
+    '''
+    def __init__(self, capacity=50000):
+        self._capacity = capacity
+        self._descriptors = None
+        self._size = 0
+        self._next = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def descriptors(self):
+        ''' Returns the archived descriptors, one per row, in no particular
+            order.
+        '''
+        if self._descriptors is None:
+            return np.zeros((0, 0))
+
+        return self._descriptors[:self._size]
+
+    def add(self, descriptors):
+        descriptors = np.asarray(descriptors, dtype=float)
+        if descriptors.ndim != 2:
+            raise RuntimeError('Invalid descriptors')
+
+        if self._descriptors is None:
+            self._descriptors = np.empty((self._capacity, descriptors.shape[1]))
+        elif descriptors.shape[1] != self._descriptors.shape[1]:
+            raise RuntimeError('Invalid descriptors')
+
+        # Only the newest descriptors are kept if more than fit are added
+        descriptors = descriptors[-self._capacity:] if self._capacity else descriptors[:0]
+        indices = (self._next + np.arange(len(descriptors))) % max(self._capacity, 1)
+        self._descriptors[indices] = descriptors
+        self._next = (self._next + len(descriptors)) % max(self._capacity, 1)
+        self._size = min(self._size + len(descriptors), self._capacity)
+
+    def clear(self):
+        self._descriptors = None
+        self._size = 0
+        self._next = 0
+
+
+def nearest_neighbor_distances(queries, references, k, exclude_self=False, chunk_size=None):
+    ''' Returns the mean Euclidean distance of every query to its k nearest
+        references. If exclude_self is set, query i is reference i and is not
+        its own neighbor.
+
+        Distances are computed as a dense matrix in chunks of queries, so
+        memory stays bounded by chunk_size times the number of references.
+    '''
+    queries = np.asarray(queries, dtype=float)
+    references = np.asarray(references, dtype=float)
+    num_references = len(references) - (1 if exclude_self else 0)
+    k = min(k, num_references)
+    if k < 1:
+        return np.zeros(len(queries))
+
+    if chunk_size is None:
+        # About 1M distances, i.e. 8MB, per chunk
+        chunk_size = max(1, (1 << 20) // max(len(references), 1))
+
+    # |q - r|^2 = |q|^2 + |r|^2 - 2qr is computed by a single product of
+    # the augmented rows (-2q, |q|^2, 1) and (r, 1, |r|^2)
+    augmented_references = np.empty((references.shape[1] + 2, len(references)))
+    augmented_references[:-2] = references.T
+    augmented_references[-2] = 1
+    augmented_references[-1] = np.einsum('ij,ij->i', references, references)
+    augmented_queries = np.empty((len(queries), queries.shape[1] + 2))
+    augmented_queries[:, :-2] = -2 * queries
+    augmented_queries[:, -2] = np.einsum('ij,ij->i', queries, queries)
+    augmented_queries[:, -1] = 1
+
+    distances = np.empty(len(queries))
+    for start in range(0, len(queries), chunk_size):
+        squared = augmented_queries[start:start + chunk_size] @ augmented_references
+        if exclude_self:
+            rows = np.arange(len(squared))
+            squared[rows, start + rows] = np.inf
+
+        # Rounding can make squared distances slightly negative
+        nearest = np.maximum(np.partition(squared, k - 1, axis=1)[:, :k], 0)
+        distances[start:start + len(squared)] = np.sqrt(nearest).mean(axis=1)
+
+    return distances
+
+
+class NoveltySearch:
+    ''' Replaces the fitness of agents by their novelty, the mean distance
+        of their behavior descriptor to the k nearest descriptors of the
+        current population and the archive. The num_archived most novel
+        descriptors of every generation are archived.
+    '''
+    def __init__(self, k=15, capacity=50000, num_archived=10, chunk_size=None):
+        self._k = k
+        self._num_archived = num_archived
+        self._chunk_size = chunk_size
+        self.archive = NoveltyArchive(capacity)
+
+    @property
+    def k(self):
+        return self._k
+
+    def score(self, descriptors):
+        ''' Returns the novelty of each row of descriptors with respect to the
+            other rows and the archive.
+        '''
+        descriptors = np.asarray(descriptors, dtype=float)
+        references = descriptors
+        if self.archive.size:
+            references = np.concatenate((descriptors, self.archive.descriptors))
+
+        return nearest_neighbor_distances(descriptors, references, self._k, True, self._chunk_size)
+
+    def evaluate(self, agents, descriptors):
+        ''' Sets the fitness of agents to their novelty and archives the most
+            novel descriptors. Returns the novelty of each agent.
+        '''
+        descriptors = np.asarray(descriptors, dtype=float)
+        novelty = self.score(descriptors)
+        for agent, agent_novelty in zip(agents, novelty.tolist()):
+            agent.fitness = agent_novelty
+
+        # Stable, so that ties are archived in agent order
+        most_novel = np.argsort(-novelty, kind='stable')[:self._num_archived]
+        if len(most_novel):
+            self.archive.add(descriptors[np.sort(most_novel)])
+
+        return novelty
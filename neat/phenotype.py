@@ -1,14 +1,27 @@
 from enum import Enum
 
+import numpy as np
+
 from neat.genes import NodeType, NodeGene, ConnectionGene
 from neat.traits import Node, Connection
+from neat.networks import FeedForwardNetwork, RecurrentNetwork
 
 class StabilizationMethod(Enum):
     ITERATIVE = 1
     OUTPUT_DELTA = 2
+    FEED_FORWARD = 3 # falls back to ITERATIVE for recurrent genotypes
+    ADAPTIVE = 4 # depth passes if feed-forward, otherwise until the activations stop changing
 
 class Phenotype:
-    def __init__(self, genotype, stabilization_method=StabilizationMethod.ITERATIVE):
+    default_stabilization_method = StabilizationMethod.ITERATIVE
+    adaptive_iteration_limit = 20 # cap of ADAPTIVE for recurrent networks
+    adaptive_threshold = 1E-9
+    sparse_recurrent = False # evaluate iteratively with a RecurrentNetwork instead of the node graph
+
+    def __init__(self, genotype, stabilization_method=None):
+        if stabilization_method is None:
+            stabilization_method = Phenotype.default_stabilization_method
+
         self._genotype = genotype
         self._stabilization_method = stabilization_method
         self._input_nodes = []
@@ -19,6 +32,13 @@ class Phenotype:
         self._iteration_count = 0
         self._iteration_limit = 20
         self._activation_abort_limit = 30
+        self._activation_abort_penalty = 1000
+        self._total_iterations = 0
+        self._depth = None
+        self._network = None
+        self._recurrent_network = None
+        self._batch_network = None
+        self._nodes_built = False
         self._build()
 
     @property
@@ -27,31 +47,63 @@ class Phenotype:
 
     @property
     def input_nodes(self):
+        self._require_nodes()
         return self._input_nodes
 
     @property
     def hidden_nodes(self):
+        self._require_nodes()
         return self._hidden_nodes
 
     @property
     def output_nodes(self):
+        self._require_nodes()
         return self._output_nodes
 
+    @property
+    def network(self):
+        ''' Returns the compiled FeedForwardNetwork, or None if this phenotype
+            is evaluated iteratively.
+        '''
+        return self._network
+
+    @property
+    def recurrent_network(self):
+        ''' Returns the RecurrentNetwork this phenotype is evaluated
+            iteratively with, or None if the node graph is used instead.
+        '''
+        return self._recurrent_network
+
+    @property
+    def iteration_count(self):
+        ''' Returns the number of passes over the network made by the last
+            call of evaluate_network or evaluate_batch. A compiled network
+            makes a single pass per input.
+        '''
+        return self._iteration_count
+
+    @property
+    def total_iterations(self):
+        return self._total_iterations
+
     @property
     def inner_nodes(self):
         ''' Returns all input and hidden nodes.
         '''
+        self._require_nodes()
         return self._input_nodes + self._hidden_nodes
 
     @property
     def outer_nodes(self):
         ''' Returns all hidden and output nodes.
         '''
+        self._require_nodes()
         return self._hidden_nodes + self._output_nodes
 
     @property
     def all_nodes(self):
-        return self._input_nodes + self._hidden_nodes + self._output_nodes        
+        self._require_nodes()
+        return self._input_nodes + self._hidden_nodes + self._output_nodes
 
     @property
     def all_active(self):
@@ -65,18 +117,41 @@ class Phenotype:
         return True
 
     def get_node(self, innovation_id):
+        self._require_nodes()
         if innovation_id in self._node_map:
             return self._node_map[innovation_id]
 
         return None
 
     def get_connection(self, innovation_id):
+        self._require_nodes()
         if innovation_id in self._connection_map:
             return self._connection_map[innovation_id]
 
         return None
 
     def _build(self):
+        if self._stabilization_method is StabilizationMethod.FEED_FORWARD:
+            self._network = FeedForwardNetwork.compile(self._genotype)
+            self._batch_network = self._network
+        elif self._stabilization_method is StabilizationMethod.ADAPTIVE:
+            # The longest path is only known for acyclic genotypes, recurrent
+            # ones are relaxed until they converge instead
+            plan = self._genotype.network_plan
+            if plan is not None:
+                self._depth = max(plan.depth, 1)
+
+        if self._network is None and Phenotype.sparse_recurrent:
+            self._recurrent_network = RecurrentNetwork.compile(self._genotype, self._activation_abort_limit,
+                                                               self._activation_abort_penalty)
+
+        # A compiled network does not need the node graph, which is then only
+        # built if one of the node accessors is used
+        if self._network is None and self._recurrent_network is None:
+            self._build_nodes()
+
+    def _build_nodes(self):
+        self._nodes_built = True
         for node_gene in self._genotype.node_genes:
             node = self.generate_node(node_gene)
 
@@ -84,6 +159,10 @@ class Phenotype:
             if connection_gene.enabled:
                 connection = self.generate_connection(connection_gene)
 
+    def _require_nodes(self):
+        if not self._nodes_built:
+            self._build_nodes()
+
     def generate_node(self, gene):
         node = Node(gene)
         self._node_map[gene.innovation_id] = node
@@ -98,13 +177,17 @@ class Phenotype:
 
     def generate_connection(self, gene):
         input_node = self._node_map[gene.input_node_id]
-        output_node = self._node_map[gene._output_node_id]
+        output_node = self._node_map[gene.output_node_id]
         connection = Connection(gene, input_node, output_node)
         self._connection_map[gene.innovation_id] = connection
 
         return connection
 
     def flush(self):
+        if self._recurrent_network is not None:
+            self._recurrent_network.flush()
+            return
+
         for node in self.output_nodes:
             node.flush_back()
 
@@ -112,11 +195,15 @@ class Phenotype:
         if self._iteration_count < 1:
             return False
 
-        if self._stabilization_method is StabilizationMethod.ITERATIVE:
+        if self._stabilization_method in (StabilizationMethod.ITERATIVE, StabilizationMethod.FEED_FORWARD,
+                                          StabilizationMethod.ADAPTIVE):
             if self._iteration_count < self._iteration_limit:
                 return False
 
         elif self._stabilization_method is StabilizationMethod.OUTPUT_DELTA:
+            if self._recurrent_network is not None:
+                return self._recurrent_network.stable()
+
             for node in self.outer_nodes:
                 if not node.stable:
                     return False
@@ -127,24 +214,29 @@ class Phenotype:
     
     def activate(self, inputs):
         # Ref: https://stackoverflow.com/questions/55569260/feedforward-algorithm-in-neat-neural-evolution-of-augmenting-topologies
+        if self._recurrent_network is not None:
+            return self._recurrent_network.activate(inputs)
+
         if type(inputs) not in (list, tuple):
             inputs = [inputs]
 
         if len(inputs) != len(self.input_nodes):
             raise RuntimeError('Invalid input')
 
-        for node, input_ in zip(self.input_nodes, inputs):
+        for node, input_ in zip(self._input_nodes, inputs):
             node.activation = input_
 
+        outer_nodes = self.outer_nodes
+
         initial_pass = True # used to ensure at least one pass takes place
         abort_count = 0
         while initial_pass or not self.all_active:
             abort_count += 1
             if abort_count > self._activation_abort_limit:
-                return 1000
+                return self._activation_abort_penalty
                 # raise RuntimeError('Activation limit exceeded.')
 
-            for node in self.outer_nodes:
+            for node in outer_nodes:
                 node.aggregate_input = 0
                 node.active = False
                 for conn in node.input_connections:
@@ -152,7 +244,7 @@ class Phenotype:
                         node.active = True
                     node.aggregate_input += conn.weight * conn.input_node.activation        
             
-            for node in self.outer_nodes:
+            for node in outer_nodes:
                 if node.active:
                     node.activate()
 
@@ -161,13 +253,108 @@ class Phenotype:
         return 0
 
     def evaluate_network(self, inputs):
+        if self._network is not None:
+            return self._evaluate_compiled_network(inputs)
+
+        if self._stabilization_method is StabilizationMethod.ADAPTIVE:
+            return self._evaluate_adaptive(inputs)
+
         self._iteration_count = 0
         error = 0
         while not self.stabalized():
             error += self.activate(inputs)
             self._iteration_count += 1
+        self._total_iterations += self._iteration_count
 
-        output = [node.activation for node in self.output_nodes]
+        output = self._outputs()
         self.flush()
 
         return (output, error)
+
+    def evaluate_batch(self, inputs):
+        ''' Evaluates every row of the 2D array-like inputs in one vectorized
+            pass. Returns a tuple of the outputs, one row per input row, and
+            the error of each row.
+        '''
+        if self._batch_network is None:
+            self._batch_network = FeedForwardNetwork.compile(self._genotype)
+
+        if self._batch_network is None:
+            # Recurrent genotypes cannot be layered, so each row is relaxed
+            # iteratively instead
+            results = []
+            iteration_count = 0
+            for row in inputs:
+                results.append(self.evaluate_network(list(row)))
+                iteration_count += self._iteration_count
+            self._iteration_count = iteration_count
+            outputs = np.array([output for output, _ in results], dtype=float)
+            errors = np.array([error for _, error in results], dtype=float)
+            return (outputs, errors)
+
+        outputs = self._batch_network.evaluate_batch(inputs)
+        self._iteration_count = len(outputs)
+        self._total_iterations += len(outputs)
+        errors = np.full(len(outputs), self._network_error(self._batch_network), dtype=float)
+
+        return (outputs, errors)
+
+    def _network_error(self, network):
+        # Every iterative pass over a network with an unreachable node runs
+        # into the activation abort limit, so the penalty is charged per pass.
+        if network.complete:
+            return 0
+
+        return self._activation_abort_penalty * self._iteration_limit
+
+    def _evaluate_adaptive(self, inputs):
+        ''' Stops after depth passes for feed-forward networks, after which
+            every node has its final activation, and otherwise once no
+            activation changes by more than adaptive_threshold between two
+            passes, or after adaptive_iteration_limit passes.
+        '''
+        limit = self._depth if self._depth is not None else Phenotype.adaptive_iteration_limit
+        previous = None
+        self._iteration_count = 0
+        error = 0
+        while self._iteration_count < limit:
+            pass_error = self.activate(inputs)
+            error += pass_error
+            self._iteration_count += 1
+            if self._depth is None:
+                activations = self._outer_activations()
+                if previous is not None and np.max(np.abs(activations - previous), initial=0) <= Phenotype.adaptive_threshold:
+                    break
+                previous = activations
+        self._total_iterations += self._iteration_count
+
+        # Once the network has settled every further pass would be charged
+        # the same error, so passes that were skipped are charged as well and
+        # errors stay comparable with ITERATIVE
+        if self._iteration_count < self._iteration_limit:
+            error += pass_error * (self._iteration_limit - self._iteration_count)
+
+        output = self._outputs()
+        self.flush()
+
+        return (output, error)
+
+    def _outputs(self):
+        if self._recurrent_network is not None:
+            return self._recurrent_network.outputs
+
+        return [node.activation for node in self.output_nodes]
+
+    def _outer_activations(self):
+        if self._recurrent_network is not None:
+            return self._recurrent_network.activations.copy()
+
+        outer_nodes = self.outer_nodes
+        return np.fromiter((node.activation for node in outer_nodes), float, len(outer_nodes))
+
+    def _evaluate_compiled_network(self, inputs):
+        output = self._network.evaluate(inputs)
+        self._iteration_count = 1
+        self._total_iterations += 1
+
+        return (output, self._network_error(self._network))
@@ -1,20 +1,31 @@
 import time
 
 from neat.species import Species
+from neat.genes import InnovationRegistry
 from neat.genotype import Genotype
-from neat.phenotype import Phenotype
 from neat.agent import Agent
+from neat.compatibility import CompatibilityCache
+from neat.breeders import SerialBreeder
 from neat.utils.timer import timer
+from neat.utils.profiler import NullProfiler
+from neat.utils.rng import RandomStreams
 
 
 class Population:
-    def __init__(self, size=150):
+    def __init__(self, size=150, seed=None, registry=None, streams=None):
         self._agents = []
         self._agent_dict = {}
         self._species = []
         self._size = size
         self.generation_champion = None
         self._generation_champion_bonus_offspring = 1
+        # About 10 generations of comparisons of every agent to every species
+        self.compatibility_cache = CompatibilityCache(10 * size * Species.target_species_count)
+        self._streams = streams if streams is not None else RandomStreams(seed)
+        self._registry = registry if registry is not None else InnovationRegistry()
+        self._base_genotype = None
+        self.breeder = SerialBreeder()
+        self.profiler = NullProfiler()
 
     @property
     def agents(self):
@@ -24,6 +35,33 @@ class Population:
     def species(self):
         return self._species
 
+    @property
+    def registry(self):
+        ''' Returns the InnovationRegistry of this population, which is not
+            shared with other populations unless one was passed in.
+        '''
+        return self._registry
+
+    @property
+    def base_genotype(self):
+        ''' Returns the minimal genotype the first generation was generated
+            from, or None before the population is initialized.
+        '''
+        return self._base_genotype
+
+    @property
+    def streams(self):
+        ''' Returns the RandomStreams of this population. Unless a seed was
+            given, they draw from the random module.
+        '''
+        return self._streams
+
+    @property
+    def rng(self):
+        ''' Returns the numpy Generator used for batched weight mutations.
+        '''
+        return self._streams.numpy
+
     @property
     def count(self):
         return len(self._agents)
@@ -66,20 +104,21 @@ class Population:
         
         return None
 
-    def initialize_population(self, num_inputs, num_outputs):
-        Genotype.initialize_minimal_topology(num_inputs, num_outputs)
+    def initialize_population(self, num_inputs, num_outputs, output_activation=None):
+        self._base_genotype = Genotype.minimal_topology(num_inputs, num_outputs, self._registry, self._streams, output_activation)
         for _ in range(self._size):
-            genotype = Genotype.base_genotype_factory()
-            phenotype = Phenotype(genotype)
-            agent = Agent(phenotype)
+            genotype = self._base_genotype.generate_starting_genotype(defer_weight_mutation=True)
+            agent = Agent(genotype)
             self._agents.append(agent)
             self._agent_dict[agent.agent_id] = agent
 
+        self.mutate_weights()
+
 
     def speciate(self):
         for agent in self._agents:
             for species in self._species:
-                if species.compatible(agent):
+                if species.compatible(agent, self.compatibility_cache):
                     species.add(agent)
                     break
             else:
@@ -123,26 +162,31 @@ class Population:
     #     return offspring
 
     def breed_species(self):
-        offspring = []
+        plan = []
 
         champ = self.generation_champion
         for _ in range(self._generation_champion_bonus_offspring):
-            offspring.append(Species.generate_clone(champ))
+            plan.append((champ, None, True, None))
 
-        num_remaining_offspring = self._size - len(offspring)
+        num_remaining_offspring = self._size - len(plan)
+        shared_fitness_sum = self.shared_fitness_sum
         for species in self._species:
-            species_offspring_share = num_remaining_offspring * species.total_shared_fitness / self.shared_fitness_sum
-            offspring += species.breed(species_offspring_share)
+            species_offspring_share = num_remaining_offspring * species.total_shared_fitness / shared_fitness_sum
+            streams = self._streams.for_species(species.species_id, species.age)
+            plan += species.plan_breeding(species_offspring_share, streams)
 
         # while len(offspring) < self._size:
         #     offspring.append(champ_species.generate_offspring(champ))
 
-        return offspring
+        return self.breeder.breed(plan, self._registry)
 
     def prepare_generation(self):
-        self.generation_champion = None
-        self.speciate()
-        self.remove_extinct_species() 
+        with self.profiler.phase('prepare_generation'):
+            self.generation_champion = None
+            with self.profiler.phase('speciate'):
+                self.speciate()
+            with self.profiler.phase('remove_extinct_species'):
+                self.remove_extinct_species()
 
     def record_species_results(self):
         for species in self._species:
@@ -150,16 +194,41 @@ class Population:
 
     def finish_generation(self):
         # self.record_species_results()
-        self.cull_species()
-        offspring = self.breed_species()
-        self.reset_species()
-        self.replace_agents(offspring)
-        self.age_species()
+        profiler = self.profiler
+        with profiler.phase('finish_generation'):
+            with profiler.phase('cull_species'):
+                self.cull_species()
+            with profiler.phase('breed_species'):
+                offspring = self.breed_species()
+            with profiler.phase('reset_species'):
+                self.reset_species()
+            with profiler.phase('replace_agents'):
+                self.replace_agents(offspring)
+            with profiler.phase('mutate_weights'):
+                self.mutate_weights()
+            with profiler.phase('age_species'):
+                self.age_species()
+
+    def mutate_weights(self):
+        if Genotype.batch_weight_mutation:
+            Genotype.mutate_weights_batch([agent.genotype for agent in self._agents], self.rng)
 
     def replace_agents(self, offspring):
         self._agents = offspring
         self._agent_dict = {agent.agent_id: agent for agent in offspring}
 
+    def immigrate(self, genotypes):
+        ''' Replaces randomly chosen offspring by agents of genotypes, which
+            must use the registry of this population. The first offspring,
+            the clone of the generation champion, is kept.
+        '''
+        indices = self._streams.random.sample(range(1, len(self._agents)), min(len(genotypes), len(self._agents) - 1))
+        for index, genotype in zip(indices, genotypes):
+            self._agents[index].kill()
+            self._agents[index] = Agent(genotype)
+
+        self._agent_dict = {agent.agent_id: agent for agent in self._agents}
+
     def remove_extinct_species(self):
         species_copy = self._species[:]
         for species in species_copy:
@@ -170,8 +239,7 @@ class Population:
     def set_generation_champion(self, champion):
         # Generation champion is copied in case the original gets culled
         genotype_copy = champion.genotype.generate_copy()
-        phenotype = Phenotype(genotype_copy)
-        agent_copy = Agent(phenotype) 
+        agent_copy = Agent(genotype_copy)
         agent_copy.fitness = champion.fitness
         agent_copy.error_sum = champion.error_sum
         agent_copy.classification_error = champion.classification_error
@@ -1,6 +1,3 @@
-import random as rand
-
-from neat.phenotype import Phenotype
 from neat.agent import Agent
 from neat.utils.timer import timer
 
@@ -28,6 +25,7 @@ class Species:
         self.expired = False
         self._stagnation_duration = 0
         self._best_fitness = float('-inf')
+        self._snapshot = None
 
     @property
     def age(self):
@@ -80,8 +78,14 @@ class Species:
     def stagnated(self):
         return self._stagnation_duration >= Species.stagnation_limit
 
-    def compatible(self, agent):
-        return agent.genotype.compatibilty(self.representative_genotype) < Species.compatibility_threshold
+    def compatible(self, agent, compatibility_cache=None):
+        threshold = Species.compatibility_threshold
+        if compatibility_cache is None:
+            distance = agent.genotype.compatibilty(self.representative_genotype, threshold)
+        else:
+            distance = compatibility_cache.distance(agent.genotype, self.representative_genotype, threshold)
+
+        return distance < threshold
 
     def in_species(self, agent):
         return agent in self._agent_set
@@ -99,28 +103,78 @@ class Species:
         else:
             self._stagnation_duration += 1
 
+        # The stagnation penalty may have changed
+        self._snapshot = None
+
     def add(self, agent):
         if agent in self._agent_set:
             raise RuntimeError('Agent already in this species')
 
         self._agents.append(agent)
         self._agent_set.add(agent)
+        self._snapshot = None
 
     def remove(self, agent):
         self._agents.remove(agent)
         self._agent_set.remove(agent)
+        self._snapshot = None
 
     @property
     def count(self):
         return len(self._agents)
 
+    def _statistics(self):
+        ''' Returns a snapshot of the shared fitness of every agent and the
+            statistics derived from it. The snapshot is computed once and
+            reused until the membership of this species, its stagnation or the
+            fitness or state of an agent changes.
+        '''
+        snapshot = self._snapshot
+        if snapshot is None or snapshot['score_version'] != Agent._score_version:
+            penalty = Species.stagnation_penalty if self.stagnated else 0
+            count = self.count
+            shares = [agent.adjusted_fitness * (1 - penalty) / count for agent in self._agents]
+            share_map = dict(zip(self._agents, shares))
+            if len(shares):
+                # The champion is the first agent with the highest share, as
+                # after a stable sort
+                max_share = max(shares)
+                champion = self._agents[shares.index(max_share)]
+                min_share = min(shares)
+            else:
+                max_share = min_share = champion = None
+
+            snapshot = {'score_version': Agent._score_version,
+                        'shares': share_map,
+                        'size': count,
+                        'total': sum(shares),
+                        'living_total': sum([share for agent, share in zip(self._agents, shares) if not agent.expired]),
+                        'max': max_share,
+                        'min': min_share,
+                        'champion': champion,
+                        'ranked': {}}
+            self._snapshot = snapshot
+
+        return snapshot
+
     def fitness_share(self, agent):
-        if agent not in self._agent_set:
+        shares = self._statistics()['shares']
+        if agent not in shares:
             raise RuntimeError('Agent not in this species')
-        
-        penalty = Species.stagnation_penalty if self.stagnated else 0
 
-        return agent.adjusted_fitness * (1 - penalty) / self.count
+        return shares[agent]
+
+    def statistics(self):
+        ''' Returns the size, the total, average, maximum and minimum shared
+            fitness and the champion of this species.
+        '''
+        snapshot = self._statistics()
+        return {'size': snapshot['size'],
+                'total': snapshot['total'],
+                'avg': snapshot['total'] / snapshot['size'] if snapshot['size'] else None,
+                'max': snapshot['max'],
+                'min': snapshot['min'],
+                'champion': snapshot['champion']}
 
     @property
     def average_fitness(self):
@@ -132,15 +186,15 @@ class Species:
 
     @property
     def max_fitness(self):
-        return ranked_agents()[0].fitness
+        return self.ranked_agents()[0].fitness
 
     @property
     def max_shared_fitness(self):
-        return self.fitness_share(self.ranked_agents()[0])
+        return self._statistics()['max']
 
     @property
     def min_shared_fitness(self):
-        return self.fitness_share(self.ranked_agents()[-1])
+        return self._statistics()['min']
 
     @property
     def total_fitness(self):
@@ -148,7 +202,7 @@ class Species:
 
     @property
     def total_shared_fitness(self):
-        return sum([self.fitness_share(agent) for agent in self._agents])
+        return self._statistics()['total']
 
     @property
     def total_adjusted_fitness(self):
@@ -156,18 +210,23 @@ class Species:
 
     @property
     def total_living_shared_fitness(self):
-        return sum([self.fitness_share(agent) for agent in self.living_agents])
+        return self._statistics()['living_total']
 
     @property
     def average_shared_fitness(self):
         return self.total_shared_fitness / self.count
 
     def ranked_agents(self, descending=True):
-        return sorted(self._agents, key=lambda agent: self.fitness_share(agent), reverse=descending)
+        snapshot = self._statistics()
+        if descending not in snapshot['ranked']:
+            snapshot['ranked'][descending] = sorted(self._agents, key=snapshot['shares'].__getitem__, reverse=descending)
+
+        # A copy is returned so that callers cannot modify the snapshot
+        return snapshot['ranked'][descending][:]
     
     @property
     def champion(self):
-        return self.ranked_agents()[0]
+        return self._statistics()['champion']
 
     def mutate(self):
         for agent in self._agents:
@@ -184,41 +243,68 @@ class Species:
             ranked_agents[i].kill()
 
     @staticmethod
-    def generate_offspring(parent1, parent2=None):
+    def generate_offspring(parent1, parent2=None, streams=None):
         if parent2 is None:
-            genotype = parent1.genotype.copy_and_mutate()
-        elif parent1.adjusted_fitness == parent2.adjusted_fitness: # adjusted_fitness must then be equal for both parents
-            if rand.uniform(0, 1) > 0.5:
-                genotype = parent1.genotype.favored_crossover(parent2.genotype)
+            return Agent(Species.offspring_genotype(parent1.genotype, streams=streams))
+
+        equal_fitness = parent1.adjusted_fitness == parent2.adjusted_fitness
+        return Agent(Species.offspring_genotype(parent1.genotype, parent2.genotype, equal_fitness, streams))
+
+    @staticmethod
+    def offspring_genotype(genotype1, genotype2=None, equal_fitness=False, streams=None):
+        ''' Returns the genotype of an offspring of genotype1 and genotype2, or
+            a mutated copy of genotype1 if there is no second parent.
+            genotype1 is favored in crossover unless both parents have equal
+            fitness, in which case the favored parent is chosen randomly.
+
+            The offspring draws from streams, or the streams of genotype1 if
+            none are given.
+        '''
+        streams = streams or genotype1.streams
+        if genotype2 is None:
+            return genotype1.copy_and_mutate(streams)
+        elif equal_fitness:
+            if streams.random.uniform(0, 1) > 0.5:
+                return genotype1.favored_crossover(genotype2, streams)
             else:
-                genotype = parent2.genotype.favored_crossover(parent1.genotype)
+                return genotype2.favored_crossover(genotype1, streams)
         else:
-            genotype = parent1.genotype.favored_crossover(parent2.genotype)
-
-        phenotype = Phenotype(genotype)
-        return Agent(phenotype)
+            return genotype1.favored_crossover(genotype2, streams)
     
     @staticmethod
     def generate_clone(agent):
         genotype = agent.genotype.generate_copy()
-        phenotype = Phenotype(genotype)
-        return Agent(phenotype)
+        return Agent(genotype)
+
+    @staticmethod
+    def generate_planned_offspring(parent1, parent2, clone, streams=None):
+        if clone:
+            return Species.generate_clone(parent1)
+
+        return Species.generate_offspring(parent1, parent2, streams)
+
+    def breed(self, offspring_share, streams=None):
+        return [Species.generate_planned_offspring(*task) for task in self.plan_breeding(offspring_share, streams)]
 
-    def breed(self, offspring_share):
-        offspring = []
+    def plan_breeding(self, offspring_share, streams=None):
+        ''' Returns the offspring this species breeds as a list of
+            (parent1, parent2, clone, streams) tuples, in the order they are
+            bred. parent2 is None for offspring of a single parent.
+        '''
+        plan = []
         ranked_agents = self.ranked_agents()
         total_shared_fitness = self.total_living_shared_fitness
         living = self.num_alive
 
         if living == 0 or total_shared_fitness <= 0:
-            return offspring
+            return plan
 
         # champ gets bonus offspring
         if len(self._agents) > 3:
             champ = ranked_agents[0]
             num_champ_clones = 1
             for _ in range(num_champ_clones):
-                offspring.append(Species.generate_clone(champ))
+                plan.append((champ, None, True, streams))
 
             remaining_offspring_share = offspring_share - num_champ_clones
         else:
@@ -230,26 +316,27 @@ class Species:
                 parent = ranked_agents[i]
                 num_offspring = round(remaining_offspring_share * self.fitness_share(parent) / total_shared_fitness)
                 for _ in range(num_offspring):
-                    offspring.append(Species.generate_offspring(parent))
+                    plan.append((parent, None, False, streams))
                 i += 1
             else:
                 parent1 = ranked_agents[i]
                 parent2 = ranked_agents[i + 1]
                 num_offspring = round(remaining_offspring_share * (self.fitness_share(parent1) + self.fitness_share(parent2)) / total_shared_fitness) 
                 for _ in range(num_offspring):
-                    offspring.append(Species.generate_offspring(parent1, parent2))
+                    plan.append((parent1, parent2, False, streams))
                 i += 2
 
         # any remaining offspring go to champ
-        while len(offspring) < round(offspring_share):
+        while len(plan) < round(offspring_share):
             champ = ranked_agents[0]
-            offspring.append(Species.generate_offspring(champ))
+            plan.append((champ, None, False, streams))
         
-        return offspring
+        return plan
 
     def reset(self):
         self._agents = []
         self._agent_set = set()
+        self._snapshot = None
 
     # def record_results(self):
     #     ranked_agents = self.ranked_agents()
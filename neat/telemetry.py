@@ -0,0 +1,54 @@
+import json
+import sys
+
+
+class JSONLinesSink:
+    ''' Appends one JSON record per generation to a file. Records are
+        serialized as they arrive but only written once buffer_size of them
+        have been collected, or when the sink is flushed or closed.
+    '''
+    def __init__(self, filename, buffer_size=100):
+        self._filename = filename
+        self._buffer_size = buffer_size
+        self._buffer = []
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def write(self, record):
+        self._buffer.append(json.dumps(record, separators=(',', ':')))
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not len(self._buffer):
+            return
+
+        with open(self._filename, 'a') as outfile:
+            outfile.write('\n'.join(self._buffer))
+            outfile.write('\n')
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+
+class ConsoleSink:
+    ''' Prints every record using formatter, a callable returning the text
+        for a record.
+    '''
+    def __init__(self, formatter, stream=None):
+        self._formatter = formatter
+        self._stream = stream
+
+    def write(self, record):
+        # The stream is looked up on every write so that redirecting
+        # sys.stdout also redirects the sink
+        print(self._formatter(record), file=self._stream or sys.stdout)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
@@ -1,17 +1,19 @@
-from neat.utils.math import sigmoid
-from neat.genes import NodeType
+from neat.genes import NodeType, Activation
+from neat.activations import Activations
 
 class Trait:
-    def __init__(self, gene):
-        self._gene = gene
+    __slots__ = ('gene',)
 
-    @property
-    def gene(self):
-        return self._gene
+    def __init__(self, gene):
+        self.gene = gene
 
 class Node(Trait):
+    __slots__ = ('node_type', 'input_connections', 'output_connections', '_output', 'aggregate_input', 
+                 'activation_count', 'activation', 'prev_activation', 'active', '_stability_threshold', '_function')
+
     def __init__(self, gene):
         super().__init__(gene)
+        self.node_type = gene.node_type if gene is not None else None
         self.input_connections = []
         self.output_connections = []
         self._output = 0
@@ -21,10 +23,7 @@ class Node(Trait):
         self.prev_activation = 0
         self.active = False
         self._stability_threshold = 1E-9
-
-    @property
-    def node_type(self):
-        return self.gene.node_type
+        self._function = Activations.function(gene.activation if gene is not None else Activation.SIGMOID)
 
     @property
     def stable(self):
@@ -33,10 +32,10 @@ class Node(Trait):
     def activate(self):
         self.activation_count += 1
         self.prev_activation = self.activation
-        self.activation = self.activation_function(self.aggregate_input)
+        self.activation = self._function(self.aggregate_input)
 
     def activation_function(self, val):
-        return sigmoid(val, 4.9)
+        return self._function(val)
 
     def flush_back(self):
         if self.node_type is NodeType.INPUT:
@@ -52,6 +51,8 @@ class Node(Trait):
                     conn.input_node.flush_back()
 
 class Connection(Trait):
+    __slots__ = ('input_node', 'output_node')
+
     def __init__(self, gene, input_node, output_node):
         super().__init__(gene)
         self.input_node = input_node
@@ -66,5 +67,3 @@ class Connection(Trait):
     @property
     def enabled(self):
         return self.gene.enabled
-
-
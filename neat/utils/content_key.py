@@ -0,0 +1,33 @@
+class ContentKey:
+    ''' Hashable wrapper of a content tuple that computes its hash once. Keys
+        are only equal if their contents are, so unlike a bare hash they can
+        be used as exact cache keys.
+
+        Equal keys share one content tuple after they are first compared, so
+        that comparing them again is an identity check.
+    '''
+    __slots__ = ('_content', '_hash')
+
+    def __init__(self, content):
+        self._content = content
+        self._hash = hash(content)
+
+    @property
+    def content(self):
+        return self._content
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, ContentKey):
+            return NotImplemented
+
+        if self._content is other._content:
+            return True
+
+        if self._hash != other._hash or self._content != other._content:
+            return False
+
+        other._content = self._content
+        return True
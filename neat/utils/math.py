@@ -1,4 +1,71 @@
 import math
 
+import numpy as np
+
 def sigmoid(x, coeff=1, offset=0):
-    return 1 / (1 + math.exp(-coeff * (x + offset)))
\ No newline at end of file
+    try:
+        return 1 / (1 + math.exp(-coeff * (x + offset)))
+    except OverflowError:
+        return 0.0
+
+def steepened_sigmoid(x):
+    # Equal to sigmoid(x, 4.9) without the parameter handling
+    try:
+        return 1 / (1 + math.exp(-4.9 * x))
+    except OverflowError:
+        return 0.0
+
+def batch_sigmoid(x, coeff=1, offset=0):
+    # exp overflows to inf for large negative inputs, which correctly yields 0
+    with np.errstate(over='ignore'):
+        return 1 / (1 + np.exp(-coeff * (x + offset)))
+
+def batch_steepened_sigmoid(x):
+    return batch_sigmoid(x, 4.9)
+
+def gaussian(x):
+    # x * x overflows to inf rather than raising, and exp(-inf) is 0
+    return math.exp(-x * x)
+
+def batch_gaussian(x):
+    with np.errstate(over='ignore'):
+        return np.exp(-np.square(x))
+
+def relu(x):
+    return x if x > 0 else 0.0
+
+def batch_relu(x):
+    return np.maximum(x, 0.0)
+
+def identity(x):
+    return x
+
+def batch_identity(x):
+    return x
+
+
+class LookupTable:
+    ''' Piecewise linear approximation of function from size samples on
+        [low, high]. Outside of the interval the values at its bounds are
+        returned, so the cost of a call does not depend on its input and the
+        function is never evaluated where it might overflow.
+    '''
+    def __init__(self, function, low, high, size=4096):
+        self._low = low
+        self._scale = (size - 1) / (high - low)
+        self._last = size - 1
+        self._points = np.linspace(low, high, size)
+        self._samples = np.array([function(x) for x in self._points.tolist()])
+        self._values = self._samples.tolist()
+        self._slopes = np.diff(self._samples).tolist() + [0.0]
+
+    def __call__(self, x):
+        position = (x - self._low) * self._scale
+        if 0 < position < self._last:
+            i = int(position)
+            return self._values[i] + self._slopes[i] * (position - i)
+
+        return self._values[0] if position <= 0 else self._values[-1]
+
+    def batch(self, x):
+        return np.interp(x, self._points, self._samples)
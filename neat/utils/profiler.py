@@ -0,0 +1,92 @@
+import sys
+import time
+from contextlib import nullcontext
+
+
+class PhaseProfiler:
+    ''' Records the wall time, number of calls and change in allocated memory
+        blocks of named phases, separately for every generation. Phases may
+        be nested, in which case the outer phase includes the inner ones.
+
+        Allocations are measured with sys.getallocatedblocks, which is cheap
+        but only reports the net number of blocks still allocated when a phase
+        ends, not every allocation made during it.
+    '''
+    enabled = True
+
+    def __init__(self):
+        self._records = []
+        self._record = None
+
+    @property
+    def records(self):
+        ''' Returns one dict per generation, mapping phase names to their time,
+            calls and allocated_blocks.
+        '''
+        return self._records
+
+    @property
+    def record(self):
+        ''' Returns the record of the current generation.
+        '''
+        return self._record
+
+    def start_generation(self, generation):
+        self._record = {}
+        self._records.append({'generation': generation, 'phases': self._record})
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def _add(self, name, delta_t, delta_blocks):
+        if self._record is None:
+            self.start_generation(None)
+
+        if name not in self._record:
+            self._record[name] = {'time': 0, 'calls': 0, 'allocated_blocks': 0}
+
+        stats = self._record[name]
+        stats['time'] += delta_t
+        stats['calls'] += 1
+        stats['allocated_blocks'] += delta_blocks
+
+
+class _Phase:
+    __slots__ = ('_profiler', '_name', '_start_time', '_start_blocks')
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._start_blocks = sys.getallocatedblocks()
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        delta_t = time.perf_counter() - self._start_time
+        self._profiler._add(self._name, delta_t, sys.getallocatedblocks() - self._start_blocks)
+        return False
+
+
+class NullProfiler:
+    ''' Profiler used when instrumentation is disabled. Every phase is the
+        same reusable null context, so instrumented code pays for little more
+        than a method call.
+    '''
+    enabled = False
+    _null_phase = nullcontext()
+
+    @property
+    def records(self):
+        return []
+
+    @property
+    def record(self):
+        return None
+
+    def start_generation(self, generation):
+        pass
+
+    def phase(self, name):
+        return self._null_phase
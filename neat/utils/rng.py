@@ -0,0 +1,107 @@
+import random as rand
+
+import numpy as np
+
+
+class RandomStreams:
+    ''' Source of the random numbers of a run. random is used for scalar
+        draws and has the interface of the random module, numpy is a numpy
+        Generator for batched draws.
+
+        Without a seed, random is the random module itself and numpy is
+        seeded from it, so seeding the random module reproduces a run as
+        before. With a seed, both are private to these streams, and derive
+        returns independent streams identified by a key, e.g. one per agent,
+        species or island. The same seed and key always produce the same
+        draws, regardless of what other streams were used. Unseeded streams
+        derive themselves, i.e. everything shares the random module.
+    '''
+    AGENT = 1
+    SPECIES = 2
+    ISLAND = 3
+
+    def __init__(self, seed=None, key=()):
+        self._seed = seed
+        self._key = tuple(key)
+        self._random = None
+        self._numpy = None
+
+    def __getstate__(self):
+        # Unseeded streams refer to the random module, which cannot be
+        # pickled, they refer to it again once unpickled
+        state = self.__dict__.copy()
+        if self._seed is None:
+            state['_random'] = None
+        return state
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def seeded(self):
+        return self._seed is not None
+
+    @property
+    def random(self):
+        if self._random is None:
+            if self._seed is None:
+                self._random = rand
+            else:
+                state = self._seed_sequence().generate_state(4, np.uint64)
+                self._random = rand.Random(int.from_bytes(state.tobytes(), 'little'))
+
+        return self._random
+
+    @property
+    def numpy(self):
+        if self._numpy is None:
+            if self._seed is None:
+                self._numpy = np.random.default_rng(rand.getrandbits(64))
+            else:
+                self._numpy = np.random.default_rng(self._seed_sequence())
+
+        return self._numpy
+
+    def _seed_sequence(self):
+        return np.random.SeedSequence(self._seed, spawn_key=self._key)
+
+    def derive(self, *key):
+        if self._seed is None:
+            return self
+
+        return RandomStreams(self._seed, self._key + key)
+
+    def for_agent(self, agent_id):
+        return self.derive(RandomStreams.AGENT, agent_id)
+
+    def for_species(self, species_id, age):
+        # Species live for several generations, the age keeps their streams
+        # of different generations apart
+        return self.derive(RandomStreams.SPECIES, species_id, age)
+
+    def for_island(self, island_index):
+        return self.derive(RandomStreams.ISLAND, island_index)
+
+    def getstate(self):
+        ''' Returns the state of random and, if it was used, numpy. Derived
+            streams are not included, they can be derived again.
+        '''
+        random_state = self.random.getstate()
+        numpy_state = self._numpy.bit_generator.state if self._numpy is not None else None
+        return (random_state, numpy_state)
+
+    def setstate(self, state):
+        random_state, numpy_state = state
+        self.random.setstate(random_state)
+        self._numpy = None
+        if numpy_state is not None:
+            self._numpy = np.random.default_rng()
+            self._numpy.bit_generator.state = numpy_state
+
+
+default_streams = RandomStreams()
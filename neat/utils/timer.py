@@ -1,10 +1,12 @@
 import time
+from functools import wraps
 
 def timer(func):
+    @wraps(func)
     def timed(*args, **kwargs):
-        start_time = time.time()
-        res = func(*args)
-        end_time = time.time()
+        start_time = time.perf_counter()
+        res = func(*args, **kwargs)
+        end_time = time.perf_counter()
         delta_t = end_time - start_time
         print(f'{func.__name__} took {delta_t:.3f} seconds to run')
 
@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+from neat.activations import Activations
+from neat.compact import CompactGenome
+from neat.genes import NodeType, Activation, gene_factory
+from neat.genotype import Genotype
+from neat.phenotype import Phenotype, StabilizationMethod
+from neat.utils.math import sigmoid, steepened_sigmoid
+
+
+class TestActivations(unittest.TestCase):
+    def setUp(self):
+        gene_factory.reset()
+
+    def build_genotype(self):
+        genotype = Genotype()
+        genotype.create_node_gene(None, None, NodeType.INPUT) # 1
+        genotype.create_node_gene(None, None, NodeType.INPUT) # 2
+        genotype.create_node_gene(None, None, NodeType.OUTPUT, Activation.IDENTITY) # 3
+        genotype.create_node_gene(1, 3, NodeType.HIDDEN, Activation.TANH) # 4
+        genotype.create_node_gene(2, 3, NodeType.HIDDEN, Activation.RELU) # 5
+        genotype.create_node_gene(1, 5, NodeType.HIDDEN, Activation.GAUSSIAN) # 6
+
+        genotype.create_connection_gene(1, 4, 0.5)
+        genotype.create_connection_gene(4, 3, -1.5)
+        genotype.create_connection_gene(2, 5, 2)
+        genotype.create_connection_gene(5, 3, 1)
+        genotype.create_connection_gene(1, 6, 1.25)
+        genotype.create_connection_gene(6, 3, 0.75)
+
+        return genotype
+
+    def test_steepened_sigmoid_does_not_overflow(self):
+        self.assertEqual(steepened_sigmoid(0.3), sigmoid(0.3, 4.9))
+        self.assertEqual(steepened_sigmoid(-1000), 0)
+        self.assertEqual(sigmoid(-1000, 4.9), 0)
+
+    def test_scalar_matches_batch(self):
+        x = np.linspace(-5, 5, 101)
+        for activation in Activation:
+            function = Activations.function(activation)
+            np.testing.assert_allclose([function(value) for value in x.tolist()],
+                                       Activations.batch_function(activation)(x), rtol=0, atol=1E-12)
+
+    def test_lookup_table(self):
+        table = Activations.sigmoid_table()
+        x = np.linspace(-10, 10, 1001)
+        expected = 1 / (1 + np.exp(-4.9 * x))
+        np.testing.assert_allclose([table(value) for value in x.tolist()], expected, rtol=0, atol=2E-6)
+        np.testing.assert_allclose(table.batch(x), expected, rtol=0, atol=2E-6)
+        self.assertEqual(table(-1E300), table(-4))
+
+    def test_sigmoid_lookup_table_setting(self):
+        setting = Activations.sigmoid_lookup_table
+        try:
+            Activations.sigmoid_lookup_table = True
+            self.assertIsInstance(Activations.function(Activation.SIGMOID), type(Activations.sigmoid_table()))
+        finally:
+            Activations.sigmoid_lookup_table = setting
+        self.assertIs(Activations.function(Activation.SIGMOID), steepened_sigmoid)
+
+    def test_networks_use_node_activations(self):
+        genotype = self.build_genotype()
+        iterative = Phenotype(genotype, StabilizationMethod.ITERATIVE)
+        compiled = Phenotype(genotype, StabilizationMethod.FEED_FORWARD)
+        inputs = [[0, 0], [1, 0], [0.5, -2]]
+        for row in inputs:
+            output, error = compiled.evaluate_network(row)
+            self.assertEqual((output, error), iterative.evaluate_network(row))
+            expected = -1.5 * np.tanh(0.5 * row[0]) + max(2 * row[1], 0) + 0.75 * np.exp(-(1.25 * row[0]) ** 2)
+            self.assertAlmostEqual(output[0], expected, places=12)
+
+        outputs, _ = compiled.evaluate_batch(inputs)
+        np.testing.assert_allclose(outputs[:, 0], [iterative.evaluate_network(row)[0][0] for row in inputs], rtol=0, atol=1E-12)
+
+    def test_compact_genome_keeps_activations(self):
+        genotype = self.build_genotype()
+        genome = CompactGenome.from_genotype(genotype)
+        self.assertEqual([gene.activation for gene in genome.node_genes], [gene.activation for gene in genotype.node_genes])
+        self.assertEqual(genome.to_genotype().fingerprint, genotype.fingerprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
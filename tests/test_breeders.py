@@ -0,0 +1,46 @@
+import unittest
+import random as rand
+
+from neat.breeders import ParallelBreeder
+from neat.compact import CompactGenome
+from neat.experiments import XOR
+from neat.species import Species
+
+
+class TestParallelBreeder(unittest.TestCase):
+    def setUp(self):
+        self.species_state = (Species.compatibility_threshold, Species._species_count)
+
+    def tearDown(self):
+        Species.compatibility_threshold, Species._species_count = self.species_state
+
+    def run_experiment(self, num_workers):
+        rand.seed(3)
+        Species.compatibility_threshold, Species._species_count = self.species_state
+        experiment = XOR(num_generations=4, population_size=60, sinks=[], agents_directory=None)
+        experiment.population.breeder = ParallelBreeder(num_workers)
+        experiment.run()
+
+        return experiment.population
+
+    def test_independent_of_num_workers(self):
+        populations = [self.run_experiment(num_workers) for num_workers in (1, 2)]
+        genomes = [[CompactGenome.from_genotype(agent.genotype).to_bytes() for agent in population.agents]
+                   for population in populations]
+        self.assertEqual(genomes[0], genomes[1])
+        self.assertEqual(populations[0].registry.get_connections(), populations[1].registry.get_connections())
+
+    def test_offspring_use_registered_innovations(self):
+        population = self.run_experiment(2)
+        registry = population.registry
+        for agent in population.agents:
+            genotype = agent.genotype
+            self.assertIs(genotype.registry, registry)
+            ids = [gene.innovation_id for gene in genotype.connection_genes]
+            self.assertEqual(ids, sorted(ids))
+            for gene in genotype.connection_genes:
+                self.assertEqual(registry.get_connection_id(gene.structure), gene.innovation_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
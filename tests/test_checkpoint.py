@@ -0,0 +1,49 @@
+import unittest
+import io
+import os
+import random as rand
+import tempfile
+from contextlib import redirect_stdout
+
+from neat.experiments import XOR
+from neat.genes import gene_factory
+from neat.species import Species
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        gene_factory.reset()
+        self.compatibility_threshold = Species.compatibility_threshold
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'xor.ckpt')
+
+    def tearDown(self):
+        Species.compatibility_threshold = self.compatibility_threshold
+        self.directory.cleanup()
+
+    def run_experiment(self, experiment, **kwargs):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            experiment.run(**kwargs)
+
+        return output.getvalue()
+
+    def test_resume_is_identical(self):
+        original = XOR(num_generations=5, population_size=30, agents_directory=None)
+        output = self.run_experiment(original, checkpoint_interval=3, checkpoint_filename=self.filename)
+        uninterrupted = output[output.index('Generation 4 --'):]
+
+        rand.seed(1)
+        gene_factory.reset()
+        experiment = XOR(num_generations=5, population_size=30, agents_directory=None)
+        experiment.load_checkpoint(self.filename)
+        self.assertEqual(experiment.population.base_genotype.fingerprint, original.population.base_genotype.fingerprint)
+        resumed = self.run_experiment(experiment)
+        self.assertEqual(resumed[resumed.index('Generation 4 --'):], uninterrupted)
+
+    def test_not_a_checkpoint(self):
+        with open(self.filename, 'wb') as outfile:
+            outfile.write(bytes(64))
+        with self.assertRaises(RuntimeError):
+            XOR().load_checkpoint(self.filename)
@@ -0,0 +1,56 @@
+import unittest
+import pickle
+import random as rand
+
+import numpy as np
+
+from neat.compact import CompactGenome
+from neat.genotype import Genotype
+from neat.genes import gene_factory
+
+
+class TestCompactGenome(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        gene_factory.reset()
+        Genotype.initialize_minimal_topology(5, 4)
+        self.genotype1 = Genotype.base_genotype_factory()
+        self.genotype2 = Genotype.base_genotype_factory()
+        for _ in range(3):
+            self.genotype1.attempt_node_mutation()
+            self.genotype2.attempt_node_mutation()
+            self.genotype2.attempt_connection_mutation()
+
+        self.genome1 = CompactGenome.from_genotype(self.genotype1)
+        self.genome2 = CompactGenome.from_genotype(self.genotype2)
+
+    def test_gene_accessors(self):
+        for gene, compact_gene in zip(self.genotype1.connection_genes, self.genome1.connection_genes):
+            self.assertEqual(compact_gene.innovation_id, gene.innovation_id)
+            self.assertEqual(compact_gene.structure, gene.structure)
+            self.assertEqual(compact_gene.weight, gene.weight)
+            self.assertEqual(compact_gene.enabled, gene.enabled)
+
+        for gene, compact_gene in zip(self.genotype1.node_genes, self.genome1.node_genes):
+            self.assertEqual(compact_gene.structure, gene.structure)
+            self.assertIs(compact_gene.node_type, gene.node_type)
+
+    def test_copy_is_independent(self):
+        genome_copy = self.genome1.generate_copy()
+        self.assertEqual(genome_copy.fingerprint, self.genome1.fingerprint)
+        genome_copy.connection_genes[0].weight += 1
+        self.assertNotEqual(genome_copy.weights[0], self.genome1.weights[0])
+        self.assertNotEqual(genome_copy.fingerprint, self.genome1.fingerprint)
+
+    def test_pickle(self):
+        genome = pickle.loads(pickle.dumps(self.genome1))
+        self.assertEqual(genome.to_bytes(), self.genome1.to_bytes())
+
+    def test_compatibility(self):
+        self.assertAlmostEqual(self.genome1.compatibilty(self.genome2), self.genotype1.compatibilty(self.genotype2))
+
+    def test_favored_crossover(self):
+        offspring = self.genome1.favored_crossover(self.genome2, np.random.default_rng(0))
+        np.testing.assert_array_equal(offspring.connection_ids, self.genome1.connection_ids)
+        _, idx1, idx2 = np.intersect1d(self.genome1.connection_ids, self.genome2.connection_ids, return_indices=True)
+        np.testing.assert_array_equal(offspring.weights[idx1], (self.genome1.weights[idx1] + self.genome2.weights[idx2]) / 2)
@@ -0,0 +1,80 @@
+import unittest
+import random as rand
+
+from neat.evaluators import SerialEvaluator, ParallelEvaluator, CachedEvaluator
+from neat.experiments import XOR
+from neat.genotype import Genotype
+from neat.agent import Agent
+from neat.genes import gene_factory
+from neat.compact import CompactGenome
+
+
+class TestEvaluators(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        gene_factory.reset()
+        Genotype.initialize_minimal_topology(3, 1)
+        self.genotypes = []
+        for _ in range(8):
+            genotype = Genotype.base_genotype_factory()
+            genotype.attempt_node_mutation()
+            genotype.attempt_connection_mutation()
+            self.genotypes.append(genotype)
+
+        experiment = XOR()
+        self.evaluate_agent = experiment.agent_evaluator()
+        self.datasets = [(experiment.inputs, experiment.outputs)] * len(self.genotypes)
+
+    def scores(self, evaluator):
+        agents = [Agent(genotype) for genotype in self.genotypes]
+        evaluator.evaluate(self.evaluate_agent, agents, self.datasets)
+        evaluator.close()
+        return [(agent.fitness, agent.error_sum, agent.classification_error) for agent in agents]
+
+    def test_compact_genome_round_trip(self):
+        genotype = self.genotypes[0]
+        genome = CompactGenome.from_genotype(genotype)
+        self.assertEqual(genome.to_genotype().fingerprint, genotype.fingerprint)
+        self.assertEqual(CompactGenome.from_bytes(genome.to_bytes()).to_genotype().fingerprint, genotype.fingerprint)
+
+    def test_parallel_matches_serial(self):
+        self.assertEqual(self.scores(ParallelEvaluator(2)), self.scores(SerialEvaluator()))
+
+    def test_cached_matches_serial(self):
+        evaluator = CachedEvaluator(SerialEvaluator())
+        self.genotypes.append(self.genotypes[0].generate_copy())
+        self.datasets.append(self.datasets[0])
+        self.assertEqual(self.scores(evaluator), self.scores(SerialEvaluator()))
+        self.assertEqual((evaluator.hits, evaluator.misses), (1, 8))
+        self.assertEqual(self.scores(evaluator), self.scores(SerialEvaluator()))
+        self.assertEqual((evaluator.hits, evaluator.misses), (9, 0))
+
+    def test_evaluation_key(self):
+        genotype = self.genotypes[0]
+        genotype_copy = genotype.generate_copy()
+        self.assertEqual(genotype_copy.evaluation_key, genotype.evaluation_key)
+        genotype_copy.mutate_weights()
+        self.assertNotEqual(genotype_copy.evaluation_key, genotype.evaluation_key)
+
+        # Disabled genes do not change the network
+        genotype_copy = genotype.generate_copy()
+        genotype_copy.create_connection_gene(1, 4, 0.5, False)
+        self.assertNotEqual(genotype_copy.fingerprint, genotype.fingerprint)
+        self.assertEqual(genotype_copy.evaluation_key, genotype.evaluation_key)
+
+    def test_cached_hash_collision(self):
+        # hash(-1.0) == hash(-2.0), so these keys only differ in content
+        genotypes = []
+        for weight in (-1.0, -2.0):
+            genotype = self.genotypes[0].generate_copy()
+            genotype.connection_genes[0].weight = weight
+            genotype._invalidate()
+            genotypes.append(genotype)
+        self.assertEqual(hash(genotypes[0].evaluation_key), hash(genotypes[1].evaluation_key))
+        self.assertNotEqual(genotypes[0].evaluation_key, genotypes[1].evaluation_key)
+
+        self.genotypes = genotypes
+        self.datasets = self.datasets[:2]
+        evaluator = CachedEvaluator(SerialEvaluator())
+        self.assertEqual(self.scores(evaluator), self.scores(SerialEvaluator()))
+        self.assertEqual((evaluator.hits, evaluator.misses), (0, 2))
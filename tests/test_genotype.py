@@ -0,0 +1,226 @@
+import unittest
+import random as rand
+
+import numpy as np
+
+from neat.genotype import Genotype
+from neat.genes import NodeType, gene_factory
+from neat.compatibility import CompatibilityCache
+
+
+class TestConnectionMutation(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        gene_factory.reset()
+
+    def build_genotype(self):
+        genotype = Genotype()
+        genotype.create_node_gene(None, None, NodeType.INPUT) # 1
+        genotype.create_node_gene(None, None, NodeType.INPUT) # 2
+        genotype.create_node_gene(None, None, NodeType.OUTPUT) # 3
+
+        genotype.create_node_gene(1, 3, NodeType.HIDDEN) # 4
+        genotype.create_node_gene(4, 3, NodeType.HIDDEN) # 5
+
+        genotype.create_connection_gene(1, 4, 1)
+        genotype.create_connection_gene(4, 5, 1)
+        genotype.create_connection_gene(5, 3, 1)
+        genotype.create_connection_gene(2, 3, 1)
+
+        return genotype
+
+    def has_cycle(self, genotype):
+        successors = {}
+        for gene in genotype.connection_genes:
+            successors.setdefault(gene.input_node_id, []).append(gene.output_node_id)
+
+        for node_gene in genotype.node_genes:
+            stack = list(successors.get(node_gene.innovation_id, []))
+            visited = set()
+            while len(stack):
+                node_id = stack.pop()
+                if node_id == node_gene.innovation_id:
+                    return True
+                if node_id not in visited:
+                    visited.add(node_id)
+                    stack.extend(successors.get(node_id, []))
+
+        return False
+
+    def test_recurrency_test(self):
+        genotype = self.build_genotype()
+        self.assertTrue(genotype._recurrency_test(1, 5))
+        self.assertFalse(genotype._recurrency_test(5, 4))
+        self.assertFalse(genotype._recurrency_test(3, 1))
+        self.assertFalse(genotype._recurrency_test(4, 4))
+
+    def test_recurrency_test_disabled_connection(self):
+        genotype = self.build_genotype()
+        genotype.connection_genes[1].enabled = False
+        self.assertFalse(genotype._recurrency_test(5, 4))
+
+    def test_incremental_reachability(self):
+        genotype = self.build_genotype()
+        genotype._reachability()
+        genotype.create_node_gene(2, 3, NodeType.HIDDEN) # 6
+        genotype.create_connection_gene(2, 6, 1)
+        genotype.create_connection_gene(6, 4, 1)
+        incremental = genotype._reachability()
+
+        genotype._descendants = None
+        self.assertEqual(incremental, genotype._reachability())
+        self.assertFalse(genotype._recurrency_test(5, 6))
+
+    def test_mutations_stay_acyclic(self):
+        genotype = self.build_genotype()
+        for _ in range(40):
+            genotype.attempt_node_mutation()
+            genotype.attempt_connection_mutation()
+            genotype.mutate_connection_states()
+            genotype = genotype.generate_copy()
+
+        self.assertFalse(self.has_cycle(genotype))
+
+
+class TestGeneInsertion(unittest.TestCase):
+    def setUp(self):
+        gene_factory.reset()
+
+    def test_out_of_order_insertion(self):
+        source = Genotype()
+        for _ in range(3):
+            source.create_node_gene(None, None, NodeType.INPUT)
+        for input_node_id, output_node_id in ((1, 2), (1, 3), (2, 3), (2, 1), (3, 1)):
+            source.create_connection_gene(input_node_id, output_node_id, 1)
+
+        genotype = Genotype()
+        for i in (4, 1, 5, 3, 2):
+            genotype.add_connection_gene(gene_factory.copy_connection_gene(source.connection_genes[i - 1]))
+        for i in (3, 1, 2):
+            genotype.add_node_gene(gene_factory.copy_node_gene(source.node_genes[i - 1]))
+
+        self.assertEqual([gene.innovation_id for gene in genotype.connection_genes], [1, 2, 3, 4, 5])
+        self.assertEqual([gene.innovation_id for gene in genotype.node_genes], [1, 2, 3])
+        self.assertTrue(genotype.connection_structure_exists((2, 1)))
+
+
+class TestCompatibility(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        gene_factory.reset()
+        Genotype.initialize_minimal_topology(5, 4)
+        self.genotype1 = Genotype.base_genotype_factory()
+        self.genotype2 = Genotype.base_genotype_factory()
+        for _ in range(3):
+            self.genotype1.attempt_node_mutation()
+            self.genotype2.attempt_connection_mutation()
+
+    def test_symmetric(self):
+        self.assertEqual(self.genotype1.compatibilty(self.genotype2), self.genotype2.compatibilty(self.genotype1))
+
+    def test_threshold_lower_bound(self):
+        distance = self.genotype1.compatibilty(self.genotype2)
+        self.assertEqual(self.genotype1.compatibilty(self.genotype2, distance + 1), distance)
+        bound = self.genotype1.compatibilty(self.genotype2, 0.01)
+        self.assertGreaterEqual(bound, 0.01)
+        self.assertLessEqual(bound, distance)
+
+    def test_fingerprint(self):
+        genotype_copy = self.genotype1.generate_copy()
+        self.assertEqual(genotype_copy.fingerprint, self.genotype1.fingerprint)
+        genotype_copy.mutate_weights()
+        self.assertNotEqual(genotype_copy.fingerprint, self.genotype1.fingerprint)
+
+    def test_cache(self):
+        cache = CompatibilityCache()
+        distance = self.genotype1.compatibilty(self.genotype2)
+        self.assertEqual(cache.distance(self.genotype1, self.genotype2), distance)
+        self.assertEqual(cache.distance(self.genotype1.generate_copy(), self.genotype2), distance)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.distances([], [self.genotype2]), [])
+
+    def test_cache_hash_collision(self):
+        # -1.0 and -2.0 have the same hash
+        colliding = [self.genotype2.generate_copy(), self.genotype2.generate_copy()]
+        for genotype, weight in zip(colliding, (-1.0, -2.0)):
+            genotype.connection_genes[0].weight = weight
+            genotype._invalidate()
+        self.assertEqual(hash(colliding[0].fingerprint), hash(colliding[1].fingerprint))
+        self.assertNotEqual(colliding[0].fingerprint, colliding[1].fingerprint)
+
+        cache = CompatibilityCache()
+        distances = [cache.distance(self.genotype1, genotype) for genotype in colliding]
+        self.assertEqual(distances, [self.genotype1.compatibilty(genotype) for genotype in colliding])
+        self.assertNotEqual(distances[0], distances[1])
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_cache_size(self):
+        cache = CompatibilityCache(1)
+        cache.distance(self.genotype1, self.genotype2)
+        cache.distance(self.genotype2, self.genotype1)
+        self.assertEqual(len(cache), 1)
+        cache.distance(self.genotype1, self.genotype2)
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+
+class TestBatchWeightMutation(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        gene_factory.reset()
+        Genotype.initialize_minimal_topology(4, 5)
+        self.genotypes = [Genotype.base_genotype_factory() for _ in range(10)]
+
+    def mutate(self, seed):
+        genotypes = [genotype.generate_copy() for genotype in self.genotypes]
+        for genotype in genotypes:
+            genotype._weight_mutation_pending = True
+        Genotype.mutate_weights_batch(genotypes, np.random.default_rng(seed))
+        return [[gene.weight for gene in genotype.connection_genes] for genotype in genotypes]
+
+    def test_reproducible(self):
+        self.assertEqual(self.mutate(1), self.mutate(1))
+        self.assertNotEqual(self.mutate(1), self.mutate(2))
+
+    def test_end_genotype_threshold(self):
+        rates = (Genotype.weight_mutation_rate, Genotype.weight_cold_mutation_rate,
+                 Genotype.end_weight_mutation_rate, Genotype.end_weight_cold_mutation_rate)
+        Genotype.weight_mutation_rate = Genotype.weight_cold_mutation_rate = 0
+        Genotype.end_weight_mutation_rate = Genotype.end_weight_cold_mutation_rate = 1
+        try:
+            mutated = self.mutate(0)
+        finally:
+            (Genotype.weight_mutation_rate, Genotype.weight_cold_mutation_rate,
+             Genotype.end_weight_mutation_rate, Genotype.end_weight_cold_mutation_rate) = rates
+
+        for genotype, weights in zip(self.genotypes, mutated):
+            for i, (gene, weight) in enumerate(zip(genotype.connection_genes, weights)):
+                if i / len(weights) < Genotype.end_genotype_threshold:
+                    self.assertNotEqual(weight, gene.weight)
+                else:
+                    self.assertEqual(weight, gene.weight)
+
+    def test_weight_cap(self):
+        for weights in self.mutate(0):
+            for weight in weights:
+                self.assertLessEqual(abs(weight), Genotype.weight_cap)
+
+    def test_base_genotype_factory(self):
+        batch_weight_mutation = Genotype.batch_weight_mutation
+        Genotype.batch_weight_mutation = True
+        try:
+            genotype = Genotype.base_genotype_factory()
+            deferred = Genotype.base_genotype_factory(defer_weight_mutation=True)
+        finally:
+            Genotype.batch_weight_mutation = batch_weight_mutation
+
+        base_weights = [gene.weight for gene in Genotype.base_genotype.connection_genes]
+        self.assertFalse(genotype.weight_mutation_pending)
+        self.assertNotEqual([gene.weight for gene in genotype.connection_genes], base_weights)
+        self.assertTrue(deferred.weight_mutation_pending)
+        self.assertEqual([gene.weight for gene in deferred.connection_genes], base_weights)
+
+    def test_only_pending_genotypes(self):
+        genotype = self.genotypes[0]
+        weights = [gene.weight for gene in genotype.connection_genes]
+        Genotype.mutate_weights_batch([genotype], np.random.default_rng(0))
+        self.assertEqual([gene.weight for gene in genotype.connection_genes], weights)
@@ -0,0 +1,120 @@
+import unittest
+import random as rand
+
+import numpy as np
+
+from neat.experiments import SubstrateXOR
+from neat.genes import Activation, InnovationRegistry, NodeType
+from neat.genotype import Genotype
+from neat.hyperneat import Substrate
+from neat.population import Population
+
+
+class TestSubstrate(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        self.substrate = Substrate([Substrate.grid(4, 3), Substrate.grid(2, 2), Substrate.grid(1, 1)])
+        Genotype.initialize_minimal_topology(self.substrate.num_cppn_inputs, self.substrate.num_cppn_outputs,
+                                             InnovationRegistry(), output_activation=Activation.TANH)
+        self.cppn = Genotype.base_genotype
+
+    def expected_weights(self, index):
+        # The minimal CPPN connects every input to every output
+        input_weights = np.array([[gene.weight for gene in self.cppn.connection_genes if gene.output_node_id == output_id]
+                                  for output_id in (6, 7)])
+        sources, targets = self.substrate.layers[index], self.substrate.layers[index + 1]
+        outputs = np.array([[np.tanh(input_weights[index] @ np.concatenate((source, target, [1]))) for target in targets]
+                            for source in sources])
+        return Substrate.scale_weights(outputs)
+
+    def test_grid(self):
+        self.assertEqual(Substrate.grid(3, 2).tolist(), [[-1, -1], [-1, 1], [0, -1], [0, 1], [1, -1], [1, 1]])
+        self.assertEqual(Substrate.grid(1, 1).tolist(), [[0, 0]])
+
+    def test_scale_weights(self):
+        np.testing.assert_allclose(Substrate.scale_weights(np.array([-1, -0.6, 0.1, 0.2, 1])), [-5, -2.5, 0, 0, 5])
+
+    def test_build(self):
+        network = self.substrate.build(self.cppn)
+        self.assertEqual([weights.shape for weights in network.weights], [(12, 4), (4, 1)])
+        for index, weights in enumerate(network.weights):
+            np.testing.assert_allclose(weights, self.expected_weights(index), rtol=0, atol=1E-12)
+
+    def test_chunked_queries_match(self):
+        chunk_size = Substrate.query_chunk_size
+        Substrate.query_chunk_size = 5
+        try:
+            network = self.substrate.build(self.cppn)
+        finally:
+            Substrate.query_chunk_size = chunk_size
+        for index, weights in enumerate(network.weights):
+            np.testing.assert_allclose(weights, self.expected_weights(index), rtol=0, atol=1E-12)
+
+    def test_evaluate_batch(self):
+        network = self.substrate.build(self.cppn)
+        inputs = np.random.default_rng(0).random((5, 12))
+        hidden = 1 / (1 + np.exp(-4.9 * (inputs @ network.weights[0])))
+        expected = 1 / (1 + np.exp(-4.9 * (hidden @ network.weights[1])))
+        np.testing.assert_allclose(network.evaluate_batch(inputs), expected, rtol=0, atol=1E-12)
+        self.assertEqual(network.evaluate(inputs[0].tolist()), expected[0].tolist())
+        with self.assertRaises(RuntimeError):
+            network.evaluate([1, 2])
+
+    def test_initialize_population(self):
+        population = Population(size=4)
+        self.substrate.initialize_population(population)
+        genotype = population.agents[0].genotype
+        self.assertEqual(len(genotype.connection_genes), 10)
+        self.assertEqual([gene.activation for gene in genotype.node_genes[-2:]], [Activation.TANH] * 2)
+
+    def test_recurrent_cppn_raises(self):
+        self.cppn.create_connection_gene(6, 7, 1)
+        self.cppn.create_connection_gene(7, 6, 1)
+        with self.assertRaises(RuntimeError):
+            self.substrate.build(self.cppn)
+
+
+class TestCPPNEvolution(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        self.settings = (Genotype.hidden_activations, Genotype.node_mutation_chance)
+        Genotype.hidden_activations = Substrate.cppn_activations
+
+    def tearDown(self):
+        Genotype.hidden_activations, Genotype.node_mutation_chance = self.settings
+
+    def test_hidden_activations(self):
+        Genotype.initialize_minimal_topology(2, 1, InnovationRegistry())
+        genotype = Genotype.base_genotype_factory()
+        for _ in range(20):
+            genotype.attempt_node_mutation()
+        activations = {gene.activation for gene in genotype.node_genes if gene.node_type is NodeType.HIDDEN}
+        self.assertGreater(len(activations), 1)
+        self.assertLessEqual(activations, set(Substrate.cppn_activations))
+
+    def test_activation_mutation(self):
+        Genotype.initialize_minimal_topology(2, 1, InnovationRegistry())
+        parent = Genotype.base_genotype_factory()
+        parent.attempt_node_mutation()
+        offspring = parent.favored_crossover(parent.generate_copy())
+        plan = offspring.network_plan
+        activation = parent.node_genes[-1].activation
+
+        self.assertTrue(offspring.attempt_activation_mutation())
+        self.assertNotEqual(offspring.node_genes[-1].activation, activation)
+        self.assertEqual(parent.node_genes[-1].activation, activation)
+        self.assertIsNot(offspring.network_plan, plan)
+
+    def test_substrate_xor(self):
+        Genotype.node_mutation_chance = 0.2
+        experiment = SubstrateXOR(num_generations=3, population_size=30, sinks=[], seed=3, agents_directory=None)
+        experiment.run()
+
+        self.assertEqual(experiment.results['gen'], 3)
+        self.assertGreater(experiment.results['gen_champ']['fitness'], 0)
+        output_genes = [gene for gene in experiment.population.agents[0].genotype.node_genes if gene.node_type is NodeType.OUTPUT]
+        self.assertEqual([gene.activation for gene in output_genes], [Activation.TANH] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import random as rand
+
+from neat.compact import CompactGenome
+from neat.genes import InnovationRegistry, NodeType
+from neat.genotype import Genotype
+from neat.population import Population
+
+
+class TestInnovationJournal(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        self.registry = InnovationRegistry()
+        Genotype.initialize_minimal_topology(2, 1, self.registry)
+        self.base = Genotype.base_genotype
+
+    def split_first_connection(self, journal):
+        genotype = CompactGenome.from_genotype(self.base).to_genotype(journal)
+        gene = genotype.connection_genes[0]
+        node = genotype.create_node_gene(gene.input_node_id, gene.output_node_id, NodeType.HIDDEN)
+        genotype.create_connection_gene(gene.input_node_id, node.innovation_id, 1.0)
+        genotype.create_connection_gene(node.innovation_id, gene.output_node_id, gene.weight)
+        return genotype
+
+    def test_journal_does_not_modify_registry(self):
+        journal = self.registry.journal()
+        genotype = self.split_first_connection(journal)
+        self.assertEqual(self.registry.get_num_nodes(), 3)
+        self.assertEqual(self.registry.get_num_connections(), 2)
+        self.assertEqual([gene.innovation_id for gene in genotype.node_genes], [1, 2, 3, 4])
+        self.assertEqual(journal.nodes, [(1, 3, NodeType.HIDDEN)])
+        self.assertEqual(journal.connections, [(1, 4), (4, 3)])
+
+    def test_identical_innovations_share_ids(self):
+        journals = [self.registry.journal() for _ in range(2)]
+        genomes = [CompactGenome.from_genotype(self.split_first_connection(journal)) for journal in journals]
+        for journal, genome in zip(journals, genomes):
+            genome.translate_innovations(self.registry.merge(journal))
+
+        self.assertEqual(self.registry.get_num_nodes(), 4)
+        self.assertEqual(self.registry.get_num_connections(), 4)
+        self.assertEqual(genomes[0].to_bytes(), genomes[1].to_bytes())
+
+    def test_merge_order_determines_ids(self):
+        first = self.registry.journal()
+        first_genome = CompactGenome.from_genotype(self.split_first_connection(first))
+
+        second = self.registry.journal()
+        genotype = CompactGenome.from_genotype(self.base).to_genotype(second)
+        genotype.create_connection_gene(2, 2, 0.5)
+        genotype.create_connection_gene(1, 1, 0.5)
+        second_genome = CompactGenome.from_genotype(genotype)
+
+        second_genome.translate_innovations(self.registry.merge(second))
+        first_genome.translate_innovations(self.registry.merge(first))
+
+        self.assertEqual(second_genome.connection_ids.tolist(), [1, 2, 3, 4])
+        self.assertEqual(second_genome.connection_input_ids.tolist(), [1, 2, 2, 1])
+        self.assertEqual(first_genome.node_ids.tolist(), [1, 2, 3, 4])
+        self.assertEqual(first_genome.connection_ids.tolist(), [1, 2, 5, 6])
+        self.assertEqual(first_genome.connection_output_ids.tolist(), [3, 3, 4, 3])
+
+    def test_translation_restores_innovation_order(self):
+        earlier = self.registry.journal()
+        journal = self.registry.journal()
+        genotype = CompactGenome.from_genotype(self.base).to_genotype(earlier)
+        genotype.create_connection_gene(3, 1, 0.5)
+        self.registry.merge(earlier)
+
+        genotype = CompactGenome.from_genotype(self.base).to_genotype(journal)
+        genotype.create_connection_gene(1, 1, 0.5)
+        genotype.create_connection_gene(3, 1, 0.25)
+        genome = CompactGenome.from_genotype(genotype)
+        self.assertEqual(genome.connection_ids.tolist(), [1, 2, 3, 4])
+
+        genome.translate_innovations(self.registry.merge(journal))
+        self.assertEqual(genome.connection_ids.tolist(), [1, 2, 3, 4])
+        self.assertEqual(genome.weights[2:].tolist(), [0.25, 0.5])
+
+    def test_populations_have_separate_registries(self):
+        population = Population(size=2)
+        population.initialize_population(2, 1)
+        self.assertIsNot(population.registry, self.registry)
+        self.assertIs(population.base_genotype.registry, population.registry)
+        # Populations do not replace the class level base genotype
+        self.assertIs(Genotype.base_genotype, self.base)
+        self.assertEqual(population.registry.get_num_connections(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import random as rand
+from functools import partial
+
+from neat.compact import CompactGenome
+from neat.experiments import XOR
+from neat.genes import InnovationRegistry, NodeType
+from neat.genotype import Genotype
+from neat.islands import IslandModel, Topology
+from neat.utils.rng import RandomStreams
+
+
+class FailingXOR(XOR):
+    ''' XOR that fails to breed its second generation if seeded with
+        failing_seed.
+    '''
+    def __init__(self, failing_seed, seed=None, **kwargs):
+        super().__init__(seed=seed, **kwargs)
+        self._failing = seed == failing_seed
+
+    def breed_generation(self):
+        if self._failing and self.current_generation == 2:
+            raise ValueError('Breeding failed')
+        super().breed_generation()
+
+
+class TestMigration(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        self.registries = [InnovationRegistry(), InnovationRegistry()]
+        for registry in self.registries:
+            Genotype.initialize_minimal_topology(2, 1, registry)
+
+    def split(self, genotype, gene):
+        node = genotype.create_node_gene(gene.input_node_id, gene.output_node_id, NodeType.HIDDEN)
+        genotype.create_connection_gene(gene.input_node_id, node.innovation_id, 1.0)
+        genotype.create_connection_gene(node.innovation_id, gene.output_node_id, gene.weight)
+        return node
+
+    def structures(self, genotype):
+        # Hidden nodes are described by the structure of the connection they split
+        names = {}
+        for gene in genotype.node_genes:
+            if gene.node_type is NodeType.HIDDEN:
+                names[gene.innovation_id] = (names.get(gene.input_node_id, gene.input_node_id),
+                                             names.get(gene.output_node_id, gene.output_node_id))
+        return sorted([(names.get(gene.input_node_id, gene.input_node_id), names.get(gene.output_node_id, gene.output_node_id),
+                        gene.weight) for gene in genotype.connection_genes], key=repr)
+
+    def test_register_innovations(self):
+        source, destination = self.registries
+        local = Genotype.base_genotype_factory()
+        local.registry = destination
+        self.split(local, local.connection_genes[1])
+
+        migrant = CompactGenome.from_genotype(Genotype.base_genotype).to_genotype(source)
+        node = self.split(migrant, migrant.connection_genes[0])
+        self.split(migrant, migrant.connection_genes[1])
+        migrant.create_connection_gene(node.innovation_id, node.innovation_id, 0.5)
+
+        genome = CompactGenome.from_genotype(migrant)
+        genome.register_innovations(destination)
+        genotype = genome.to_genotype(destination)
+
+        self.assertEqual(self.structures(genotype), self.structures(migrant))
+        self.assertEqual(destination.get_num_nodes(), 5)
+        ids = [gene.innovation_id for gene in genotype.connection_genes]
+        self.assertEqual(ids, sorted(ids))
+        for gene in genotype.connection_genes:
+            self.assertEqual(destination.get_connection_id(gene.structure), gene.innovation_id)
+        # The split shared with the local genotype keeps its local ids
+        self.assertEqual(genotype.node_genes[3].innovation_id, local.node_genes[3].innovation_id)
+
+    def test_different_topology_raises(self):
+        registry = InnovationRegistry()
+        Genotype.initialize_minimal_topology(1, 1, registry)
+        Genotype.initialize_minimal_topology(2, 1, self.registries[0])
+        genome = CompactGenome.from_genotype(Genotype.base_genotype)
+        with self.assertRaises(RuntimeError):
+            genome.register_innovations(registry)
+
+
+class TestIslandModel(unittest.TestCase):
+    def run_islands(self, topology):
+        islands = IslandModel(3, partial(XOR, population_size=30, sinks=[], agents_directory=None), 5, migration_interval=2,
+                              topology=topology, seed=4)
+        return islands.run()
+
+    def test_reproducible(self):
+        results = self.run_islands(Topology.RING)
+        self.assertEqual([island_results['gen'] for island_results in results], [5, 5, 5])
+        self.assertEqual(results, self.run_islands(Topology.RING))
+        self.assertNotEqual(results[0]['gen_champ'], results[1]['gen_champ'])
+
+    def test_failed_island_raises(self):
+        failing_seed = RandomStreams(4).for_island(1).random.getrandbits(64)
+        islands = IslandModel(3, partial(FailingXOR, failing_seed, population_size=30, sinks=[], agents_directory=None), 5,
+                              migration_interval=2, seed=4)
+        with self.assertRaisesRegex(RuntimeError, 'Island 1'):
+            islands.run()
+
+    def test_no_generations_raises(self):
+        with self.assertRaises(RuntimeError):
+            IslandModel(2, None, 0)
+
+    def test_random_topology(self):
+        islands = IslandModel(4, None, 1, topology=Topology.RANDOM, seed=1)
+        for _ in range(10):
+            destinations = islands.destinations()
+            self.assertTrue(all(destination != i for i, destination in enumerate(destinations)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,245 @@
+import unittest
+
+import numpy as np
+
+from neat.phenotype import Phenotype, StabilizationMethod
+from neat.genotype import Genotype
+from neat.genes import NodeType, gene_factory
+from neat.agent import Agent
+from neat.networks import RecurrentNetwork
+
+
+class TestFeedForwardNetwork(unittest.TestCase):
+    def setUp(self):
+        gene_factory.reset()
+
+    def build_non_recurrent_genotype(self):
+        genotype = Genotype()
+        genotype.create_node_gene(None, None, NodeType.INPUT) # 1
+        genotype.create_node_gene(None, None, NodeType.INPUT) # 2
+        genotype.create_node_gene(None, None, NodeType.INPUT) # 3
+        genotype.create_node_gene(None, None, NodeType.OUTPUT) # 4
+
+        genotype.create_node_gene(1, 4, NodeType.HIDDEN) # 5
+        genotype.create_node_gene(2, 4, NodeType.HIDDEN) # 6
+        genotype.create_node_gene(3, 4, NodeType.HIDDEN) # 7
+
+        genotype.create_connection_gene(1, 5, 0.5)
+        genotype.create_connection_gene(5, 4, -1.5)
+        genotype.create_connection_gene(2, 6, 2)
+        genotype.create_connection_gene(6, 4, 1)
+        genotype.create_connection_gene(3, 7, -0.25)
+        genotype.create_connection_gene(7, 4, 0.75)
+        genotype.create_connection_gene(7, 6, 1.25)
+
+        return genotype
+
+    def build_recurrent_genotype(self):
+        genotype = self.build_non_recurrent_genotype()
+        genotype.create_connection_gene(6, 7, 1)
+
+        return genotype
+
+    def test_matches_iterative(self):
+        genotype = self.build_non_recurrent_genotype()
+        iterative = Phenotype(genotype, StabilizationMethod.ITERATIVE)
+        compiled = Phenotype(genotype, StabilizationMethod.FEED_FORWARD)
+        for inputs in ([0, 0, 0], [1, 0, 1], [1, 1, 0], [0.3, -2, 5]):
+            self.assertEqual(compiled.evaluate_network(inputs), iterative.evaluate_network(inputs))
+
+    def test_depth(self):
+        phenotype = Phenotype(self.build_non_recurrent_genotype(), StabilizationMethod.FEED_FORWARD)
+        self.assertEqual(phenotype.network.depth, 3)
+
+    def test_unreachable_node_penalty(self):
+        genotype = self.build_non_recurrent_genotype()
+        genotype.connection_genes[0].enabled = False
+        iterative = Phenotype(genotype, StabilizationMethod.ITERATIVE)
+        compiled = Phenotype(genotype, StabilizationMethod.FEED_FORWARD)
+        self.assertFalse(compiled.network.complete)
+        self.assertEqual(compiled.evaluate_network([1, 1, 1]), iterative.evaluate_network([1, 1, 1]))
+
+    def test_recurrent_fallback(self):
+        genotype = self.build_recurrent_genotype()
+        iterative = Phenotype(genotype, StabilizationMethod.ITERATIVE)
+        compiled = Phenotype(genotype, StabilizationMethod.FEED_FORWARD)
+        self.assertIsNone(compiled.network)
+        self.assertEqual(compiled.evaluate_network([1, 0, 1]), iterative.evaluate_network([1, 0, 1]))
+
+    def test_invalid_input(self):
+        phenotype = Phenotype(self.build_non_recurrent_genotype(), StabilizationMethod.FEED_FORWARD)
+        with self.assertRaises(RuntimeError):
+            phenotype.evaluate_network([1, 0])
+
+    def test_evaluate_batch(self):
+        phenotype = Phenotype(self.build_non_recurrent_genotype(), StabilizationMethod.ITERATIVE)
+        inputs = [[0, 0, 0], [1, 0, 1], [1, 1, 0], [0.3, -2, 5]]
+        outputs, errors = phenotype.evaluate_batch(inputs)
+        self.assertEqual(outputs.shape, (4, 1))
+        for row, output, error in zip(inputs, outputs, errors):
+            expected_output, expected_error = phenotype.evaluate_network(row)
+            np.testing.assert_allclose(output, expected_output, rtol=0, atol=1E-12)
+            self.assertEqual(error, expected_error)
+
+    def test_evaluate_batch_recurrent(self):
+        phenotype = Phenotype(self.build_recurrent_genotype(), StabilizationMethod.ITERATIVE)
+        outputs, errors = phenotype.evaluate_batch([[1, 0, 1], [0, 1, 1]])
+        self.assertEqual(list(outputs[0]), phenotype.evaluate_network([1, 0, 1])[0])
+        self.assertEqual(list(outputs[1]), phenotype.evaluate_network([0, 1, 1])[0])
+
+    def test_plan_survives_weight_mutation(self):
+        genotype = self.build_non_recurrent_genotype()
+        plan = genotype.network_plan
+        genotype_copy = genotype.generate_copy()
+        genotype_copy.mutate_weights()
+        self.assertIs(genotype_copy.network_plan, plan)
+        iterative = Phenotype(genotype_copy, StabilizationMethod.ITERATIVE)
+        compiled = Phenotype(genotype_copy, StabilizationMethod.FEED_FORWARD)
+        self.assertEqual(compiled.evaluate_network([1, 0, 1]), iterative.evaluate_network([1, 0, 1]))
+
+    def test_plan_invalidated_by_structural_mutation(self):
+        genotype = self.build_non_recurrent_genotype()
+        plan = genotype.network_plan
+        genotype.attempt_node_mutation()
+        self.assertIsNot(genotype.network_plan, plan)
+        genotype.create_connection_gene(6, 7, 1)
+        self.assertIsNone(genotype.network_plan)
+
+    def test_crossover_keeps_plan(self):
+        genotype = self.build_non_recurrent_genotype()
+        plan = genotype.network_plan
+        rates = (Genotype.node_mutation_chance, Genotype.connection_mutation_chance, Genotype.toggle_chance)
+        Genotype.node_mutation_chance = Genotype.connection_mutation_chance = Genotype.toggle_chance = 0
+        try:
+            offspring = genotype.favored_crossover(genotype.generate_copy())
+        finally:
+            Genotype.node_mutation_chance, Genotype.connection_mutation_chance, Genotype.toggle_chance = rates
+        self.assertIs(offspring.network_plan, plan)
+
+    def test_lazy_phenotype(self):
+        agent = Agent(self.build_non_recurrent_genotype(), StabilizationMethod.FEED_FORWARD)
+        self.assertIsNone(agent._phenotype)
+        agent.activate_network([1, 0, 1])
+        self.assertIsNotNone(agent._phenotype)
+        self.assertFalse(agent.phenotype._nodes_built)
+
+
+class TestAdaptiveStabilization(unittest.TestCase):
+    build_non_recurrent_genotype = TestFeedForwardNetwork.build_non_recurrent_genotype
+    build_recurrent_genotype = TestFeedForwardNetwork.build_recurrent_genotype
+
+    def setUp(self):
+        gene_factory.reset()
+
+    def test_feed_forward_stops_after_depth(self):
+        genotype = self.build_non_recurrent_genotype()
+        iterative = Phenotype(genotype, StabilizationMethod.ITERATIVE)
+        adaptive = Phenotype(genotype, StabilizationMethod.ADAPTIVE)
+        for inputs in ([0, 0, 0], [1, 0, 1], [0.3, -2, 5]):
+            self.assertEqual(adaptive.evaluate_network(inputs), iterative.evaluate_network(inputs))
+            self.assertEqual(adaptive.iteration_count, 3)
+            self.assertEqual(iterative.iteration_count, 20)
+        self.assertEqual(adaptive.total_iterations, 9)
+
+    def test_unreachable_node_penalty(self):
+        genotype = self.build_non_recurrent_genotype()
+        genotype.connection_genes[0].enabled = False
+        iterative = Phenotype(genotype, StabilizationMethod.ITERATIVE)
+        adaptive = Phenotype(genotype, StabilizationMethod.ADAPTIVE)
+        self.assertEqual(adaptive.evaluate_network([1, 1, 1]), iterative.evaluate_network([1, 1, 1]))
+
+    def test_recurrent_converges(self):
+        genotype = self.build_recurrent_genotype()
+        iterative = Phenotype(genotype, StabilizationMethod.ITERATIVE)
+        adaptive = Phenotype(genotype, StabilizationMethod.ADAPTIVE)
+        output, error = adaptive.evaluate_network([1, 0, 1])
+        expected_output, expected_error = iterative.evaluate_network([1, 0, 1])
+        self.assertLess(adaptive.iteration_count, iterative.iteration_count)
+        np.testing.assert_allclose(output, expected_output, rtol=0, atol=1E-8)
+        self.assertEqual(error, expected_error)
+
+    def test_recurrent_iteration_limit(self):
+        limit = Phenotype.adaptive_iteration_limit
+        Phenotype.adaptive_iteration_limit = 3
+        try:
+            adaptive = Phenotype(self.build_recurrent_genotype(), StabilizationMethod.ADAPTIVE)
+            adaptive.evaluate_network([1, 0, 1])
+        finally:
+            Phenotype.adaptive_iteration_limit = limit
+        self.assertEqual(adaptive.iteration_count, 3)
+
+    def test_agent_iterations(self):
+        agent = Agent(self.build_non_recurrent_genotype(), StabilizationMethod.ADAPTIVE)
+        agent.activate_network([1, 0, 1])
+        self.assertEqual(agent.phenotype.iteration_count, 3)
+        agent.activate_batch([[1, 0, 1], [0, 1, 1]])
+        self.assertEqual(agent.phenotype.iteration_count, 2)
+
+
+class TestRecurrentNetwork(unittest.TestCase):
+    build_non_recurrent_genotype = TestFeedForwardNetwork.build_non_recurrent_genotype
+    build_recurrent_genotype = TestFeedForwardNetwork.build_recurrent_genotype
+
+    def setUp(self):
+        gene_factory.reset()
+        self.sparse_recurrent = Phenotype.sparse_recurrent
+
+    def tearDown(self):
+        Phenotype.sparse_recurrent = self.sparse_recurrent
+
+    def build_phenotypes(self, genotype, stabilization_method):
+        Phenotype.sparse_recurrent = False
+        graph = Phenotype(genotype, stabilization_method)
+        Phenotype.sparse_recurrent = True
+        sparse = Phenotype(genotype, stabilization_method)
+        self.assertIsNotNone(sparse.recurrent_network)
+        self.assertFalse(sparse._nodes_built)
+
+        return graph, sparse
+
+    def assert_matches(self, graph, sparse, inputs):
+        output, error = sparse.evaluate_network(inputs)
+        expected_output, expected_error = graph.evaluate_network(inputs)
+        np.testing.assert_allclose(output, expected_output, rtol=0, atol=1E-12)
+        self.assertEqual(error, expected_error)
+        self.assertEqual(sparse.iteration_count, graph.iteration_count)
+
+    def test_sparse_matrix(self):
+        network = RecurrentNetwork(self.build_recurrent_genotype())
+        # Rows are hidden nodes 5, 6, 7 followed by output node 4, columns
+        # are inputs 1, 2, 3 followed by the same nodes
+        self.assertEqual(network.indptr.tolist(), [0, 1, 3, 5, 8])
+        self.assertEqual(network.indices.tolist(), [0, 1, 5, 2, 4, 3, 4, 5])
+        self.assertEqual(network.data.tolist(), [0.5, 2, 1.25, -0.25, 1, -1.5, 1, 0.75])
+
+    def test_matches_node_graph(self):
+        for stabilization_method in (StabilizationMethod.ITERATIVE, StabilizationMethod.OUTPUT_DELTA,
+                                     StabilizationMethod.ADAPTIVE):
+            for build_genotype in (self.build_non_recurrent_genotype, self.build_recurrent_genotype):
+                gene_factory.reset()
+                graph, sparse = self.build_phenotypes(build_genotype(), stabilization_method)
+                for inputs in ([0, 0, 0], [1, 0, 1], [1, 1, 0], [0.3, -2, 5]):
+                    self.assert_matches(graph, sparse, inputs)
+
+    def test_unreachable_node_penalty(self):
+        genotype = self.build_recurrent_genotype()
+        genotype.connection_genes[0].enabled = False
+        graph, sparse = self.build_phenotypes(genotype, StabilizationMethod.ITERATIVE)
+        self.assert_matches(graph, sparse, [1, 1, 1])
+        self.assertEqual(sparse.evaluate_network([1, 1, 1])[1], 20 * 1000)
+
+    def test_state_between_activations(self):
+        network = RecurrentNetwork(self.build_recurrent_genotype())
+        self.assertEqual(network.activate([1, 0, 1]), 0)
+        first = network.outputs
+        network.activate([1, 0, 1])
+        self.assertNotEqual(network.outputs, first)
+
+        network.reset()
+        network.activate([1, 0, 1])
+        self.assertEqual(network.outputs, first)
+
+    def test_invalid_input(self):
+        network = RecurrentNetwork(self.build_recurrent_genotype())
+        with self.assertRaises(RuntimeError):
+            network.activate([1, 0])
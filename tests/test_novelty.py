@@ -0,0 +1,79 @@
+import unittest
+
+import numpy as np
+
+from neat.experiments import XOR
+from neat.novelty import NoveltyArchive, NoveltySearch, nearest_neighbor_distances
+from neat.species import Species
+
+
+class TestNoveltyArchive(unittest.TestCase):
+    def test_evicts_oldest(self):
+        archive = NoveltyArchive(capacity=3)
+        archive.add([[0], [1]])
+        archive.add([[2], [3]])
+        self.assertEqual(archive.size, 3)
+        self.assertEqual(sorted(archive.descriptors.ravel().tolist()), [1, 2, 3])
+        archive.add([[4], [5], [6], [7]])
+        self.assertEqual(sorted(archive.descriptors.ravel().tolist()), [5, 6, 7])
+
+    def test_invalid_descriptors(self):
+        archive = NoveltyArchive()
+        archive.add([[0, 1]])
+        with self.assertRaises(RuntimeError):
+            archive.add([[0, 1, 2]])
+
+
+class TestNearestNeighbors(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        queries = rng.random((50, 4))
+        references = np.concatenate((queries, rng.random((70, 4))))
+        distances = np.linalg.norm(queries[:, None] - references[None], axis=2)
+        distances[np.arange(50), np.arange(50)] = np.inf
+        expected = np.sort(distances, axis=1)[:, :5].mean(axis=1)
+        for chunk_size in (None, 7):
+            np.testing.assert_allclose(nearest_neighbor_distances(queries, references, 5, True, chunk_size), expected)
+
+    def test_too_few_references(self):
+        np.testing.assert_allclose(nearest_neighbor_distances([[0], [3]], [[0], [3]], 5, True), [3, 3])
+        np.testing.assert_allclose(nearest_neighbor_distances([[0]], [[0]], 5, True), [0])
+
+
+class TestNoveltySearch(unittest.TestCase):
+    def setUp(self):
+        self.species_state = (Species.compatibility_threshold, Species._species_count)
+
+    def tearDown(self):
+        Species.compatibility_threshold, Species._species_count = self.species_state
+
+    def test_archive_lowers_novelty(self):
+        search = NoveltySearch(k=1, num_archived=1)
+        self.assertEqual(search.score([[0], [4]]).tolist(), [4, 4])
+        search.archive.add([[1]])
+        self.assertEqual(search.score([[0], [4]]).tolist(), [1, 3])
+
+    def test_xor_uses_novelty(self):
+        experiment = XOR(num_generations=3, population_size=30, sinks=[], seed=2, novelty_search=NoveltySearch(num_archived=4),
+                         agents_directory=None)
+        experiment.run()
+
+        self.assertEqual(experiment.novelty_search.archive.size, 12)
+        self.assertEqual(experiment.results['archive_size'], 12)
+
+    def test_parallel_descriptors(self):
+        descriptors = []
+        for num_workers in (1, 2):
+            experiment = XOR(population_size=30, num_workers=num_workers, sinks=[], seed=2, novelty_search=NoveltySearch(),
+                             agents_directory=None)
+            experiment.initialize()
+            experiment.evaluate_generation(1)
+            experiment.close()
+            descriptors.append([agent.behavior for agent in experiment.population.agents])
+
+        self.assertEqual(np.shape(descriptors[0]), (30, 4))
+        self.assertEqual(descriptors[0], descriptors[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import io
+import random as rand
+from contextlib import redirect_stdout
+
+from neat.utils.profiler import PhaseProfiler, NullProfiler
+from neat.experiments import XOR
+from neat.genes import gene_factory
+
+
+class TestPhaseProfiler(unittest.TestCase):
+    def test_phases(self):
+        profiler = PhaseProfiler()
+        profiler.start_generation(1)
+        for _ in range(3):
+            with profiler.phase('outer'):
+                with profiler.phase('inner'):
+                    blocks = [[] for _ in range(100)]
+        self.assertEqual(profiler.record['outer']['calls'], 3)
+        self.assertEqual(profiler.record['inner']['calls'], 3)
+        self.assertGreaterEqual(profiler.record['outer']['time'], profiler.record['inner']['time'])
+        profiler.start_generation(2)
+        self.assertEqual(profiler.record, {})
+        self.assertEqual([record['generation'] for record in profiler.records], [1, 2])
+
+    def test_null_profiler(self):
+        profiler = NullProfiler()
+        profiler.start_generation(1)
+        with profiler.phase('outer'):
+            pass
+        self.assertIsNone(profiler.record)
+        self.assertEqual(profiler.records, [])
+
+    def test_experiment_profile(self):
+        rand.seed(0)
+        gene_factory.reset()
+        experiment = XOR(num_generations=2, population_size=20, profile=True, agents_directory=None)
+        with redirect_stdout(io.StringIO()):
+            experiment.run()
+
+        self.assertEqual(len(experiment.profiler.records), 2)
+        self.assertIs(experiment._results['profile'], experiment.profiler.records[-1]['phases'])
+        for phase in ('speciate', 'epoch', 'cull_species', 'breed_species', 'replace_agents'):
+            self.assertEqual(experiment._results['profile'][phase]['calls'], 1)
@@ -0,0 +1,65 @@
+import unittest
+import pickle
+import random as rand
+
+from neat.agent import Agent
+from neat.compact import CompactGenome
+from neat.experiments import XOR
+from neat.species import Species
+from neat.utils.rng import RandomStreams
+
+
+class TestRandomStreams(unittest.TestCase):
+    def test_derived_streams_are_independent(self):
+        streams = RandomStreams(42)
+        expected = streams.for_agent(3).random.random()
+        streams.random.random()
+        streams.for_species(1, 0).numpy.random(10)
+        self.assertEqual(RandomStreams(42).for_agent(3).random.random(), expected)
+        self.assertNotEqual(streams.for_agent(4).random.random(), expected)
+
+    def test_unseeded_streams_use_random_module(self):
+        streams = RandomStreams()
+        self.assertIs(streams.random, rand)
+        self.assertIs(streams.for_island(2), streams)
+
+    def test_unseeded_streams_pickle(self):
+        streams = pickle.loads(pickle.dumps(RandomStreams()))
+        self.assertIs(streams.random, rand)
+
+    def test_state_round_trip(self):
+        streams = RandomStreams(5)
+        streams.numpy.random()
+        state = streams.getstate()
+        expected = (streams.random.random(), streams.numpy.random())
+        streams.setstate(state)
+        self.assertEqual((streams.random.random(), streams.numpy.random()), expected)
+
+
+class TestSeededExperiment(unittest.TestCase):
+    def setUp(self):
+        self.species_state = (Species.compatibility_threshold, Species._species_count)
+        self.counters = (Agent._agents_created, Species._species_created)
+
+    def tearDown(self):
+        Species.compatibility_threshold, Species._species_count = self.species_state
+        Agent._agents_created, Species._species_created = self.counters
+
+    def run_experiment(self, random_seed):
+        rand.seed(random_seed)
+        # Agent and species ids are part of the keys of derived streams
+        Species.compatibility_threshold, Species._species_count = self.species_state
+        Agent._agents_created, Species._species_created = self.counters
+        experiment = XOR(num_generations=4, population_size=40, sinks=[], seed=11, agents_directory=None)
+        state = rand.getstate()
+        experiment.run()
+
+        self.assertEqual(rand.getstate(), state)
+        return [CompactGenome.from_genotype(agent.genotype).to_bytes() for agent in experiment.population.agents]
+
+    def test_seed_reproduces_run(self):
+        self.assertEqual(self.run_experiment(0), self.run_experiment(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import random as rand
+
+from neat.species import Species
+from neat.genotype import Genotype
+from neat.agent import Agent
+from neat.genes import gene_factory
+
+
+class TestSpeciesStatistics(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        gene_factory.reset()
+        Genotype.initialize_minimal_topology(3, 1)
+        self.agents = [Agent(Genotype.base_genotype_factory()) for _ in range(5)]
+        for fitness, agent in zip([3, 1, 4, 1, 5], self.agents):
+            agent.fitness = fitness
+
+        self.species = Species(self.agents[0])
+        for agent in self.agents:
+            self.species.add(agent)
+
+    def expected_shares(self):
+        return [agent.fitness ** 2 / len(self.species.agents) for agent in self.species.agents]
+
+    def test_statistics(self):
+        self.assertEqual(self.species.total_shared_fitness, sum(self.expected_shares()))
+        self.assertEqual(self.species.max_shared_fitness, 25 / 5)
+        self.assertEqual(self.species.min_shared_fitness, 1 / 5)
+        self.assertIs(self.species.champion, self.agents[4])
+        self.assertEqual(self.species.ranked_agents(False)[:2], [self.agents[1], self.agents[3]])
+
+    def test_snapshot_is_reused(self):
+        snapshot = self.species._statistics()
+        self.species.ranked_agents()
+        self.species.total_shared_fitness
+        self.assertIs(self.species._statistics(), snapshot)
+
+    def test_fitness_change_invalidates(self):
+        self.species.champion
+        self.agents[1].fitness = 10
+        self.assertIs(self.species.champion, self.agents[1])
+        self.assertEqual(self.species.total_shared_fitness, sum(self.expected_shares()))
+
+    def test_membership_change_invalidates(self):
+        self.species.total_shared_fitness
+        self.species.remove(self.agents[4])
+        self.assertIs(self.species.champion, self.agents[2])
+        self.assertEqual(self.species.total_shared_fitness, sum(self.expected_shares()))
+        with self.assertRaises(RuntimeError):
+            self.species.fitness_share(self.agents[4])
+
+    def test_kill_invalidates_living_total(self):
+        total = self.species.total_living_shared_fitness
+        self.agents[4].kill()
+        self.assertEqual(self.species.total_living_shared_fitness, total - 25 / 5)
@@ -0,0 +1,72 @@
+import unittest
+import io
+import json
+import os
+import random as rand
+import tempfile
+from contextlib import redirect_stdout
+
+from neat.telemetry import JSONLinesSink, ConsoleSink
+from neat.experiments import XOR
+from neat.genes import gene_factory
+from neat.species import Species
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        rand.seed(0)
+        gene_factory.reset()
+        self.compatibility_threshold = Species.compatibility_threshold
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'results.jsonl')
+
+    def tearDown(self):
+        Species.compatibility_threshold = self.compatibility_threshold
+        self.directory.cleanup()
+
+    def read_records(self):
+        if not os.path.exists(self.filename):
+            return []
+
+        with open(self.filename) as infile:
+            return [json.loads(line) for line in infile]
+
+    def test_json_lines_buffering(self):
+        sink = JSONLinesSink(self.filename, buffer_size=2)
+        sink.write({'gen': 1})
+        self.assertEqual(self.read_records(), [])
+        sink.write({'gen': 2})
+        sink.write({'gen': 3})
+        self.assertEqual(self.read_records(), [{'gen': 1}, {'gen': 2}])
+        sink.close()
+        self.assertEqual(self.read_records(), [{'gen': 1}, {'gen': 2}, {'gen': 3}])
+
+    def test_console_sink(self):
+        output = io.StringIO()
+        ConsoleSink(lambda record: f'gen {record["gen"]}', output).write({'gen': 4})
+        self.assertEqual(output.getvalue(), 'gen 4\n')
+
+    def test_experiment_records(self):
+        experiment = XOR(num_generations=3, population_size=30, sinks=[JSONLinesSink(self.filename)], agents_directory=None)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            experiment.run()
+
+        self.assertEqual(output.getvalue(), '')
+        records = self.read_records()
+        self.assertEqual([record['gen'] for record in records], [1, 2, 3])
+        self.assertEqual(sum(species['size'] for species in records[-1]['species'].values()), records[-1]['count'])
+
+    def test_species_statistics(self):
+        experiment = XOR(num_generations=2, population_size=30, sinks=[], agents_directory=None)
+        experiment.run()
+        experiment.population.prepare_generation()
+        experiment.epoch(experiment.inputs, experiment.outputs)
+
+        for species in experiment.population.species:
+            statistics = species.statistics()
+            self.assertEqual(statistics['size'], species.count)
+            self.assertEqual(statistics['total'], species.total_shared_fitness)
+            self.assertEqual(statistics['max'], species.max_shared_fitness)
+            self.assertEqual(statistics['min'], species.min_shared_fitness)
+            self.assertIs(statistics['champion'], species.champion)